@@ -17,6 +17,14 @@ import os
 # serve production ready server
 from waitress import serve
 from layouts.header_layout import header_layout
+from services.cache import init_cache
+from services.callback_metrics import init_callback_metrics
+from services.compression import init_compression
+from services.host_metrics import init_host_metrics
+from services.ingest import init_ingest
+from services.profiler import init_profiler
+from services.scheduler import init_scheduler
+from services.warmup import init_warmup, page_loading
 
 # logging.basicConfig(stream=sys.stdout, level=logging.INFO)
 load_dotenv()
@@ -40,6 +48,13 @@ def create_app():
     log = logging.getLogger(__name__)
     log.info("Creating app")
 
+    # shared figure cache, must exist before the page callbacks run
+    init_cache(server)
+
+    # br/gzip responses and long-lived caching of fingerprinted assets (COMPRESSION, ASSET_CACHE);
+    # added before the other response hooks so that it runs after them
+    init_compression(server)
+
     FONT_AWESOME = "https://use.fontawesome.com/releases/v5.10.2/css/all.css"
 
     # create the Dash app
@@ -47,7 +62,9 @@ def create_app():
         __name__,
         server=server,
         # prevent_initial_callbacks="initial_duplicate",
-        # suppress_callback_exceptions=True,
+        # page layouts are built on first request unless PAGE_LOADING=eager, so they
+        # cannot be called up front to validate callback ids
+        suppress_callback_exceptions=page_loading() != "eager",
         use_pages=True,
         meta_tags=[
             {
@@ -72,17 +89,52 @@ def create_app():
         style={"padding": 0, "overflow-x": "hidden"},
     )
 
+    # per-callback latency and payload histograms at /metrics (CALLBACK_METRICS)
+    init_callback_metrics(application)
+
+    # opt-in sampling / cProfile sessions over callback requests (PROFILE_*)
+    init_profiler(application)
+
+    # build page data now, in the background, or on first request (PAGE_LOADING)
+    init_warmup(server)
+
+    # append new observation batches from the drop directory (INGEST_WATCH)
+    init_ingest(server)
+
+    # sample host and worker metrics for the system page (HOST_METRICS)
+    init_host_metrics()
+
+    # recompute provider stats in the background (SCHEDULER)
+    init_scheduler()
+
     # return the Dash app
     return application
 
 
-if __name__ == "__main__":
+def run_production_server():
+    """
+    Serve wsgi:server with gunicorn workers (see gunicorn.conf.py).
+
+    Falls back to a single waitress process where gunicorn is not available
+    (it does not run on Windows).
+    """
+    try:
+        from gunicorn.app.wsgiapp import run
+    except ImportError:
+        serve(create_app().server, host="0.0.0.0", port=10000)
+        return
 
-    application = create_app()
+    root = os.path.dirname(os.path.abspath(__file__))
+    sys.argv = ["gunicorn", "--chdir", root, "-c", os.path.join(root, "gunicorn.conf.py"), "wsgi:server"]
+    run()
+
+
+if __name__ == "__main__":
 
     if DASH_PROD == "True":
         print("app is running with production server")
-        serve(application.server, host="0.0.0.0", port=10000)
+        run_production_server()
     else:
+        application = create_app()
         print("app is running with development server")
         application.run(host="0.0.0.0", debug=True, port=10000)
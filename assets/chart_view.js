@@ -0,0 +1,31 @@
+/* assets/chart_view.js
+ * Turn a graph's relayoutData into the view {start, end, width} that the
+ * server uses to re-query and downsample a time series for the visible range.
+ */
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    chart_view: {
+        view: function(relayout, graph_id, current) {
+            var graph = document.getElementById(graph_id);
+            var width = graph ? graph.offsetWidth || null : null;
+            relayout = relayout || {};
+            if (relayout["xaxis.autorange"]) {
+                // double click / reset axes: back to the full range
+                return {width: width};
+            }
+            var start = relayout["xaxis.range[0]"];
+            var end = relayout["xaxis.range[1]"];
+            if (relayout["xaxis.range"]) {
+                start = relayout["xaxis.range"][0];
+                end = relayout["xaxis.range"][1];
+            }
+            if (start !== undefined && end !== undefined) {
+                return {start: start, end: end, width: width};
+            }
+            if (current) {
+                // resizes and other relayouts keep the current view
+                return window.dash_clientside.no_update;
+            }
+            return {width: width};
+        }
+    }
+});
@@ -0,0 +1,22 @@
+/* assets/dashAgGridComponentFunctions.js
+ * Cell renderers for dash_ag_grid. ProviderCard draws a providers page row
+ * as the same one-element card the .provider-card CSS styles: the name, with
+ * the status dot and the station share/sparkline graphic from its row data.
+ */
+var dagcomponentfuncs = (window.dashAgGridComponentFunctions = window.dashAgGridComponentFunctions || {});
+
+dagcomponentfuncs.ProviderCard = function(props) {
+    var data = props.data;
+    if (!data) {
+        // infinite row model: the row's block is still loading
+        return null;
+    }
+    return React.createElement(
+        "div",
+        {
+            className: "provider-card",
+            style: {"--status-color": data.status_color, "--card-image": 'url("' + data.card + '")'},
+        },
+        data.name
+    );
+};
@@ -0,0 +1,37 @@
+/* assets/map_view.js
+ * Turn the home map's relayoutData into the area {west, south, east, north,
+ * zoom} the server fetches stations for. The area is padded around the view
+ * and snapped to a grid, so small pans inside it need no new request.
+ */
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    map_view: {
+        view: function(relayout, current) {
+            var derived = relayout && relayout["mapbox._derived"];
+            var zoom = relayout && relayout["mapbox.zoom"];
+            if (!derived || !derived.coordinates || zoom === undefined) {
+                return window.dash_clientside.no_update;
+            }
+            var lons = derived.coordinates.map(function(c) { return c[0]; });
+            var lats = derived.coordinates.map(function(c) { return c[1]; });
+            var west = Math.min.apply(null, lons), east = Math.max.apply(null, lons);
+            var south = Math.min.apply(null, lats), north = Math.max.apply(null, lats);
+            var level = Math.floor(zoom);
+
+            if (current && current.zoom === level && current.west <= west && current.east >= east &&
+                current.south <= south && current.north >= north) {
+                // still inside the fetched area at the same zoom level
+                return window.dash_clientside.no_update;
+            }
+            // pad by half the view on each side, snapped outward to 1/8 of a zoom-level tile
+            var step = 360 / Math.pow(2, level) / 8;
+            var padLon = (east - west) / 2, padLat = (north - south) / 2;
+            return {
+                west: Math.floor((west - padLon) / step) * step,
+                east: Math.ceil((east + padLon) / step) * step,
+                south: Math.floor((south - padLat) / step) * step,
+                north: Math.ceil((north + padLat) / step) * step,
+                zoom: level
+            };
+        }
+    }
+});
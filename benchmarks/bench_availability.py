@@ -0,0 +1,100 @@
+"""
+Benchmark the station availability bitmaps (datastore/availability.py).
+
+Simulates a year of 5-minute report bitmaps for a national network, with
+bursty outages (a few hours, sometimes days) and scattered missed reports,
+and reports the memory held, the time to count expected-vs-actual reports
+per provider for the last hour, day and year, and the time to ingest one
+5-minute batch.
+
+    python benchmarks/bench_availability.py --stations 50000 --days 365
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from datastore.availability import SLOT, SLOTS_PER_DAY, Availability, _PackedDay  # noqa: E402
+
+
+def day_bitmaps(rng, n_stations, offline):
+    received = np.ones((n_stations, SLOTS_PER_DAY), dtype=bool)
+    # 5% of stations have one outage a day, 30 minutes to 12 hours long
+    out = np.flatnonzero(rng.random(n_stations) < 0.05)
+    starts = rng.integers(0, SLOTS_PER_DAY, len(out))
+    lengths = rng.integers(6, 144, len(out))
+    for station, start, length in zip(out, starts, lengths):
+        received[station, start : start + length] = False
+    # 0.1% of all reports go missing at random
+    received &= rng.random(received.shape) >= 0.001
+    received[offline] = False
+    return np.packbits(received, axis=1)
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, default=50_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--providers", type=int, default=40)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    end = pd.Timestamp.now().floor("D")
+    first_day = (end - pd.Timedelta(days=args.days)).value // SLOT.value // SLOTS_PER_DAY
+
+    availability = Availability()
+    # register every station with one report on the first day
+    availability.update(
+        pd.DataFrame(
+            {
+                "timestamp": pd.Timestamp(first_day * SLOTS_PER_DAY * SLOT.value),
+                "station_id": [f"ST{i:06d}" for i in range(args.stations)],
+                "provider": [f"prov{i % args.providers:02d}" for i in range(args.stations)],
+            }
+        )
+    )
+    start = time.perf_counter()
+    offline = np.zeros(args.stations, dtype=bool)
+    for day in range(first_day, first_day + args.days):
+        # about 1% of stations are down for weeks at a time
+        offline ^= rng.random(args.stations) < 0.0005
+        availability.days[day] = _PackedDay(day_bitmaps(rng, args.stations, offline))
+    availability.newest_slot = (first_day + args.days) * SLOTS_PER_DAY - 1
+    print(f"simulated {args.stations:,} stations x {args.days} days in {time.perf_counter() - start:.1f}s")
+
+    dense = args.stations * args.days * SLOTS_PER_DAY / 8
+    print(f"memory: {availability.memory_usage() / 1e6:.1f} MB (dense bitmaps: {dense / 1e6:.0f} MB)")
+
+    for name, window in {"hour": pd.Timedelta(hours=1), "day": pd.Timedelta(days=1), "year": pd.Timedelta(days=365)}.items():
+        ms, table = timed(lambda: availability.by_provider(end - window, end))
+        overall = 100 * table["actual"].sum() / table["expected"].sum()
+        print(f"by_provider last {name:>4}: {ms:8.1f}ms  overall {overall:.2f}%")
+
+    # one 5-minute batch: every station reporting once, into a new (dense) day
+    batch = pd.DataFrame(
+        {
+            "timestamp": end,
+            "station_id": availability.stations.to_numpy(),
+            "provider": availability.provider_names[availability.provider_codes],
+        }
+    )
+    ms, _ = timed(lambda: availability.update(batch))
+    print(f"update, {len(batch):,}-row batch: {ms:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark the partitioned, memory-mapped observation dataset.
+
+Writes synthetic 5-minute observations for several providers to a
+temporary provider=/date= dataset and compares it with the in-memory store:
+per-process memory, opening the store, and reading one provider / one
+time window / a few stations.
+
+    python benchmarks/bench_dataset.py --providers 10 --stations 200 --days 7
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from datastore.observations import ObservationStore  # noqa: E402
+
+
+def make_provider(name, n_stations, days, seed):
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range(end=pd.Timestamp.now().floor("5min"), periods=days * 288, freq="5min")
+    n = n_stations * len(timestamps)
+    return pd.DataFrame(
+        {
+            "timestamp": np.tile(timestamps.to_numpy(), n_stations),
+            "station_id": np.repeat([f"{name.upper()}_{i:04d}" for i in range(n_stations)], len(timestamps)),
+            "provider": name,
+            "status": rng.choice(["active", "maintenance", "offline"], n, p=[0.9, 0.07, 0.03]),
+            "latitude": np.repeat(30 + 15 * rng.random(n_stations), len(timestamps)),
+            "longitude": np.repeat(-120 + 45 * rng.random(n_stations), len(timestamps)),
+            "temperature": rng.normal(20, 5, n),
+            "humidity": rng.normal(60, 10, n),
+            "wind_speed": np.abs(rng.normal(8, 3, n)),
+        }
+    )
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--providers", type=int, default=10)
+    parser.add_argument("--stations", type=int, default=200, help="stations per provider")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {}
+        for i in range(args.providers):
+            name = f"prov{i:02d}"
+            files[name] = f"{name}.parquet"
+            make_provider(name, args.stations, args.days, i).to_parquet(os.path.join(tmp, files[name]))
+
+        def open_store(storage):
+            store = ObservationStore(
+                data_dir=tmp,
+                provider_files=files,
+                retention_hours=0,
+                storage=storage,
+                dataset_dir=os.path.join(tmp, "dataset"),
+            )
+            return store.load()
+
+        start = time.perf_counter()
+        open_store("dataset")
+        print(f"dataset import: {time.perf_counter() - start:.2f}s")
+
+        stores = {storage: timed(lambda: open_store(storage), 1) for storage in ("memory", "dataset")}
+        memory, dataset = stores["memory"][1], stores["dataset"][1]
+        newest = memory.frame["timestamp"].max()
+        window = (newest - pd.Timedelta(hours=6), newest)
+        stations = [f"PROV03_{i:04d}" for i in range(5)]
+
+        def memory_query():
+            df = memory.view("prov03")
+            keep = (df["timestamp"] >= window[0]) & (df["timestamp"] <= window[1]) & df["station_id"].isin(stations)
+            return df[keep]
+
+        queries = {
+            "one provider": (lambda: memory.view("prov03"), lambda: dataset.view("prov03")),
+            "provider, 6h, 5 stations": (
+                memory_query,
+                lambda: dataset.dataset.read(["prov03"], start=window[0], end=window[1], stations=stations),
+            ),
+        }
+
+        print(f"{memory.rows:,} observations, {args.providers} providers, {args.days} days")
+        print(f"{'':>26} {'memory':>12} {'dataset':>12}")
+        print(f"{'open store':>26} {stores['memory'][0]:>10.0f}ms {stores['dataset'][0]:>10.0f}ms")
+        print(
+            f"{'private memory':>26} {memory.memory_usage() / 1e6:>10.1f}MB {dataset.memory_usage() / 1e6:>10.1f}MB"
+            f"  (+{dataset.dataset.nbytes() / 1e6:.1f}MB of shared, memory-mapped files)"
+        )
+        for name, (in_memory, from_dataset) in queries.items():
+            memory_ms, a = timed(in_memory, args.repeat)
+            dataset_ms, b = timed(from_dataset, args.repeat)
+            assert len(a) == len(b)
+            print(f"{name:>26} {memory_ms:>10.2f}ms {dataset_ms:>10.2f}ms  ({len(b):,} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark the time-series downsampling used by the home and system charts.
+
+For a week and a season of 5-minute readings, compares the figure JSON
+size and build time of sending every point with LTTB (temperature chart)
+and min-max bucketing (system chart) at one point per pixel.
+
+    python benchmarks/bench_downsample.py --width 1200
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from figures import downsample  # noqa: E402
+
+
+def make_series(days, seed=0):
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range(end=pd.Timestamp.now().floor("5min"), periods=days * 288, freq="5min")
+    hours = np.arange(len(timestamps)) / 12
+    # daily cycle, slow drift and noise, with a few sensor spikes
+    values = 15 + 8 * np.sin(hours * 2 * np.pi / 24) + np.cumsum(rng.normal(0, 0.05, len(timestamps)))
+    values += rng.normal(0, 0.5, len(timestamps))
+    values[rng.choice(len(values), 20, replace=False)] += 25
+    return pd.Series(values, index=timestamps)
+
+
+def build(series, indices=None):
+    if indices is not None:
+        series = series.iloc[indices]
+    fig = go.Figure(go.Scatter(x=series.index, y=series.to_numpy(), mode="lines"))
+    return fig.to_json()
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, nargs="+", default=[7, 90])
+    parser.add_argument("--width", type=int, default=1200, help="chart width in pixels")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    points = downsample.points_for_width(args.width)
+    x_values = lambda s: s.index.to_numpy()  # noqa: E731
+    methods = {
+        "all points": lambda s: None,
+        "lttb": lambda s: downsample.lttb_indices(x_values(s), s.to_numpy(), points),
+        "min-max": lambda s: downsample.minmax_indices(x_values(s), s.to_numpy(), points),
+    }
+
+    print(f"{points} points for a {args.width}px chart")
+    print(f"{'days':>5} {'method':>11} {'points':>8} {'reduce':>9} {'figure':>9} {'payload':>10} {'max kept':>9}")
+    for days in args.days:
+        series = make_series(days)
+        for name, method in methods.items():
+            reduce_ms, indices = timed(lambda: method(series), args.repeat)
+            figure_ms, payload = timed(lambda: build(series, indices), args.repeat)
+            kept = series if indices is None else series.iloc[indices]
+            print(
+                f"{days:>5} {name:>11} {len(kept):>8,} {reduce_ms:>7.2f}ms {figure_ms:>7.1f}ms"
+                f" {len(payload) / 1024:>8.0f}KB {kept.max():>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
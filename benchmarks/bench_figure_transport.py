@@ -0,0 +1,79 @@
+"""
+Benchmark figure serialization for a large time-series trace.
+
+Builds a scatter trace of 5-minute readings and compares the callback
+response body (size, gzip size, and server CPU to build and encode it):
+number lists, plotly.py's default encoding (float64 typed arrays, ISO date
+strings) and FIGURE_TRANSPORT=typed (figures/transport.py).
+
+    python benchmarks/bench_figure_transport.py --points 100000
+"""
+import argparse
+import gzip
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from dash._utils import to_json
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from figures.transport import compact_figure  # noqa: E402
+
+
+def make_frame(points, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "timestamp": pd.date_range(end=pd.Timestamp.now().floor("5min"), periods=points, freq="5min"),
+            "temperature": rng.normal(20, 5, points).round(2),
+        }
+    )
+
+
+def figure(x, y):
+    return go.Figure(go.Scatter(x=x, y=y, mode="lines", name="Temperature"))
+
+
+def response(fig):
+    # what Dash writes for a figure output
+    return to_json({"multi": True, "response": {"temperature-chart": {"figure": fig}}})
+
+
+def measure(build, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.thread_time()
+        body = response(build())
+        best = min(best, time.thread_time() - start)
+    return best * 1000, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'points':>8} {'encoding':>14} {'cpu':>9} {'body':>10} {'gzip':>10}")
+    for points in args.points:
+        df = make_frame(points)
+        x, y = df["timestamp"], df["temperature"]
+        # lists prepared up front: only building and encoding the figure is timed
+        x_list, y_list = x.dt.strftime("%Y-%m-%dT%H:%M:%S").tolist(), y.tolist()
+        modes = {
+            "number lists": lambda: figure(x_list, y_list),
+            "plotly": lambda: figure(x, y),
+            "typed": lambda: compact_figure(figure(x, y)),
+        }
+        for name, build in modes.items():
+            cpu_ms, body = measure(build, args.repeat)
+            packed = len(gzip.compress(body.encode(), 6))
+            print(f"{points:>8,} {name:>14} {cpu_ms:>7.1f}ms {len(body) / 1024:>8.0f}KB {packed / 1024:>8.0f}KB")
+
+
+if __name__ == "__main__":
+    main()
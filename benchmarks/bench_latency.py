@@ -0,0 +1,88 @@
+"""
+Benchmark the ingest latency sketches (datastore/latency.py).
+
+Feeds a week of 5-minute batches (one reading per station, with log-normal
+delivery delays and a slow tail) into the hourly per-provider sketches, and
+reports the time to record one batch, the time to merge p50/p95/p99 for the
+last hour, day and week, the memory held, and the quantile error against
+exact quantiles of the same latencies.
+
+    python benchmarks/bench_latency.py --stations 10000 --providers 40 --hours 168
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from datastore.latency import IngestLatency, LatencySketch  # noqa: E402
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, default=10_000)
+    parser.add_argument("--providers", type=int, default=40)
+    parser.add_argument("--hours", type=int, default=168)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    providers = np.array([f"prov{i % args.providers:02d}" for i in range(args.stations)])
+    end = pd.Timestamp.now().floor("5min")
+    arrivals = pd.date_range(end=end, periods=args.hours * 12, freq="5min")
+
+    latency = IngestLatency(retention_hours=args.hours)
+    recorded = {}
+    elapsed = []
+    for arrival in arrivals:
+        # most readings arrive in 1-5 minutes, 1% are hours late
+        delay = rng.lognormal(np.log(120), 0.6, args.stations)
+        late = rng.random(args.stations) < 0.01
+        delay[late] *= rng.uniform(20, 200, late.sum())
+        batch = pd.DataFrame({"timestamp": arrival - pd.to_timedelta(delay, "s"), "provider": providers})
+        start = time.perf_counter()
+        latency.observe(batch, arrival=arrival)
+        elapsed.append(time.perf_counter() - start)
+        recorded[arrival] = delay
+    print(
+        f"observe: {np.median(elapsed) * 1000:.1f}ms per {args.stations:,}-row batch"
+        f" ({args.stations / np.median(elapsed) / 1e6:.1f}M rows/s), {len(latency.sketches):,} sketches"
+    )
+    nbytes = sum(s.counts.nbytes for s in latency.sketches.values())
+    print(f"memory: {nbytes / 1e6:.2f} MB of bucket counts ({len(recorded) * args.stations * 8 / 1e6:.0f} MB as raw latencies)")
+
+    for name, window in {"hour": pd.Timedelta(hours=1), "day": pd.Timedelta(days=1), "week": pd.Timedelta(days=7)}.items():
+        start = end - window + pd.Timedelta(minutes=5)
+        ms, sketch = timed(lambda: latency.window(start, end + pd.Timedelta(minutes=5)))
+        # the sketches are per arrival hour, so the exact quantiles are over the same whole hours
+        exact = np.concatenate([d for a, d in recorded.items() if a >= start.floor("h")])
+        errors = [abs(sketch.quantile(q) - np.quantile(exact, q)) / np.quantile(exact, q) for q in (0.5, 0.95, 0.99)]
+        summary = sketch.summary()
+        print(
+            f"last {name:>4}: merge {ms:6.2f}ms  {summary['count']:>11,} readings"
+            f"  p50 {summary['p50']:7.1f}s  p95 {summary['p95']:7.1f}s  p99 {summary['p99']:7.1f}s"
+            f"  max error {max(errors) * 100:.2f}%"
+        )
+
+    # what a worker would publish and another merge: every provider's sketch for the day
+    day = latency.by_provider(end - pd.Timedelta(days=1), end + pd.Timedelta(minutes=5))
+    payload = json.dumps({p: s.to_dict() for p, s in day.items()})
+    ms, _ = timed(lambda: [LatencySketch.from_dict(d) for d in json.loads(payload).values()])
+    print(f"serialized per-provider day sketches: {len(payload) / 1e3:.1f} kB, parsed in {ms:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark the home page map callback at increasing station counts.
+
+Compares the old path (sort the full history, group by station, take the
+last row) with the maintained latest-observation index.
+
+    python benchmarks/bench_latest_map.py --readings 48
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from datastore.latest import LatestObservations  # noqa: E402
+from datastore.observations import _compact  # noqa: E402
+
+
+def make_history(n_stations, n_readings, seed=0):
+    rng = np.random.default_rng(seed)
+    n = n_stations * n_readings
+    stations = np.array([f"ST{i:06d}" for i in range(n_stations)])
+    timestamps = pd.date_range(end=pd.Timestamp.now().floor("5min"), periods=n_readings, freq="5min")
+    df = pd.DataFrame(
+        {
+            "timestamp": np.tile(timestamps.to_numpy(), n_stations),
+            "station_id": np.repeat(stations, n_readings),
+            "status": rng.choice(["active", "maintenance", "offline"], n, p=[0.9, 0.07, 0.03]),
+            "latitude": np.repeat(30 + 15 * rng.random(n_stations), n_readings),
+            "longitude": np.repeat(-120 + 45 * rng.random(n_stations), n_readings),
+            "temperature": rng.normal(20, 5, n),
+            "humidity": rng.normal(60, 10, n),
+            "wind_speed": np.abs(rng.normal(8, 3, n)),
+        }
+    )
+    # arrival order is not timestamp order
+    return _compact(df.sample(frac=1, random_state=seed).reset_index(drop=True), "bench")
+
+
+def build_figure(latest_data):
+    # same figure the home page builds in update_map
+    return px.scatter_mapbox(
+        latest_data,
+        lat="latitude",
+        lon="longitude",
+        color="status",
+        hover_name="station_id",
+        hover_data=["temperature", "humidity", "wind_speed", "provider"],
+        zoom=6,
+    )
+
+
+# px.scatter_mapbox is deprecated in plotly 6 but is what the page still uses
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--readings", type=int, default=48, help="readings per station in the history")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # the first plotly express call pays one-off import/template costs
+    build_figure(make_history(10, 1))
+
+    print(f"{'stations':>9} {'rows':>11} {'build':>9} {'sort+groupby':>14} {'index':>9} {'figure':>9} {'callback old':>13} {'callback new':>13}")
+    for n_stations in args.stations:
+        history = make_history(n_stations, args.readings)
+        latest = LatestObservations()
+        start = time.perf_counter()
+        latest.update(history)
+        build = (time.perf_counter() - start) * 1000
+
+        old_query = timed(lambda: history.sort_values("timestamp").groupby("station_id", observed=True).last(), args.repeat)
+        new_query = timed(lambda: latest.view("bench"), args.repeat)
+        figure = timed(lambda: build_figure(latest.view("bench")), args.repeat)
+
+        print(
+            f"{n_stations:>9,} {len(history):>11,} {build:>7.1f}ms {old_query:>12.1f}ms {new_query:>7.2f}ms {figure:>7.1f}ms"
+            f" {old_query + figure:>11.1f}ms {new_query + figure:>11.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
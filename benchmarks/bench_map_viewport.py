@@ -0,0 +1,116 @@
+"""
+Benchmark the home page map at national station counts.
+
+Compares drawing every station with drawing only the stations inside a
+state-sized viewport (grid index query), and with clustering a zoomed-out
+national view.
+
+    python benchmarks/bench_map_viewport.py --stations 10000 50000
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from datastore.latest import LatestObservations  # noqa: E402
+from datastore.spatial import cell_degrees, cluster  # noqa: E402
+
+# px.scatter_mapbox is deprecated in plotly 6 but is what the page still uses
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+# roughly Delaware and Maryland at zoom 8, padded as assets/map_view.js does
+VIEWPORT = (-77.5, 37.5, -74.0, 40.5)
+
+
+def make_latest(n_stations, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        {
+            "timestamp": pd.Timestamp.now().floor("5min"),
+            "station_id": [f"ST{i:06d}" for i in range(n_stations)],
+            "provider": "bench",
+            "status": rng.choice(["active", "maintenance", "offline"], n_stations, p=[0.9, 0.07, 0.03]),
+            "latitude": 25 + 24 * rng.random(n_stations),
+            "longitude": -125 + 58 * rng.random(n_stations),
+            "temperature": rng.normal(20, 5, n_stations),
+            "humidity": rng.normal(60, 10, n_stations),
+            "wind_speed": np.abs(rng.normal(8, 3, n_stations)),
+        }
+    )
+    latest = LatestObservations()
+    latest.update(df)
+    return latest
+
+
+def station_figure(stations):
+    return px.scatter_mapbox(
+        stations,
+        lat="latitude",
+        lon="longitude",
+        color="status",
+        hover_name="station_id",
+        hover_data=["temperature", "humidity", "wind_speed", "provider"],
+        zoom=6,
+    )
+
+
+def cluster_figure(stations, zoom):
+    clusters = cluster(stations, cell_degrees(zoom, 40))
+    return go.Figure(
+        go.Scattermapbox(
+            lat=clusters["latitude"],
+            lon=clusters["longitude"],
+            mode="markers",
+            marker=dict(size=8 + 4 * np.log2(clusters["stations"])),
+            customdata=clusters[["stations", "active", "station_id"]],
+        )
+    )
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # the first plotly express call pays one-off import/template costs
+    station_figure(make_latest(10).view())
+
+    print(f"{'stations':>9} {'view':>16} {'drawn':>8} {'query':>9} {'figure':>9} {'payload':>10}")
+    for n_stations in args.stations:
+        latest = make_latest(n_stations)
+        latest.grid()
+        cases = {
+            "all stations": (lambda: latest.view(), station_figure),
+            "viewport": (lambda: latest.view_bounds("all", VIEWPORT), station_figure),
+            "clusters zoom 4": (lambda: latest.view(), lambda s: cluster_figure(s, 4)),
+        }
+        for name, (query, figure) in cases.items():
+            query_ms, stations = timed(query, args.repeat)
+            figure_ms, fig = timed(lambda: figure(stations).to_json(), args.repeat)
+            drawn = len(stations) if figure is station_figure else len(cluster(stations, cell_degrees(4, 40)))
+            print(
+                f"{n_stations:>9,} {name:>16} {drawn:>8,} {query_ms:>7.2f}ms {figure_ms:>7.1f}ms"
+                f" {len(fig) / 1024:>8.0f}KB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Benchmark the providers page sidebar: one card per provider.
+
+Compares the original cards (a max() over all providers and a name scan per
+card, and a DataFrame, go.Figure and dcc.Graph per sparkline, all in the
+layout) with pages/providers.py: shared columns and inline SVG card graphics
+computed once, and a grid that fetches only the first block of rows. Reports
+build time, JSON serialization time, payload size and component count.
+
+    python benchmarks/bench_provider_cards.py --providers 100 500 2000
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+
+import dash
+import dash_bootstrap_components as dbc
+import numpy as np
+import pandas as pd
+import plotly
+import plotly.graph_objects as go
+from dash import dcc, html
+from dash.development.base_component import Component
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# pages register themselves with the app, so one has to exist first
+dash.Dash(__name__, use_pages=True, pages_folder="")
+
+from figures.transport import compact_figure  # noqa: E402
+from pages import providers as page  # noqa: E402
+
+
+def make_providers(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "name": [f"Vendor {i}" for i in range(n)],
+            "color": rng.choice(["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728"], n),
+            "lat": 25 + 25 * rng.random(n),
+            "lon": -125 + 58 * rng.random(n),
+            "frequency": rng.integers(1, 60, n).astype(float),
+            "status": "Active",
+            "station_count": rng.integers(1, 300, n),
+        }
+    )
+
+
+def original_cards(providers):
+    # the cards as pages/providers.py built them before
+    def mini_graph(name):
+        provider_hash = hash(name) % 100
+        dates = pd.date_range(end=datetime.datetime.now(), periods=24, freq="h")
+        values = [
+            15 + provider_hash % 10 + (3 + provider_hash % 5) * np.sin((0.2 + provider_hash % 10 / 30) * i + provider_hash % 6)
+            for i in range(24)
+        ]
+        df = pd.DataFrame({"timestamp": dates, "value": values})
+        color = next((p["color"] for p in providers if p["name"] == name), "#1f77b4")
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=df["timestamp"], y=df["value"], mode="lines", line=dict(width=2, color=color)))
+        fig.update_layout(margin=dict(l=0, r=0, t=0, b=0), height=40, xaxis=dict(showticklabels=False))
+        return fig
+
+    def card(provider):
+        max_stations = max(p["station_count"] for p in providers)
+        progress = provider["station_count"] / max_stations * 100
+        count = provider["station_count"]
+        color = page.status_colors["high" if count >= 100 else "medium" if count >= 50 else "low"]
+        return dbc.Card(
+            dbc.CardBody(
+                [
+                    dbc.Row(
+                        [
+                            dbc.Col(html.H6(provider["name"]), width=10),
+                            dbc.Col(html.Div(html.Span("●", style={"color": color})), width=2),
+                        ]
+                    ),
+                    dbc.Row(
+                        dbc.Col(
+                            [
+                                html.Div(
+                                    html.Div(
+                                        [dbc.Progress(value=progress, color=color), html.Span(f"{progress:.1f}%")],
+                                        style={"position": "relative"},
+                                    )
+                                ),
+                                html.Div(
+                                    [
+                                        dcc.Graph(figure=compact_figure(mini_graph(provider["name"]))),
+                                        html.Div(f"{provider['frequency']:.1f}/h"),
+                                    ]
+                                ),
+                            ],
+                            width=12,
+                        )
+                    ),
+                ]
+            )
+        )
+
+    return [card(p) for p in providers]
+
+
+def grid_sidebar(providers_df):
+    # the layout's grid plus the first block it requests
+    data = page.provider_table(providers_df)
+    rows, count = data["index"].rows(0, 50, [{"colId": "station_count", "sort": "desc"}])
+    return [page.create_provider_grid(), {"rowData": rows, "rowCount": count}]
+
+
+def count_components(node):
+    if isinstance(node, (list, tuple)):
+        return sum(count_components(n) for n in node)
+    if isinstance(node, Component):
+        return 1 + count_components(getattr(node, "children", None))
+    return 0
+
+
+def measure(build, arg):
+    start = time.perf_counter()
+    cards = build(arg)
+    built = time.perf_counter()
+    payload = json.dumps(html.Div(cards), cls=plotly.utils.PlotlyJSONEncoder)
+    serialized = time.perf_counter()
+    return (built - start) * 1000, (serialized - built) * 1000, len(payload), count_components(cards)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--providers", type=int, nargs="+", default=[100, 500, 2000])
+    args = parser.parse_args()
+
+    print(f"{'providers':>9}  {'variant':<9} {'build':>9} {'json':>9} {'payload':>10} {'components':>11}")
+    for n in args.providers:
+        providers_df = make_providers(n)
+        variants = {"original": (original_cards, providers_df.to_dict("records")), "grid": (grid_sidebar, providers_df)}
+        for name, (build, arg) in variants.items():
+            build_ms, json_ms, size, components = measure(build, arg)
+            print(f"{n:>9,}  {name:<9} {build_ms:7.1f}ms {json_ms:7.1f}ms {size / 1e6:8.2f}MB {components:>11,}")
+
+        # a grid block request with a sort and filter not seen before (the index caches repeated ones)
+        index = page.provider_table(providers_df)["index"]
+        start = time.perf_counter()
+        index.rows(
+            100,
+            150,
+            [{"colId": "frequency", "sort": "desc"}, {"colId": "name", "sort": "asc"}],
+            {"name": {"filterType": "text", "type": "contains", "filter": "1"}},
+        )
+        print(f"{n:>9,}  grid rows request (sorted, filtered): {(time.perf_counter() - start) * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
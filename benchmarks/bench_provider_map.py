@@ -0,0 +1,110 @@
+"""
+Compare the providers page map built with one trace per provider against
+one vectorized trace per status class.
+
+Reports build time, JSON serialization time, payload size and trace count.
+Browser render time grows with the number of traces, so the trace count is
+the proxy for client-side cost.
+
+    python benchmarks/bench_provider_map.py --providers 100 500 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import plotly.graph_objects as go
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from figures import figures_main  # noqa: E402
+
+status_colors = {"high": "green", "medium": "yellow", "low": "pink"}
+
+
+def make_providers(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "name": np.array([f"Provider {i}" for i in range(n)]),
+        "lat": 25 + 25 * rng.random(n),
+        "lon": -125 + 58 * rng.random(n),
+        "station_count": rng.integers(1, 300, n),
+        "frequency": rng.integers(1, 60, n).astype(float),
+    }
+
+
+def per_provider_figure(p):
+    # the original providers.update_map loop
+    fig = go.Figure()
+    for i in range(len(p["name"])):
+        count = int(p["station_count"][i])
+        status = "high" if count >= 100 else "medium" if count >= 50 else "low"
+        fig.add_trace(
+            go.Scattermapbox(
+                lat=[p["lat"][i]],
+                lon=[p["lon"][i]],
+                mode="markers+text",
+                marker=go.scattermapbox.Marker(size=35, color=status_colors[status], opacity=0.8),
+                text=[f"{count}"],
+                textposition="middle center",
+                textfont=dict(size=12, color="black"),
+                name=p["name"][i],
+                showlegend=True,
+                hovertext=[f"{p['name'][i]}<br>Stations: {count}"],
+                hoverinfo="text",
+            )
+        )
+    return fig
+
+
+def status_class_figure(p):
+    count = p["station_count"]
+    status = np.select([count >= 100, count >= 50], ["high", "medium"], default="low")
+    hover = np.char.add(np.char.add(p["name"], "<br>Stations: "), count.astype(str))
+    fig = go.Figure()
+    fig.add_traces(
+        figures_main.status_traces(
+            p["lat"],
+            p["lon"],
+            status,
+            status_colors,
+            text=count.astype(str),
+            hovertext=hover,
+            marker=dict(size=35, opacity=0.8),
+            mode="markers+text",
+            textposition="middle center",
+            textfont=dict(size=12, color="black"),
+            showlegend=True,
+        )
+    )
+    return fig
+
+
+def measure(build, providers):
+    start = time.perf_counter()
+    fig = build(providers)
+    built = time.perf_counter()
+    payload = fig.to_json()
+    done = time.perf_counter()
+    return len(fig.data), (built - start) * 1000, (done - built) * 1000, len(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--providers", type=int, nargs="+", default=[100, 500, 2000])
+    args = parser.parse_args()
+
+    # warm up plotly's validators so the first row is not penalised
+    status_class_figure(make_providers(3))
+
+    print(f"{'providers':>9} {'mode':>13} {'traces':>7} {'build':>10} {'to_json':>10} {'payload':>12}")
+    for n in args.providers:
+        providers = make_providers(n)
+        for mode, build in [("per-provider", per_provider_figure), ("status-class", status_class_figure)]:
+            traces, build_ms, json_ms, size = measure(build, providers)
+            print(f"{n:>9,} {mode:>13} {traces:>7,} {build_ms:>8.1f}ms {json_ms:>8.1f}ms {size / 1024:>9.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
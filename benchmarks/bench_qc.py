@@ -0,0 +1,74 @@
+"""
+Benchmark the observation QC engine (datastore/qc.py).
+
+Generates 5-minute observations with injected spikes, out-of-range values
+and stuck sensors, then times one pass over the whole history and the same
+history checked incrementally in ingest-sized batches (one reading per
+station each), and reports rows per second on one core.
+
+    python benchmarks/bench_qc.py --stations 10000 --hours 24
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from datastore.qc import QualityControl  # noqa: E402
+
+
+def make_history(n_stations, periods, seed=0):
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range(end=pd.Timestamp.now().floor("5min"), periods=periods, freq="5min")
+    n = n_stations * periods
+    df = pd.DataFrame(
+        {
+            # ingest order: every station's reading for one slot, then the next slot
+            "timestamp": np.repeat(timestamps.to_numpy(), n_stations),
+            "station_id": pd.Categorical(np.tile([f"ST{i:06d}" for i in range(n_stations)], periods)),
+            "temperature": rng.normal(20, 3, n).astype(np.float32),
+            "humidity": rng.normal(60, 10, n).astype(np.float32),
+            "wind_speed": np.abs(rng.normal(8, 3, n)).astype(np.float32),
+        }
+    )
+    bad = rng.choice(n, n // 1000, replace=False)
+    df.loc[bad[: len(bad) // 2], "temperature"] += 30  # spikes
+    df.loc[bad[len(bad) // 2 :], "humidity"] = 130  # out of range
+    stuck = df["station_id"].cat.codes.to_numpy() < n_stations // 100
+    df.loc[stuck, "temperature"] = 12.5  # 1% of stations report one value
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stations", type=int, default=10_000)
+    parser.add_argument("--hours", type=int, default=24)
+    args = parser.parse_args()
+
+    periods = args.hours * 12
+    df = make_history(args.stations, periods)
+    print(f"{len(df):,} observations ({args.stations:,} stations x {periods} readings)")
+
+    start = time.perf_counter()
+    flags = QualityControl().check(df)
+    full = time.perf_counter() - start
+    print(f"one pass:    {full:6.2f}s  {len(df) / full / 1e6:5.1f}M rows/s  {np.count_nonzero(flags):,} flagged")
+
+    qc = QualityControl()
+    batches = [df.iloc[i : i + args.stations] for i in range(0, len(df), args.stations)]
+    start = time.perf_counter()
+    incremental = np.concatenate([qc.check(batch) for batch in batches])
+    elapsed = time.perf_counter() - start
+    print(
+        f"incremental: {elapsed:6.2f}s  {len(df) / elapsed / 1e6:5.1f}M rows/s"
+        f"  {elapsed / len(batches) * 1000:.1f}ms per {args.stations:,}-row batch"
+        f"  (same flags: {bool((incremental == flags).all())})"
+    )
+
+
+if __name__ == "__main__":
+    main()
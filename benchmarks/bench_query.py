@@ -0,0 +1,88 @@
+"""
+Benchmark the query engine (datastore/query.py).
+
+Loads synthetic 5-minute observations for several providers and times the
+same queries as planned (rollups where possible) and forced onto a raw scan:
+all providers, one provider, a list of providers, a zoomed-in window and a
+station filter, in memory and dataset storage.
+
+    python benchmarks/bench_query.py --providers 10 --stations 200 --days 7
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench_dataset import make_provider  # noqa: E402
+from datastore import query as engine  # noqa: E402
+from datastore.observations import ObservationStore  # noqa: E402
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def raw(store, providers, start, end, stations, metrics, aggregation, bucket):
+    # the same query with the planner bypassed
+    planned = engine.plan(store, providers, stations, metrics, aggregation, bucket)
+    forced = engine.QueryPlan("raw", planned.freq, planned.providers)
+    return engine._query_raw(store, forced, start, end, stations, metrics, aggregation)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--providers", type=int, default=10)
+    parser.add_argument("--stations", type=int, default=200, help="stations per provider")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {}
+        for i in range(args.providers):
+            name = f"prov{i:02d}"
+            files[name] = f"{name}.parquet"
+            make_provider(name, args.stations, args.days, i).to_parquet(os.path.join(tmp, files[name]))
+        names = list(files)
+        newest = pd.Timestamp.now().floor("5min")
+
+        cases = {
+            "all, hourly": dict(providers="all", bucket="hourly"),
+            "one, hourly": dict(providers=names[0], bucket="hourly"),
+            "three, 6h max": dict(providers=names[:3], bucket="6h", aggregation="max"),
+            "all, 1 day 5min": dict(providers="all", start=newest - pd.Timedelta(days=1), bucket="5min"),
+            "5 stations": dict(providers="all", stations=[f"PROV00_{i:04d}" for i in range(5)], bucket="hourly"),
+        }
+
+        print(f"{'storage':>8} {'query':>16} {'plan':>8} {'buckets':>8} {'planned':>9} {'raw scan':>9}")
+        for storage in ("memory", "dataset"):
+            store = ObservationStore(
+                data_dir=tmp,
+                provider_files=files,
+                retention_hours=0,
+                storage=storage,
+                dataset_dir=os.path.join(tmp, "dataset"),
+            ).load()
+            for name, case in cases.items():
+                params = dict(start=None, end=None, stations=None, metrics=("temperature",), aggregation="mean")
+                params.update(case)
+                planned_ms, result = timed(lambda: engine.query(store=store, **params), args.repeat)
+                raw_ms, _ = timed(lambda: raw(store, **params), args.repeat)
+                print(
+                    f"{storage:>8} {name:>16} {result.plan.source:>8} {len(result):>8,}"
+                    f" {planned_ms:>7.1f}ms {raw_ms:>7.1f}ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
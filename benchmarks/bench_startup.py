@@ -0,0 +1,65 @@
+"""
+Measure worker startup time for each PAGE_LOADING mode.
+
+Each mode runs in a fresh interpreter. "app ready" is when create_app()
+returns and the worker can accept requests; "pages warm" is when /ready
+reports every page resource built.
+
+    python benchmarks/bench_startup.py --runs 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+CHILD = """
+import json, time
+start = time.perf_counter()
+from application import create_app
+imported = time.perf_counter()
+application = create_app()
+created = time.perf_counter()
+client = application.server.test_client()
+while not all(p["warm"] for p in client.get("/ready").json["pages"].values()):
+    if time.perf_counter() - created > 120:
+        break
+    time.sleep(0.01)
+warm = time.perf_counter()
+print("RESULT", json.dumps({"import": imported - start, "app": created - start, "warm": warm - start}))
+"""
+
+# in lazy mode nothing warms on its own, so build the pages the way a first request would
+LAZY_FIRST_REQUEST = CHILD.replace(
+    "client = application.server.test_client()",
+    "client = application.server.test_client()\nfrom services.warmup import warm_up\nwarm_up()",
+)
+
+
+def run(mode):
+    env = dict(os.environ, PAGE_LOADING=mode)
+    code = LAZY_FIRST_REQUEST if mode == "lazy" else CHILD
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    # page modules print while loading, possibly from the warm-up thread
+    return json.loads(out.rsplit("RESULT ", 1)[1].splitlines()[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--modes", nargs="+", default=["eager", "background", "lazy"])
+    args = parser.parse_args()
+
+    print(f"{'mode':>10} {'imports':>9} {'app ready':>10} {'pages warm':>11}")
+    for mode in args.modes:
+        results = [run(mode) for _ in range(args.runs)]
+        best = {key: min(r[key] for r in results) for key in results[0]}
+        print(f"{mode:>10} {best['import']:>8.2f}s {best['app']:>9.2f}s {best['warm']:>10.2f}s")
+
+
+if __name__ == "__main__":
+    main()
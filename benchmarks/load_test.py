@@ -0,0 +1,143 @@
+"""
+Load-test the home page callbacks against gunicorn at several worker counts.
+
+For each worker count a preloaded gunicorn server is started on a free port,
+then concurrent clients POST the four home page callbacks (map, temperature,
+ingest rate, provider status) for a fixed duration. The figure cache is
+disabled so every request does the callback work.
+
+    python benchmarks/load_test.py --workers 1 2 4 8 --clients 16 --duration 20
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+HOME_CALLBACKS = [
+    ("map", "figure"),
+    ("temperature-chart", "figure"),
+    ("ingest-rate-chart", "figure"),
+    ("provider-status-container", "children"),
+]
+PROVIDERS = ["all", "deldot", "deldeos", "colorado"]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def callback_body(component_id, prop, provider):
+    return json.dumps(
+        {
+            "output": f"{component_id}.{prop}",
+            "outputs": {"id": component_id, "property": prop},
+            "inputs": [{"id": "provider-dropdown", "property": "value", "value": provider}],
+            "changedPropIds": ["provider-dropdown.value"],
+        }
+    ).encode()
+
+
+def start_server(workers, threads, port):
+    env = dict(
+        os.environ,
+        GUNICORN_WORKERS=str(workers),
+        GUNICORN_THREADS=str(threads),
+        PORT=str(port),
+        FIGURE_CACHE_TYPE="NullCache",
+    )
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:server"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=1) as r:
+                if r.status == 200:
+                    return proc
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.25)
+    proc.terminate()
+    raise RuntimeError(f"server with {workers} workers did not become ready")
+
+
+def run_load(port, clients, duration):
+    url = f"http://127.0.0.1:{port}/_dash-update-component"
+    bodies = [callback_body(c, p, provider) for c, p in HOME_CALLBACKS for provider in PROVIDERS]
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    stop = time.perf_counter() + duration
+
+    def client(index):
+        nonlocal errors
+        i = index
+        while time.perf_counter() < stop:
+            request = urllib.request.Request(
+                url, data=bodies[i % len(bodies)], headers={"Content-Type": "application/json"}
+            )
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=60) as r:
+                    r.read()
+                ok = True
+            except (urllib.error.URLError, OSError):
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+            i += 1
+
+    with ThreadPoolExecutor(clients) as pool:
+        list(pool.map(client, range(clients)))
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--threads", type=int, default=4, help="threads per worker")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent client connections")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per worker count")
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} {'requests':>9} {'req/s':>8} {'p50':>9} {'p95':>9} {'errors':>7}")
+    for workers in args.workers:
+        port = free_port()
+        proc = start_server(workers, args.threads, port)
+        try:
+            run_load(port, args.clients, 2)  # warm up
+            latencies, errors = run_load(port, args.clients, args.duration)
+        finally:
+            proc.terminate()
+            proc.wait()
+        latencies.sort()
+        p50 = statistics.median(latencies) * 1000 if latencies else float("nan")
+        p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else float("nan")
+        print(
+            f"{workers:>7} {len(latencies):>9,} {len(latencies) / args.duration:>8.1f}"
+            f" {p50:>7.1f}ms {p95:>7.1f}ms {errors:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# one expected report per station and slot
+SLOT = pd.Timedelta(minutes=5)
+SLOTS_PER_DAY = int(pd.Timedelta(days=1) / SLOT)
+DAY_BYTES = (SLOTS_PER_DAY + 7) // 8
+
+# days of report bitmaps kept, counted back from the newest report
+AVAILABILITY_DAYS = int(os.getenv("AVAILABILITY_DAYS", "365"))
+
+# days before the newest one are packed once no more reports are expected for them
+HOT_DAYS = 2
+
+# a packed day keeps the missed slot numbers (2 bytes each) of stations that
+# missed at most this many slots, instead of their 36-byte bitmap
+MAX_GAPS = 8
+
+
+def _slot_mask(first, last):
+    # bitmap bytes with the bits of slots first..last-1 of a day set
+    bits = np.zeros(DAY_BYTES * 8, dtype=bool)
+    bits[first:last] = True
+    return np.packbits(bits)
+
+
+class _PackedDay:
+    """
+    A finished day, stored by how much of it each station reported.
+
+    Stations that reported every slot are one bit in a station bitset, those
+    that missed a few slots keep just the missed slot numbers, and only the
+    rest keep a full bitmap. Stations that never reported take no space.
+    """
+
+    def __init__(self, bitmaps):
+        missed = SLOTS_PER_DAY - np.bitwise_count(bitmaps).sum(axis=1, dtype=np.int64)
+        self.n_stations = len(bitmaps)
+        self.full = np.packbits(missed == 0)
+        gaps = np.flatnonzero((missed > 0) & (missed <= MAX_GAPS))
+        # one entry per missed slot: its station and slot number
+        unreceived = ~np.unpackbits(bitmaps[gaps], axis=1, count=SLOTS_PER_DAY).astype(bool)
+        gap_index, self.gap_slots = np.nonzero(unreceived)
+        self.gap_stations = gaps[gap_index].astype(np.int32)
+        self.gap_slots = self.gap_slots.astype(np.uint16)
+        self.gaps = gaps.astype(np.int32)
+        self.partial = np.flatnonzero((missed > MAX_GAPS) & (missed < SLOTS_PER_DAY)).astype(np.int32)
+        self.bitmaps = bitmaps[self.partial]
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.full, self.gaps, self.gap_stations, self.gap_slots, self.partial, self.bitmaps))
+
+    def unpack(self, n_stations):
+        bitmaps = np.zeros((n_stations, DAY_BYTES), dtype=np.uint8)
+        bitmaps[self._full_stations()] = _slot_mask(0, SLOTS_PER_DAY)
+        bitmaps[self.gaps] = _slot_mask(0, SLOTS_PER_DAY)
+        np.bitwise_and.at(
+            bitmaps,
+            (self.gap_stations, self.gap_slots >> 3),
+            ~(0x80 >> (self.gap_slots & 7)).astype(np.uint8),
+        )
+        bitmaps[self.partial] = self.bitmaps
+        return bitmaps
+
+    def _full_stations(self):
+        return np.flatnonzero(np.unpackbits(self.full, count=self.n_stations))
+
+    def counts(self, lo, hi, mask):
+        """
+        Return the stations that reported in slots lo..hi-1 and their report counts.
+        """
+        full = self._full_stations()
+        in_window = (self.gap_slots >= lo) & (self.gap_slots < hi)
+        missed = np.bincount(np.searchsorted(self.gaps, self.gap_stations[in_window]), minlength=len(self.gaps))
+        stations = np.concatenate([full, self.gaps, self.partial])
+        reports = np.concatenate(
+            [
+                np.full(len(full) + len(self.gaps), hi - lo, dtype=np.int64),
+                np.bitwise_count(self.bitmaps & mask).sum(axis=1, dtype=np.int64),
+            ]
+        )
+        reports[len(full) : len(full) + len(self.gaps)] -= missed
+        return stations, reports
+
+
+class Availability:
+    """
+    Per-station "report received" bitmaps, one bit per 5-minute slot.
+
+    Expected-vs-actual reports for any set of stations and time window are
+    popcounts over the bitmaps: actual is the number of set bits, expected
+    the number of slots since each station's first report. The newest days
+    are kept as dense (station x slot) bitmaps that batches set bits in;
+    older days are packed, so a station reporting every slot of a day (or
+    none) costs no bitmap bytes.
+    """
+
+    def __init__(self):
+        self.stations = pd.Index([], dtype=object)
+        self.provider_names = pd.Index([], dtype=object)
+        self.provider_codes = np.zeros(0, dtype=np.int64)
+        self.first_slot = np.zeros(0, dtype=np.int64)
+        self.newest_slot = None
+        self.days = {}  # day number -> dense uint8 bitmaps or _PackedDay
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.stations)
+
+    def _rows(self, station_ids, providers, slots):
+        # station rows of a batch, adding rows for new stations
+        codes, names = pd.factorize(station_ids)
+        rows = self.stations.get_indexer(names)
+        new = rows < 0
+        if new.any():
+            rows[new] = np.arange(len(self.stations), len(self.stations) + new.sum())
+            first = np.full(len(names), np.iinfo(np.int64).max)
+            np.minimum.at(first, codes, slots)
+            provider = np.empty(len(names), dtype=object)
+            provider[codes] = providers
+            provider = provider[new]
+            unknown = pd.Index(provider).difference(self.provider_names, sort=False).unique()
+            if len(unknown):
+                self.provider_names = self.provider_names.append(pd.Index(unknown, dtype=object))
+            self.stations = self.stations.append(pd.Index(names[new], dtype=object))
+            self.provider_codes = np.concatenate([self.provider_codes, self.provider_names.get_indexer(provider)])
+            self.first_slot = np.concatenate([self.first_slot, first[new]])
+        rows = rows[codes]
+        # a late report can move a known station's first slot back
+        np.minimum.at(self.first_slot, rows, slots)
+        return rows
+
+    def _dense(self, day):
+        bitmaps = self.days.get(day)
+        if isinstance(bitmaps, _PackedDay):
+            bitmaps = bitmaps.unpack(len(self.stations))
+        elif bitmaps is None:
+            bitmaps = np.zeros((len(self.stations), DAY_BYTES), dtype=np.uint8)
+        elif len(bitmaps) < len(self.stations):
+            bitmaps = np.vstack([bitmaps, np.zeros((len(self.stations) - len(bitmaps), DAY_BYTES), dtype=np.uint8)])
+        self.days[day] = bitmaps
+        return bitmaps
+
+    def update(self, batch):
+        """
+        Set the slot bits of a batch of observations.
+        """
+        if batch.empty:
+            return
+        slots = batch["timestamp"].to_numpy("datetime64[ns]").view(np.int64) // SLOT.value
+        station_ids = batch["station_id"].astype(str).to_numpy()
+        providers = batch["provider"].astype(str).to_numpy()
+        with self._lock:
+            rows = self._rows(station_ids, providers, slots)
+            days, positions = np.divmod(slots, SLOTS_PER_DAY)
+            for day in np.unique(days):
+                in_day = days == day
+                bitmaps = self._dense(int(day))
+                # bits are numbered as np.packbits does, most significant first
+                np.bitwise_or.at(
+                    bitmaps,
+                    (rows[in_day], positions[in_day] >> 3),
+                    (0x80 >> (positions[in_day] & 7)).astype(np.uint8),
+                )
+            newest = int(slots.max())
+            self.newest_slot = newest if self.newest_slot is None else max(self.newest_slot, newest)
+            newest_day = self.newest_slot // SLOTS_PER_DAY
+            for day in list(self.days):
+                if day <= newest_day - AVAILABILITY_DAYS:
+                    del self.days[day]
+                elif day <= newest_day - HOT_DAYS and not isinstance(self.days[day], _PackedDay):
+                    self.days[day] = _PackedDay(self.days[day])
+
+    @property
+    def newest(self):
+        return None if self.newest_slot is None else pd.Timestamp(self.newest_slot * SLOT.value)
+
+    def counts(self, start, end, groups=None):
+        """
+        Return (expected, actual) reports per group in the slots overlapping [start, end).
+
+        `groups` gives each station's group code (a negative code leaves the
+        station out); without it every station is in group 0. Slots after the
+        newest report are not expected yet.
+        """
+        groups = np.zeros(len(self.stations), dtype=np.int64) if groups is None else np.asarray(groups)
+        n_groups = int(groups.max()) + 1 if len(groups) else 0
+        expected = np.zeros(n_groups, dtype=np.int64)
+        actual = np.zeros(n_groups, dtype=np.int64)
+        if self.newest_slot is None or n_groups == 0:
+            return expected, actual
+        # every slot overlapping [start, end)
+        first = pd.Timestamp(start).value // SLOT.value
+        last = min(-(-pd.Timestamp(end).value // SLOT.value), self.newest_slot + 1)
+        if last <= first:
+            return expected, actual
+
+        with self._lock:
+            included = groups >= 0
+            per_station = np.clip(last - np.maximum(first, self.first_slot[: len(groups)]), 0, None)
+            expected += np.bincount(groups[included], weights=per_station[included], minlength=n_groups).astype(np.int64)
+            for day in range(first // SLOTS_PER_DAY, (last - 1) // SLOTS_PER_DAY + 1):
+                bitmaps = self.days.get(day)
+                if bitmaps is None:
+                    continue
+                lo = max(first - day * SLOTS_PER_DAY, 0)
+                hi = min(last - day * SLOTS_PER_DAY, SLOTS_PER_DAY)
+                mask = _slot_mask(lo, hi)
+                if isinstance(bitmaps, _PackedDay):
+                    stations, reports = bitmaps.counts(lo, hi, mask)
+                else:
+                    stations = np.arange(len(bitmaps))
+                    reports = np.bitwise_count(bitmaps & mask).sum(axis=1, dtype=np.int64)
+                keep = stations < len(groups)
+                stations, reports = stations[keep], reports[keep]
+                keep = groups[stations] >= 0
+                actual += np.bincount(groups[stations[keep]], weights=reports[keep], minlength=n_groups).astype(
+                    np.int64
+                )
+        return expected, actual
+
+    def by_provider(self, start, end):
+        """
+        Return expected and actual reports and availability (%) per provider.
+        """
+        expected, actual = self.counts(start, end, self.provider_codes)
+        table = pd.DataFrame(
+            {"expected": expected, "actual": actual}, index=pd.Index(self.provider_names[: len(expected)], name="provider")
+        )
+        table["availability"] = 100 * table["actual"] / table["expected"].replace(0, np.nan)
+        return table
+
+    def memory_usage(self):
+        days = sum(d.nbytes for d in self.days.values())
+        return days + self.first_slot.nbytes + self.provider_codes.nbytes
@@ -0,0 +1,317 @@
+import glob
+import hashlib
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single development server process writes the dataset
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs
+
+# column types of the stored files; the provider and day come from the directory names
+SCHEMA = pa.schema(
+    [
+        ("timestamp", pa.timestamp("ns")),
+        ("station_id", pa.string()),
+        ("status", pa.string()),
+        ("latitude", pa.float32()),
+        ("longitude", pa.float32()),
+        ("temperature", pa.float32()),
+        ("humidity", pa.float32()),
+        ("wind_speed", pa.float32()),
+        ("qc", pa.uint16()),
+    ]
+)
+
+PARTITIONING = ds.partitioning(pa.schema([("provider", pa.string()), ("date", pa.date32())]), flavor="hive")
+
+# a day partition's files written under one prefix are merged into one file once the day is over,
+# or as soon as it has this many of them
+COMPACT_FILES = int(os.getenv("OBSERVATION_COMPACT_FILES", "64"))
+
+# schema metadata key of a merged file: the names of the files it holds
+MERGED_KEY = b"merged_names"
+
+
+def _timestamp(value):
+    return pa.scalar(pd.Timestamp(value).as_unit("ns").value, type=pa.timestamp("ns"))
+
+
+def _file_name(path):
+    # the name a file was written under: part-<name>.arrow
+    return os.path.basename(path)[len("part-") : -len(".arrow")]
+
+
+def _read_file(path):
+    # the file's rows in SCHEMA (older files may lack columns) and the names it holds
+    with pa.OSFile(path, "rb") as source:
+        reader = pa.ipc.open_file(source)
+        table = reader.read_all()
+        merged = (reader.schema.metadata or {}).get(MERGED_KEY)
+    arrays = [table[f.name] if f.name in table.column_names else pa.nulls(len(table), f.type) for f in SCHEMA]
+    names = merged.decode().split(",") if merged else [_file_name(path)]
+    return pa.Table.from_arrays(arrays, schema=SCHEMA), names
+
+
+def _merged_names(directory):
+    names = set()
+    for path in glob.glob(os.path.join(directory, "part-*merged-*.arrow")):
+        try:
+            with pa.OSFile(path, "rb") as source:
+                merged = (pa.ipc.open_file(source).schema.metadata or {}).get(MERGED_KEY)
+        except FileNotFoundError:
+            continue
+        if merged:
+            names.update(merged.decode().split(","))
+    return names
+
+
+class ObservationDataset:
+    """
+    Observations stored as uncompressed Arrow IPC files under
+    provider=<name>/date=<YYYY-MM-DD>/.
+
+    Files are opened through memory maps, so the pages of a file are shared
+    by every process reading it (the OS page cache) instead of being copied
+    into each one. A query only opens the partitions its provider and time
+    range can match; timestamp and station_id predicates are then applied
+    while scanning those files.
+
+    Each write goes to a named file per partition, written to a hidden
+    temporary file and renamed into place: writing the same name again
+    replaces it, so processes that write the same batch agree on the result.
+    compact() merges a partition's small files into one, which remembers
+    their names so that writing one again is skipped. Reads re-list the
+    files and retry once when a file was deleted by another process since
+    the last listing.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._dataset = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def refresh(self):
+        """
+        Re-list the partition files, after this or another process wrote some.
+        """
+        with self._lock:
+            if not glob.glob(os.path.join(self.root, "provider=*", "date=*", "*.arrow")):
+                self._dataset = None
+            else:
+                self._dataset = ds.dataset(
+                    self.root,
+                    schema=pa.unify_schemas([SCHEMA, PARTITIONING.schema]),
+                    format="ipc",
+                    partitioning=PARTITIONING,
+                    filesystem=pyarrow.fs.LocalFileSystem(use_mmap=True),
+                )
+        return self
+
+    @property
+    def dataset(self):
+        if self._dataset is None:
+            self.refresh()
+        return self._dataset
+
+    def _retry(self, read):
+        # the listing may name files another process has since deleted or merged
+        dataset = self.dataset
+        if dataset is None:
+            return read(None)
+        try:
+            return read(dataset)
+        except FileNotFoundError:
+            return read(self.refresh().dataset)
+
+    @contextmanager
+    def _partition_lock(self, directory):
+        # writes and merges of one partition are serialized across threads and processes
+        with self._write_lock, open(os.path.join(directory, ".lock"), "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    @staticmethod
+    def _write_file(directory, name, table):
+        path = os.path.join(directory, f"part-{name}.arrow")
+        tmp = os.path.join(directory, f".part-{name}.{os.getpid()}.tmp")
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, path)
+        return path
+
+    def write(self, df, name):
+        """
+        Write a frame with a provider column as one file per provider and day.
+
+        Partitions that already merged a file of this name are skipped.
+        """
+        table_columns = SCHEMA.names
+        days = df["timestamp"].dt.floor("D")
+        for (provider, day), rows in df.groupby([df["provider"].astype(str).to_numpy(), days], sort=False):
+            directory = os.path.join(self.root, f"provider={provider}", f"date={day.date().isoformat()}")
+            os.makedirs(directory, exist_ok=True)
+            rows = rows.reindex(columns=table_columns)
+            arrays = []
+            for field in SCHEMA:
+                values = rows[field.name]
+                if pa.types.is_string(field.type):
+                    # categoricals are stored as plain strings and come back as categoricals
+                    values = values.astype(object)
+                arrays.append(pa.array(values, type=field.type, from_pandas=True))
+            table = pa.Table.from_arrays(arrays, schema=SCHEMA)
+            with self._partition_lock(directory):
+                if name not in _merged_names(directory):
+                    self._write_file(directory, name, table)
+        return self.refresh()
+
+    def compact(self, prefix, before=None):
+        """
+        Merge each day partition's files named with prefix into one file.
+
+        Days before `before` (closed days, which get few new files) are
+        merged, as are days with at least COMPACT_FILES such files. Returns
+        the number of files merged away.
+        """
+        last = pd.Timestamp(before).floor("D").date().isoformat() if before is not None else None
+        removed = 0
+        for directory in glob.glob(os.path.join(self.root, "provider=*", "date=*")):
+            pattern = os.path.join(directory, f"part-{prefix}*.arrow")
+            count = len(glob.glob(pattern))
+            closed = last is not None and os.path.basename(directory)[len("date=") :] < last
+            if count < 2 or (count < COMPACT_FILES and not closed):
+                continue
+            try:
+                with self._partition_lock(directory):
+                    # listed again: another process may have merged them meanwhile
+                    files = sorted(glob.glob(pattern))
+                    if len(files) < 2:
+                        continue
+                    tables, names = [], set()
+                    for path in files:
+                        table, held = _read_file(path)
+                        tables.append(table)
+                        names.update(held)
+                    merged = ",".join(sorted(names))
+                    table = pa.concat_tables(tables).replace_schema_metadata({MERGED_KEY: merged.encode()})
+                    # a new name per content, so a stale listing fails (and is refreshed) instead of misreading
+                    digest = hashlib.md5(merged.encode()).hexdigest()[:16]
+                    path = self._write_file(directory, f"{prefix}merged-{digest}", table)
+                    for old in files:
+                        if old != path:
+                            os.remove(old)
+                            removed += 1
+            except FileNotFoundError:
+                # the partition was dropped by another process
+                continue
+        if removed:
+            self.refresh()
+        return removed
+
+    def remove(self, provider, prefix, keep=None):
+        """
+        Delete a provider's files written under names starting with prefix, except the one named `keep`.
+        """
+        for path in glob.glob(os.path.join(self.root, f"provider={provider}", "date=*", f"part-{prefix}*.arrow")):
+            if _file_name(path) != keep:
+                os.remove(path)
+
+    def drop_before(self, cutoff):
+        """
+        Delete the day partitions that end before a cutoff timestamp.
+        """
+        first = pd.Timestamp(cutoff).floor("D").date().isoformat()
+        for directory in glob.glob(os.path.join(self.root, "provider=*", "date=*")):
+            if os.path.basename(directory)[len("date=") :] < first:
+                # open memory maps of deleted files stay valid until they are closed; other processes'
+                # stale listings are refreshed when a scan misses a file
+                shutil.rmtree(directory, ignore_errors=True)
+        return self.refresh()
+
+    def providers(self):
+        return sorted(
+            os.path.basename(path)[len("provider=") :]
+            for path in glob.glob(os.path.join(self.root, "provider=*"))
+            if glob.glob(os.path.join(path, "date=*", "*.arrow"))
+        )
+
+    def filter(self, providers=None, start=None, end=None, stations=None):
+        """
+        Build the dataset filter for providers, an inclusive time range and station ids.
+        """
+        conditions = []
+        if providers is not None:
+            conditions.append(ds.field("provider").isin(list(providers)))
+        if start is not None:
+            # the date condition prunes whole partitions; the timestamp one filters rows
+            conditions.append(ds.field("date") >= pa.scalar(pd.Timestamp(start).date(), pa.date32()))
+            conditions.append(ds.field("timestamp") >= _timestamp(start))
+        if end is not None:
+            conditions.append(ds.field("date") <= pa.scalar(pd.Timestamp(end).date(), pa.date32()))
+            conditions.append(ds.field("timestamp") <= _timestamp(end))
+        if stations is not None:
+            conditions.append(ds.field("station_id").isin([str(s) for s in stations]))
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def scan(self, providers=None, start=None, end=None, stations=None, columns=None):
+        """
+        Return the matching observations as an Arrow table.
+        """
+        expression = self.filter(providers, start, end, stations)
+
+        def read(dataset):
+            if dataset is None:
+                return pa.table({name: pa.array([], type) for name, type in zip(SCHEMA.names, SCHEMA.types)})
+            return dataset.to_table(columns=columns, filter=expression)
+
+        return self._retry(read)
+
+    def read(self, providers=None, start=None, end=None, stations=None, columns=None):
+        """
+        Return the matching observations as a DataFrame in the store's layout
+        (categorical strings, float32 measurements).
+        """
+        columns = columns or SCHEMA.names[:2] + ["provider"] + SCHEMA.names[2:]
+        table = self.scan(providers, start, end, stations, columns)
+        if "qc" in table.column_names and table["qc"].null_count:
+            # files written before QC flags were stored read as unflagged
+            table = table.set_column(table.column_names.index("qc"), "qc", pc.fill_null(table["qc"], 0))
+        df = table.to_pandas(strings_to_categorical=True)
+        if "provider" in df.columns and not isinstance(df["provider"].dtype, pd.CategoricalDtype):
+            df["provider"] = df["provider"].astype("category")
+        return df
+
+    def newest(self):
+        """
+        Return the newest stored timestamp, reading only the last day's partitions.
+        """
+        days = sorted(
+            os.path.basename(path)[len("date=") :] for path in glob.glob(os.path.join(self.root, "provider=*", "date=*"))
+        )
+        if not days or self.dataset is None:
+            return None
+        last = pa.scalar(pd.Timestamp(days[-1]).date(), pa.date32())
+        newest = self._retry(lambda dataset: dataset.to_table(columns=["timestamp"], filter=ds.field("date") == last))
+        newest = newest["timestamp"]
+        return pd.Timestamp(pc.max(newest).as_py()) if len(newest) else None
+
+    def count_rows(self, providers=None, start=None, end=None, stations=None):
+        expression = self.filter(providers, start, end, stations)
+        return self._retry(lambda dataset: 0 if dataset is None else dataset.count_rows(filter=expression))
+
+    def nbytes(self):
+        return int(np.sum([os.path.getsize(p) for p in glob.glob(os.path.join(self.root, "provider=*", "date=*", "*.arrow"))]))
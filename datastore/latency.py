@@ -0,0 +1,200 @@
+import math
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# quantiles are exact to within this relative error
+RELATIVE_ACCURACY = 0.01
+# latencies at or below this many seconds share one bucket (they also catch clock skew)
+MIN_LATENCY = 0.001
+
+# sketches are kept per provider and hour of arrival, for LATENCY_RETENTION_HOURS
+LATENCY_BUCKET = pd.Timedelta(hours=1)
+LATENCY_RETENTION_HOURS = int(os.getenv("LATENCY_RETENTION_HOURS", "168"))
+
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+
+def _index(values):
+    # bucket index of each value (meaningless for values <= MIN_LATENCY, which are counted apart)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        index = np.ceil(np.log(np.maximum(values, MIN_LATENCY)) / _LOG_GAMMA)
+    return index.astype(np.int64)
+
+
+class LatencySketch:
+    """
+    Mergeable quantile sketch of latencies in seconds.
+
+    Values are counted in logarithmic buckets whose width grows with the
+    value (as in an HDR histogram or DDSketch), so every quantile is within
+    RELATIVE_ACCURACY of the true one. Two sketches merge by adding their
+    bucket counts, which is exact: merging per-hour or per-worker sketches
+    gives the same result as one sketch over all values.
+    """
+
+    def __init__(self):
+        self.offset = 0  # bucket index of counts[0]
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.zero = 0  # values <= MIN_LATENCY
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _grow(self, low, high):
+        # make room for bucket indexes low..high
+        if not len(self.counts):
+            self.offset, self.counts = low, np.zeros(high - low + 1, dtype=np.int64)
+            return
+        new_low, new_high = min(low, self.offset), max(high, self.offset + len(self.counts) - 1)
+        if (new_low, new_high) != (self.offset, self.offset + len(self.counts) - 1):
+            counts = np.zeros(new_high - new_low + 1, dtype=np.int64)
+            counts[self.offset - new_low : self.offset - new_low + len(self.counts)] = self.counts
+            self.offset, self.counts = new_low, counts
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        return self._add(values, _index(values))
+
+    def _add(self, values, index):
+        # index: _index(values), computed once for a whole batch by IngestLatency.observe
+        if not len(values):
+            return self
+        self.count += len(values)
+        self.sum += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        index = index[values > MIN_LATENCY]
+        self.zero += len(values) - len(index)
+        if len(index):
+            self._grow(int(index.min()), int(index.max()))
+            self.counts += np.bincount(index - self.offset, minlength=len(self.counts))
+        return self
+
+    def merge(self, other):
+        if not other.count:
+            return self
+        if len(other.counts):
+            self._grow(other.offset, other.offset + len(other.counts) - 1)
+            start = other.offset - self.offset
+            self.counts[start : start + len(other.counts)] += other.counts
+        self.zero += other.zero
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero:
+            return max(self.min, 0.0) if self.min <= MIN_LATENCY else MIN_LATENCY
+        position = int(np.searchsorted(np.cumsum(self.counts), rank - self.zero, side="right"))
+        # the bucket's midpoint in relative terms: within RELATIVE_ACCURACY of any value in it
+        value = 2 * _GAMMA ** (self.offset + position) / (_GAMMA + 1)
+        return min(max(value, self.min), self.max)
+
+    def summary(self, quantiles=(0.5, 0.95, 0.99)):
+        summary = {"count": self.count, "mean": self.sum / self.count if self.count else None}
+        for q in quantiles:
+            summary[f"p{q * 100:g}"] = self.quantile(q)
+        summary["max"] = self.max if self.count else None
+        return summary
+
+    def to_dict(self):
+        return {
+            "relative_accuracy": RELATIVE_ACCURACY,
+            "offset": self.offset,
+            "counts": self.counts.tolist(),
+            "zero": self.zero,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("relative_accuracy", RELATIVE_ACCURACY) != RELATIVE_ACCURACY:
+            raise ValueError("sketches with a different relative accuracy cannot be merged")
+        sketch = cls()
+        sketch.offset = int(data["offset"])
+        sketch.counts = np.asarray(data["counts"], dtype=np.int64)
+        sketch.zero = int(data["zero"])
+        sketch.count = int(data["count"])
+        sketch.sum = float(data["sum"])
+        if sketch.count:
+            sketch.min, sketch.max = float(data["min"]), float(data["max"])
+        return sketch
+
+
+class IngestLatency:
+    """
+    Observation-time to arrival-time latency of ingested observations, as
+    one LatencySketch per provider and hour of arrival.
+
+    Latency over any window, provider set or category is a merge of the
+    hourly sketches it covers, never a scan of observations.
+    """
+
+    def __init__(self, retention_hours=LATENCY_RETENTION_HOURS):
+        self.retention = pd.Timedelta(hours=retention_hours)
+        self.sketches = {}  # (provider, arrival hour) -> LatencySketch
+        self.newest = None  # newest arrival hour
+        self._lock = threading.Lock()
+
+    def observe(self, batch, arrival=None):
+        """
+        Record the latency of every row of a batch that arrived at `arrival` (default: now).
+        """
+        if batch.empty:
+            return
+        arrival = pd.Timestamp.now() if arrival is None else pd.Timestamp(arrival)
+        bucket = arrival.floor(LATENCY_BUCKET)
+        seconds = (arrival.to_datetime64() - batch["timestamp"].to_numpy("datetime64[ns]")) / np.timedelta64(1, "s")
+        codes, providers = pd.factorize(batch["provider"])
+        keep = np.isfinite(seconds) & (codes >= 0)
+        order = np.argsort(codes[keep], kind="stable")
+        seconds = seconds[keep][order]
+        index = _index(seconds)
+        bounds = np.searchsorted(codes[keep][order], np.arange(len(providers) + 1))
+        with self._lock:
+            for i, provider in enumerate(providers):
+                rows = slice(bounds[i], bounds[i + 1])
+                self.sketches.setdefault((str(provider), bucket), LatencySketch())._add(seconds[rows], index[rows])
+            if self.newest is None or bucket > self.newest:
+                # a new hour: drop the ones that fell out of retention
+                self.newest = bucket
+                for key in [k for k in self.sketches if k[1] < bucket - self.retention]:
+                    del self.sketches[key]
+
+    def window(self, start=None, end=None, providers=None):
+        """
+        Return the merged sketch of the arrival hours overlapping [start, end) for some providers (None: all).
+        """
+        start = None if start is None else pd.Timestamp(start).floor(LATENCY_BUCKET)
+        end = None if end is None else pd.Timestamp(end)
+        merged = LatencySketch()
+        with self._lock:
+            for (provider, bucket), sketch in self.sketches.items():
+                if providers is not None and provider not in providers:
+                    continue
+                if (start is not None and bucket < start) or (end is not None and bucket >= end):
+                    continue
+                merged.merge(sketch)
+        return merged
+
+    def by_provider(self, start=None, end=None):
+        """
+        Return {provider: merged sketch} over the arrival hours overlapping [start, end).
+        """
+        with self._lock:
+            providers = sorted({provider for provider, _ in self.sketches})
+        return {provider: self.window(start, end, [provider]) for provider in providers}
@@ -0,0 +1,92 @@
+import threading
+
+import pandas as pd
+
+from datastore.spatial import StationGrid
+
+
+class LatestObservations:
+    """
+    Latest reading per station, keyed by station_id.
+
+    The table is built with a single pass over the history and then kept up
+    to date from each new batch of rows, so readers never have to sort or
+    group the full history.
+    """
+
+    def __init__(self):
+        self.table = pd.DataFrame()
+        self._grid = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.table)
+
+    @staticmethod
+    def _latest_rows(df):
+        # idxmax is a linear scan per group, unlike sort_values + last()
+        idx = df.groupby("station_id", observed=True)["timestamp"].idxmax()
+        latest = df.loc[idx.to_numpy()]
+        latest.index = pd.Index(latest["station_id"].astype(str), name=None)
+        return latest
+
+    def update(self, batch):
+        """
+        Merge a batch of new observations into the table.
+
+        Only the batch is scanned; existing rows are replaced when the batch
+        holds a newer reading for the same station.
+        """
+        if batch.empty:
+            return
+        incoming = self._latest_rows(batch)
+
+        with self._lock:
+            if self.table.empty:
+                table = incoming
+            else:
+                current = self.table.reindex(incoming.index)
+                newer = current["timestamp"].isna().to_numpy() | (
+                    incoming["timestamp"].to_numpy() > current["timestamp"].to_numpy()
+                )
+                incoming = incoming[newer]
+                table = pd.concat([self.table.drop(incoming.index, errors="ignore"), incoming])
+                for col, dtype in self.table.dtypes.items():
+                    # concat falls back to object when the categories differ
+                    if isinstance(dtype, pd.CategoricalDtype):
+                        table[col] = table[col].astype("category")
+            # swap in a new table so concurrent readers always see a full snapshot
+            self.table = table
+            self._grid = None
+
+    def view(self, provider="all"):
+        """
+        Return the latest reading of every station for a provider.
+        """
+        table = self.table
+        if provider == "all" or table.empty or "provider" not in table.columns:
+            return table
+        return table[(table["provider"] == provider).to_numpy()]
+
+    def grid(self):
+        """
+        Return the spatial index of the current table, built on first use after each update.
+        """
+        with self._lock:
+            table = self.table
+            if self._grid is None or self._grid[0] is not table:
+                grid = StationGrid(table["latitude"], table["longitude"]) if "latitude" in table.columns else None
+                self._grid = (table, grid)
+            return self._grid
+
+    def view_bounds(self, provider, bounds):
+        """
+        Return the latest reading of every station for a provider inside (west, south, east, north).
+        """
+        table, grid = self.grid()
+        if grid is None:
+            return self.view(provider)
+        table = table.iloc[grid.query(*bounds)]
+        if provider == "all" or "provider" not in table.columns:
+            return table
+        return table[(table["provider"] == provider).to_numpy()]
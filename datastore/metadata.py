@@ -0,0 +1,161 @@
+import hashlib
+import logging
+import os
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc
+
+from datastore.observations import DATA_DIR
+
+log = logging.getLogger(__name__)
+
+VENDOR_WORKBOOK = os.path.join(DATA_DIR, "Mesonet Vendor Info.xlsx")
+METADATA_CACHE_DIR = os.getenv("METADATA_CACHE_DIR", DATA_DIR)
+
+# bump when the column mapping below changes so old caches are rebuilt
+SCHEMA_VERSION = "1"
+
+# provider field -> (workbook column, default)
+PROVIDER_COLUMNS = {
+    "name": ("Unnamed: 1", "Unknown"),  # Vendor/Provider Name
+    "color": ("Color", "#1f77b4"),  # not present in the workbook, fallback assumed
+    "lat": ("Unnamed: 5", 0),  # Latitude
+    "lon": ("Unnamed: 6", 0),  # Longitude
+    "frequency": ("Unnamed: 4", 0),  # Frequency
+    "status": ("Status", "Active"),  # not present in the workbook, fallback assumed
+    "station_count": ("Total Station Count", 0),  # Total Station Count
+}
+
+
+def _pick_sheet(sheet_names):
+    # Use the specific dashboard metadata sheet, then a vendor sheet, then the first one
+    if "Sheet 1" in sheet_names:
+        return "Sheet 1"
+    return next((s for s in sheet_names if "vendor" in s.lower()), sheet_names[0])
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def providers_from_sheet(vendor_df):
+    """
+    Map the raw vendor sheet to the typed provider table.
+
+    Rows whose numeric fields cannot be parsed are dropped, as are rows
+    without a station count.
+    """
+
+    def column(field):
+        name, default = PROVIDER_COLUMNS[field]
+        if name in vendor_df.columns:
+            return vendor_df[name]
+        return pd.Series(default, index=vendor_df.index)
+
+    table = pd.DataFrame({field: column(field) for field in ["name", "color", "status"]}).astype(str)
+    valid = pd.Series(True, index=vendor_df.index)
+    for field in ["lat", "lon", "frequency", "station_count"]:
+        raw = column(field)
+        values = pd.to_numeric(raw, errors="coerce")
+        valid &= values.notna() | raw.isna()
+        table[field] = values
+    valid &= table["station_count"].notna()
+
+    table = table[valid].reset_index(drop=True)
+    table["station_count"] = table["station_count"].astype("int64")
+    for field in ["lat", "lon", "frequency"]:
+        table[field] = table[field].astype("float64")
+    return table[list(PROVIDER_COLUMNS)]
+
+
+class ProviderMetadata:
+    """
+    Vendor workbook converted once to an Arrow IPC file.
+
+    The cache records the workbook's mtime, size and SHA-256; later startups
+    memory-map the cache instead of parsing the workbook with openpyxl.
+    """
+
+    def __init__(self, workbook=VENDOR_WORKBOOK, cache_dir=METADATA_CACHE_DIR):
+        self.workbook = workbook
+        self.cache_path = os.path.join(cache_dir, os.path.splitext(os.path.basename(workbook))[0] + ".providers.arrow")
+        self.version = ""
+
+    def _source_info(self):
+        stat = os.stat(self.workbook)
+        return {"mtime_ns": str(stat.st_mtime_ns), "size": str(stat.st_size)}
+
+    def _read_cache(self, source):
+        if not os.path.exists(self.cache_path):
+            return None
+        try:
+            with pa.memory_map(self.cache_path, "r") as source_file:
+                table = pa.ipc.open_file(source_file).read_all()
+                providers = table.to_pandas()
+        except (OSError, pa.ArrowInvalid):
+            log.warning("Unreadable metadata cache %s, rebuilding", self.cache_path)
+            return None
+
+        meta = {k.decode(): v.decode() for k, v in (table.schema.metadata or {}).items()}
+        if meta.get("schema_version") != SCHEMA_VERSION:
+            return None
+        if (meta.get("mtime_ns"), meta.get("size")) != (source["mtime_ns"], source["size"]):
+            # touched but possibly unchanged (e.g. a fresh checkout): compare content
+            if meta.get("sha256") != _file_digest(self.workbook):
+                return None
+            try:
+                self._write_cache(providers, dict(meta, **source))
+            except OSError:
+                log.warning("Could not refresh metadata cache %s", self.cache_path, exc_info=True)
+        self.version = meta["sha256"][:12]
+        return providers
+
+    def _write_cache(self, providers, meta):
+        table = pa.Table.from_pandas(providers, preserve_index=False)
+        table = table.replace_schema_metadata({k: str(v) for k, v in meta.items()})
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(self.cache_path))
+        os.close(fd)
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        # mkstemp creates the file 0600; other users and workers running as another uid must be able to read it
+        os.chmod(tmp_path, 0o644)
+        # atomic swap so concurrent workers never read a partial file
+        os.replace(tmp_path, self.cache_path)
+
+    def load(self):
+        """
+        Return the provider table, from the cache when it is still valid.
+        """
+        source = self._source_info()
+        providers = self._read_cache(source)
+        if providers is not None:
+            log.info("Loaded %d providers from %s", len(providers), self.cache_path)
+            return providers
+
+        xl = pd.ExcelFile(self.workbook)
+        sheet_name = _pick_sheet(xl.sheet_names)
+        log.info("Parsing %s (sheet %r)", self.workbook, sheet_name)
+        providers = providers_from_sheet(xl.parse(sheet_name))
+
+        digest = _file_digest(self.workbook)
+        try:
+            self._write_cache(providers, dict(source, sha256=digest, schema_version=SCHEMA_VERSION))
+        except OSError:
+            log.warning("Could not write metadata cache %s", self.cache_path, exc_info=True)
+        self.version = digest[:12]
+        return providers
+
+
+def load_providers(workbook=VENDOR_WORKBOOK):
+    """
+    Return the provider table and its content version.
+    """
+    metadata = ProviderMetadata(workbook)
+    return metadata.load(), metadata.version
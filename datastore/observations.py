@@ -0,0 +1,494 @@
+import hashlib
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from datastore.availability import Availability
+from datastore.dataset import ObservationDataset
+from datastore.latency import IngestLatency
+from datastore.latest import LatestObservations
+from datastore.qc import FLAG_DTYPE, QC, QualityControl
+from datastore.rollups import Rollups
+
+log = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "../data/dummy_data")
+
+# provider key -> parquet file inside DATA_DIR
+PROVIDER_FILES = {
+    "deldot": "deldot_dummy.parquet",
+    "deldeos": "deldeos_dummy.parquet",
+    "colorado": "colorado_dummy.parquet",
+}
+
+# low-cardinality string columns are stored as pandas categoricals
+CATEGORICAL_COLUMNS = ["station_id", "provider", "status"]
+
+# numeric columns are downcast to float32 (half the memory of float64)
+MEASUREMENT_COLUMNS = ["temperature", "humidity", "wind_speed", "latitude", "longitude"]
+
+# observations older than this (relative to the newest one) are dropped; 0 keeps everything
+RETENTION_HOURS = float(os.getenv("OBSERVATION_RETENTION_HOURS", "168"))
+# in memory, expired rows are dropped once the window has moved this fraction of itself past the last trim
+RETENTION_SLACK = 0.05
+
+# memory: every process holds the observations in one DataFrame
+# dataset: they are written to a provider=/date= partitioned Arrow dataset
+#     that each process memory-maps; only the latest readings and rollups are
+#     kept in memory (gunicorn.conf.py defaults to this)
+OBSERVATION_STORAGE = os.getenv("OBSERVATION_STORAGE", "memory")
+DATASET_DIR = os.getenv("OBSERVATION_DATASET_DIR", os.path.join(DATA_DIR, "dataset"))
+
+# dataset files imported from a provider file are named after the file's size and mtime
+IMPORT_PREFIX = "part-source-"
+# bumped when the layout or the QC flags of imported files change, so they are imported again
+IMPORT_VERSION = 3
+# dataset files written by append(); a day's files are merged into one by ObservationDataset.compact
+BATCH_PREFIX = "part-batch-"
+
+
+def _compact(df, provider):
+    """
+    Convert a raw provider frame to the compact store layout.
+    """
+    if "provider" not in df.columns:
+        df["provider"] = provider
+    for col in MEASUREMENT_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(np.float32)
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def _concat_categorical(frames):
+    """
+    Concatenate frames while keeping categorical columns categorical.
+
+    pd.concat falls back to object dtype when the categories differ, so the
+    categories are unioned first. The input frames are not modified.
+    """
+    frames = [f.copy(deep=False) for f in frames]
+    for col in CATEGORICAL_COLUMNS:
+        if not all(col in f.columns for f in frames):
+            continue
+        # union in order of appearance, like union_categoricals, without concatenating the codes
+        categories = frames[0][col].cat.categories
+        for f in frames[1:]:
+            extra = f[col].cat.categories.difference(categories, sort=False)
+            if len(extra):
+                categories = categories.append(extra)
+        for f in frames:
+            if not f[col].cat.categories.equals(categories):
+                f[col] = f[col].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True, copy=False)
+
+
+def _add_chunk(chunks, rows):
+    """
+    Return a provider's chunk list with rows appended.
+
+    The newest chunks are merged while one is not at least twice the size of
+    the next, as in a binary counter, so there are O(log n) chunks.
+    """
+    chunks = chunks + [rows]
+    while len(chunks) > 1 and len(chunks[-2]) < 2 * len(chunks[-1]):
+        last = chunks.pop()
+        chunks[-1] = _concat_categorical([chunks[-1], last])
+    return chunks
+
+
+def _flagged(frame):
+    return int(np.count_nonzero(frame["qc"].to_numpy())) if "qc" in frame.columns else 0
+
+
+def read_batch(path):
+    """
+    Read a parquet or CSV batch of observations.
+    """
+    if path.endswith(".csv"):
+        return pd.read_csv(path, parse_dates=["timestamp"])
+    return pd.read_parquet(path)
+
+
+class ObservationStore:
+    """
+    Process-wide, columnar store of station observations.
+
+    Each provider's observations are a list of frames (chunks). New batches
+    are appended with append() as new chunks, and the latest-reading table
+    and the rollups are updated from the batch alone. Chunk sizes at least
+    halve along the list, merging the newest ones when they do not, so a
+    batch copies only recent rows and each row is copied O(log n) times.
+    view() concatenates the chunks on the first read after an append.
+    Rows outside the retention window are dropped once the window has
+    moved RETENTION_SLACK of itself, so memory stays bounded.
+
+    With storage="dataset" the observations live in an ObservationDataset
+    instead of the shared frame, and view() reads them from its files.
+    """
+
+    def __init__(
+        self,
+        data_dir=DATA_DIR,
+        provider_files=None,
+        retention_hours=RETENTION_HOURS,
+        storage=OBSERVATION_STORAGE,
+        dataset_dir=DATASET_DIR,
+    ):
+        self.data_dir = data_dir
+        self.provider_files = provider_files or PROVIDER_FILES
+        self.retention = pd.Timedelta(hours=retention_hours) if retention_hours else None
+        self.dataset = ObservationDataset(dataset_dir) if storage == "dataset" else None
+        self.version = 0
+        self._source = ""
+        self._cutoff = None
+        self._rows = 0
+        self._newest = None
+        self._trimmed = None
+        # (provider -> chunks, provider/"all" -> concatenated frame), replaced together on every change
+        # so readers never mix snapshots; the second dict fills as views are read
+        self._data = ({}, {})
+        self.latest = LatestObservations()
+        self.rollups = Rollups()
+        self.qc = QualityControl()
+        self.availability = Availability()
+        self.latency = IngestLatency()
+        self._lock = threading.Lock()
+
+    @property
+    def frame(self):
+        # reads (or in memory, concatenates) every stored observation
+        return self.view("all")
+
+    @property
+    def has_data(self):
+        return self.rows > 0
+
+    @property
+    def rows(self):
+        if self.dataset is not None:
+            return self._rows
+        return sum(len(chunk) for chunks in self._data[0].values() for chunk in chunks)
+
+    @property
+    def providers(self):
+        return list(self._data[0])
+
+    def load(self):
+        """
+        Read every available provider file once and build the shared frame.
+        """
+        if self.dataset is not None:
+            return self._load_dataset()
+        loaded = {}
+        source = hashlib.md5()
+        for provider, filename in self.provider_files.items():
+            path = os.path.join(self.data_dir, filename)
+            if not os.path.exists(path):
+                log.warning("No observation file for %s at %s", provider, path)
+                continue
+            stat = os.stat(path)
+            source.update(f"{filename}:{stat.st_mtime_ns}:{stat.st_size};".encode())
+            loaded[provider] = _compact(pd.read_parquet(path), provider)
+
+        with self._lock:
+            if loaded:
+                self.qc = QualityControl()
+                for frame in loaded.values():
+                    self._check(frame, self.qc)
+                self._newest = max(f["timestamp"].max() for f in loaded.values())
+                self._data = (self._retain({p: [f] for p, f in loaded.items()}), {})
+                self.latest, self.rollups, self.availability = LatestObservations(), Rollups(), Availability()
+                for frames in self._data[0].values():
+                    for frame in frames:
+                        self.latest.update(frame)
+                        self.rollups.update(frame)
+                        self.availability.update(frame)
+            self._source = source.hexdigest()[:12]
+            self.version += 1
+
+        log.info("Loaded %d observations for %d providers", self.rows, len(self.providers))
+        return self
+
+    def _load_dataset(self):
+        """
+        Import changed provider files into the dataset, then build the latest
+        readings and rollups from it one provider at a time.
+        """
+        dataset = self.dataset
+        source = hashlib.md5()
+        for provider, filename in self.provider_files.items():
+            path = os.path.join(self.data_dir, filename)
+            if not os.path.exists(path):
+                log.warning("No observation file for %s at %s", provider, path)
+                continue
+            stat = os.stat(path)
+            source.update(f"{filename}:{stat.st_mtime_ns}:{stat.st_size};".encode())
+            name = f"{IMPORT_PREFIX}{IMPORT_VERSION}-{stat.st_size}-{stat.st_mtime_ns}"
+            imported = os.path.join(dataset.root, f"provider={provider}", "_imported", name)
+            if not os.path.exists(imported):
+                # a replaced provider file replaces everything imported from its old version
+                dataset.remove(provider, IMPORT_PREFIX, keep=name)
+                dataset.write(self._check(_compact(pd.read_parquet(path), provider), QualityControl()), name)
+                os.makedirs(os.path.dirname(imported), exist_ok=True)
+                open(imported, "w").close()
+                log.info("Imported %s into %s", filename, dataset.root)
+
+        with self._lock:
+            dataset.refresh()
+            cutoff = self._dataset_cutoff()
+            latest, rollups, qc, availability = LatestObservations(), Rollups(), QualityControl(), Availability()
+            providers = self._dataset_providers()
+            for provider in providers:
+                rows = dataset.read([provider], start=cutoff)
+                latest.update(rows)
+                rollups.update(rows)
+                availability.update(rows)
+                if QC != "off":
+                    # the stored flags stay; this only picks up each station's last readings
+                    qc.check(rows)
+            self.latest, self.rollups, self.qc, self.availability = latest, rollups, qc, availability
+            self._data = ({p: [] for p in providers}, {})
+            self._cutoff = cutoff
+            self._rows = dataset.count_rows(start=cutoff)
+            self._source = source.hexdigest()[:12]
+            self.version += 1
+
+        log.info("Opened %d observations for %d providers from %s", self._rows, len(self.providers), dataset.root)
+        return self
+
+    def _dataset_providers(self):
+        # configured providers first, in their usual order
+        stored = self.dataset.providers()
+        return [p for p in self.provider_files if p in stored] + [p for p in stored if p not in self.provider_files]
+
+    def _dataset_cutoff(self, newest=None):
+        # start of the retention window, measured from the newest stored observation
+        newest = newest or self.dataset.newest()
+        if self.retention is None or newest is None:
+            return None
+        return newest - self.retention
+
+    def append(self, batch, provider=None, batch_id=""):
+        """
+        Add a batch of new observations without reloading the stored ones.
+
+        Rows without a provider column are assigned to `provider`. The batch
+        id (e.g. file name, mtime and size) is folded into data_version, so
+        processes that ingest the same batches agree on the version.
+        """
+        if batch.empty:
+            return 0
+        if "provider" not in batch.columns and provider is None:
+            raise ValueError("batch has no provider column and no provider was given")
+        batch = self._check(_compact(batch.copy(), provider), self.qc)
+        self.latency.observe(batch)
+        if self.dataset is not None:
+            return self._append_dataset(batch, batch_id)
+
+        with self._lock:
+            # copy-on-write: the chunk lists of readers' snapshots are never modified
+            chunks = dict(self._data[0])
+            for name, rows in batch.groupby("provider", observed=True, sort=False):
+                chunks[name] = _add_chunk(chunks.get(name, []), rows.reset_index(drop=True))
+            newest = batch["timestamp"].max()
+            self._newest = newest if self._newest is None else max(self._newest, newest)
+            self._data = (self._retain(chunks), {})
+            self.latest.update(batch)
+            self.rollups.update(batch)
+            self.availability.update(batch)
+            self.rollups.trim(self._cutoff)
+            self._source = hashlib.md5(f"{self._source};{batch_id}".encode()).hexdigest()[:12]
+            self.version += 1
+
+        log.info(
+            "Appended %d observations (%d flagged by QC, %d stored, version %s)",
+            len(batch),
+            _flagged(batch),
+            self.rows,
+            self.data_version,
+        )
+        return len(batch)
+
+    def _append_dataset(self, batch, batch_id):
+        # the file name follows from the batch, so every process writing it writes the same files
+        key = batch_id or str(pd.util.hash_pandas_object(batch, index=False).sum())
+        name = f"{BATCH_PREFIX}{hashlib.md5(key.encode()).hexdigest()[:16]}"
+        with self._lock:
+            dataset = self.dataset.write(batch, name)
+            newest = dataset.newest()
+            # days before the newest one are closed: their batch files are merged into one per day
+            dataset.compact(BATCH_PREFIX, before=newest)
+            cutoff = self._dataset_cutoff(newest)
+            if cutoff is not None:
+                dataset.drop_before(cutoff)
+            self.latest.update(batch)
+            self.rollups.update(batch)
+            self.availability.update(batch)
+            self.rollups.trim(cutoff)
+            self._data = ({p: [] for p in self._dataset_providers()}, {})
+            self._cutoff = cutoff
+            self._rows = dataset.count_rows(start=cutoff)
+            self._source = hashlib.md5(f"{self._source};{batch_id}".encode()).hexdigest()[:12]
+            self.version += 1
+
+        log.info(
+            "Appended %d observations (%d flagged by QC, %d stored, version %s)",
+            len(batch),
+            _flagged(batch),
+            self._rows,
+            self.data_version,
+        )
+        return len(batch)
+
+    @staticmethod
+    def _check(frame, qc):
+        # QC flags are computed once, as observations arrive, and stored with them
+        if QC != "off":
+            frame["qc"] = qc.check(frame)
+        elif "qc" in frame.columns:
+            frame["qc"] = np.zeros(len(frame), dtype=FLAG_DTYPE)
+        return frame
+
+    def _retain(self, chunks):
+        # drop rows older than the retention window, measured from the newest observation; the
+        # stored rows are only scanned once the window has moved RETENTION_SLACK past the last trim
+        if self.retention is None or self._newest is None:
+            return chunks
+        self._cutoff = self._newest - self.retention
+        if self._trimmed is not None and self._cutoff - self._trimmed < self.retention * RETENTION_SLACK:
+            return chunks
+        self._trimmed = self._cutoff
+        retained = {}
+        for provider, frames in chunks.items():
+            kept = []
+            for f in frames:
+                keep = f["timestamp"].to_numpy() >= self._cutoff.to_datetime64()
+                if keep.all():
+                    kept.append(f)
+                elif keep.any():
+                    kept.append(f[keep].reset_index(drop=True))
+            if kept:
+                retained[provider] = kept
+        return retained
+
+    @property
+    def data_version(self):
+        """
+        Version string that is stable across processes loading the same files.
+
+        Unlike the in-process counter, it can key caches shared by workers and
+        restarts.
+        """
+        return f"{self._source}.{self.version}"
+
+    def view(self, provider="all"):
+        """
+        Return the observations for a provider, or for all providers.
+
+        Unknown providers fall back to the full frame.
+        """
+        chunks, views = self._data
+        if self.dataset is not None:
+            # read from the memory-mapped files; only the provider's partitions are opened
+            return self.dataset.read([provider] if provider in chunks else None, start=self._cutoff)
+        if provider not in chunks:
+            provider = "all"
+        if provider not in views:
+            # concatenated once per snapshot; concurrent readers may both build it, which is harmless
+            frames = [self.view(p) for p in chunks] if provider == "all" else chunks[provider]
+            if not frames:
+                views[provider] = pd.DataFrame()
+            elif len(frames) == 1:
+                views[provider] = frames[0]
+            else:
+                views[provider] = _concat_categorical(frames)
+                if provider != "all":
+                    # the merged frame replaces the chunks instead of doubling their memory
+                    chunks[provider] = [views[provider]]
+        return views[provider]
+
+    def select(self, providers=None, start=None, end=None, stations=None, columns=None):
+        """
+        Return the observations of some providers (None for all) inside an
+        inclusive time range, optionally only some stations and columns.
+        """
+        if self.dataset is not None:
+            # the filters are pushed down to the partition files
+            if start is None or (self._cutoff is not None and start < self._cutoff):
+                start = self._cutoff
+            return self.dataset.read(providers, start, end, stations, columns)
+        if self._cutoff is not None and (start is None or pd.Timestamp(start) < self._cutoff):
+            # rows past the retention window may still be held until the next trim
+            start = self._cutoff
+        chunks = self._data[0]
+        parts = []
+        # each provider's chunks are filtered before concatenating, so only matching rows are copied
+        for provider in chunks if providers is None else [p for p in providers if p in chunks]:
+            for frame in chunks[provider]:
+                if columns is not None:
+                    frame = frame[[c for c in dict.fromkeys(["timestamp", "station_id", *columns]) if c in frame.columns]]
+                mask = np.ones(len(frame), dtype=bool)
+                timestamps = frame["timestamp"].to_numpy()
+                if start is not None:
+                    mask &= timestamps >= pd.Timestamp(start).to_datetime64()
+                if end is not None:
+                    mask &= timestamps <= pd.Timestamp(end).to_datetime64()
+                if stations is not None:
+                    mask &= frame["station_id"].isin([str(s) for s in stations]).to_numpy()
+                if mask.any():
+                    parts.append(frame[mask] if not mask.all() else frame)
+        if not parts:
+            empty = next((f for frames in chunks.values() for f in frames), pd.DataFrame())
+            parts = [empty.iloc[:0]]
+        rows = parts[0] if len(parts) == 1 else _concat_categorical(parts)
+        return rows[[c for c in columns if c in rows.columns]] if columns is not None else rows
+
+    def latest_view(self, provider="all", bounds=None):
+        """
+        Return the latest reading of every station for a provider, optionally
+        only those inside bounds (west, south, east, north).
+        """
+        if provider not in self._data[0]:
+            provider = "all"
+        if bounds is not None:
+            return self.latest.view_bounds(provider, bounds)
+        return self.latest.view(provider)
+
+    def memory_usage(self):
+        if self.dataset is not None:
+            # the observations themselves are in the OS page cache, shared by all processes
+            return (
+                int(self.latest.table.memory_usage(deep=True).sum())
+                + sum(int(t.memory_usage(deep=True).sum()) for t in self.rollups.tables.values())
+                + self.availability.memory_usage()
+            )
+        return sum(int(f.memory_usage(deep=True).sum()) for chunks in self._data[0].values() for f in chunks)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """
+    Return the process-wide observation store, loading it on first use.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ObservationStore().load()
+    return _store
+
+
+def loaded_store():
+    """
+    Return the process-wide observation store if it has been loaded, else None.
+    """
+    return _store
@@ -0,0 +1,130 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# (sort, filter) orderings kept, so scrolling through one view re-slices instead of re-filtering
+ORDER_CACHE_SIZE = 16
+
+
+def _text_mask(values, condition):
+    # values: lower-cased strings; AG Grid text filter types
+    kind = condition.get("type", "contains")
+    if kind == "blank":
+        return values == ""
+    if kind == "notBlank":
+        return values != ""
+    term = str(condition.get("filter") or "").lower()
+    if kind == "equals":
+        return values == term
+    if kind == "notEqual":
+        return values != term
+    if kind == "startsWith":
+        return np.char.startswith(values, term)
+    if kind == "endsWith":
+        return np.char.endswith(values, term)
+    contains = np.char.find(values, term) >= 0
+    return ~contains if kind == "notContains" else contains
+
+
+def _number_mask(values, condition):
+    # AG Grid number filter types
+    kind = condition.get("type", "equals")
+    if kind == "blank":
+        return np.isnan(values)
+    if kind == "notBlank":
+        return ~np.isnan(values)
+    term = float(condition.get("filter") or 0)
+    if kind == "inRange":
+        return (values >= term) & (values <= float(condition.get("filterTo") or 0))
+    compare = {
+        "equals": np.equal,
+        "notEqual": np.not_equal,
+        "lessThan": np.less,
+        "lessThanOrEqual": np.less_equal,
+        "greaterThan": np.greater,
+        "greaterThanOrEqual": np.greater_equal,
+    }
+    if kind not in compare:
+        raise ValueError(f"unsupported number filter {kind!r}")
+    return compare[kind](values, term)
+
+
+class ProviderIndex:
+    """
+    The provider table indexed for a grid's infinite row model.
+
+    Each column's row order is computed once; a request filters it
+    with AG Grid's filter model (a boolean mask over NumPy columns) and
+    returns the requested block of rows, so only the rows on screen are
+    serialized. Filtered orders are cached per (sort, filter) model.
+    """
+
+    def __init__(self, table, text_columns=(), number_columns=()):
+        self.table = table.reset_index(drop=True)
+        self.records = self.table.to_dict("records")
+        self.text = {c: self.table[c].astype(str).str.lower().to_numpy(dtype=str) for c in text_columns}
+        self.numbers = {c: self.table[c].to_numpy(dtype=np.float64) for c in number_columns}
+        # dense rank of each row per column (equal values share a rank); text sorts case-insensitively
+        self.ranks = {
+            c: np.unique(values, return_inverse=True)[1] for c, values in {**self.text, **self.numbers}.items()
+        }
+        self.orders = {c: np.argsort(rank, kind="stable") for c, rank in self.ranks.items()}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.table)
+
+    def _mask(self, filter_model):
+        mask = np.ones(len(self.table), dtype=bool)
+        for column, model in (filter_model or {}).items():
+            if column in self.text:
+                values, condition_mask = self.text[column], _text_mask
+            elif column in self.numbers:
+                values, condition_mask = self.numbers[column], _number_mask
+            else:
+                raise ValueError(f"column {column!r} cannot be filtered")
+            # a column filter is one condition, or two or more joined by AND/OR
+            conditions = model.get("conditions") or [model]
+            masks = [condition_mask(values, condition) for condition in conditions]
+            mask &= np.logical_or.reduce(masks) if model.get("operator") == "OR" else np.logical_and.reduce(masks)
+        return mask
+
+    def _order(self, sort_model):
+        if not sort_model:
+            return np.arange(len(self.table))
+        for item in sort_model:
+            if item["colId"] not in self.orders:
+                raise ValueError(f"column {item['colId']!r} cannot be sorted")
+        if len(sort_model) == 1:
+            order = self.orders[sort_model[0]["colId"]]
+            return order[::-1] if sort_model[0]["sort"] == "desc" else order
+        # several columns: lexsort the ranks (the last key sorts first)
+        keys = [-self.ranks[item["colId"]] if item["sort"] == "desc" else self.ranks[item["colId"]] for item in sort_model]
+        return np.lexsort(keys[::-1])
+
+    def view(self, sort_model=None, filter_model=None):
+        """
+        Return the positions of the rows matching filter_model, in sort_model order.
+        """
+        key = repr((sort_model, filter_model))
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        order = self._order(sort_model)
+        order = order[self._mask(filter_model)[order]]
+        with self._lock:
+            self._cache[key] = order
+            while len(self._cache) > ORDER_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return order
+
+    def rows(self, start, end, sort_model=None, filter_model=None):
+        """
+        Return (rows start..end-1 as records, matching row count) for a getRowsRequest.
+        """
+        order = self.view(sort_model, filter_model)
+        return [self.records[i] for i in order[start:end]], len(order)
+
@@ -0,0 +1,123 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from datastore.observations import PROVIDER_FILES, get_store
+from datastore.query import query
+from datastore.rollups import ROLLUP_COLUMNS
+
+# a station counts as active when its latest reading is "active" and this recent
+ACTIVE_WINDOW = pd.Timedelta(hours=1)
+
+# readings_per_hour covers the last 24 hourly buckets
+READINGS_WINDOW = 24
+
+# the average measurements cover the last week of hourly buckets
+AVERAGE_WINDOW = pd.Timedelta(days=7)
+
+
+class ProviderStatsSnapshot:
+    """
+    Immutable per-provider stats computed from one version of the store.
+
+    `stats` maps each provider (and "all") to total_stations,
+    active_stations, avg_temperature, avg_humidity, avg_wind_speed,
+    readings_per_hour ({hourly bucket timestamp: readings}, oldest first) and
+    latest_readings (readings in the last complete hour).
+    """
+
+    def __init__(self, stats, version, seconds):
+        self.stats = stats
+        self.version = version
+        self.seconds = seconds
+        self.computed_at = time.time()
+
+
+def _empty_stats():
+    return {
+        "total_stations": 0,
+        "active_stations": 0,
+        "avg_temperature": float("nan"),
+        "avg_humidity": float("nan"),
+        "avg_wind_speed": float("nan"),
+        "readings_per_hour": {},
+        "latest_readings": 0,
+    }
+
+
+def compute_provider_stats(store):
+    """
+    Compute the stats of every provider from the store's latest table and
+    hourly queries.
+
+    The queries are planned on the hourly rollups, so only the per-station
+    and per-hour tables are scanned, never the raw observations.
+    """
+    providers = list(dict.fromkeys(list(PROVIDER_FILES) + store.providers))
+    stats = {p: _empty_stats() for p in ["all"] + providers}
+
+    latest = store.latest.table
+    if not latest.empty:
+        provider = latest["provider"].astype(str)
+        active = (latest["status"].astype(str) == "active") & (
+            latest["timestamp"] >= latest["timestamp"].max() - ACTIVE_WINDOW
+        )
+        counts = pd.DataFrame({"total": 1, "active": active.astype(int)}).groupby(provider.to_numpy()).sum()
+        counts.loc["all"] = counts.sum()
+        for p, row in counts.iterrows():
+            stats.setdefault(p, _empty_stats())
+            stats[p]["total_stations"] = int(row["total"])
+            stats[p]["active_stations"] = int(row["active"])
+
+    newest = store.rollups.span("all", "hourly")[1]
+    if newest is None:
+        return stats
+    first = newest - pd.Timedelta(hours=READINGS_WINDOW - 1)
+    hours = pd.date_range(first, newest, freq="h")
+    for p in ["all"] + store.providers:
+        # hourly sums and counts, combined into one mean per measurement
+        window = {"providers": p, "start": newest - AVERAGE_WINDOW, "metrics": ROLLUP_COLUMNS, "store": store}
+        sums = query(aggregation="sum", **window)
+        counts = query(aggregation="count", **window)
+        stats.setdefault(p, _empty_stats())
+        for col, key in zip(ROLLUP_COLUMNS, ["avg_temperature", "avg_humidity", "avg_wind_speed"]):
+            count = counts.values[col].sum() if len(counts) else 0
+            stats[p][key] = float(np.nansum(sums.values[col]) / count) if count else float("nan")
+
+        # one value per bucket in the window, oldest first (gaps count as zero)
+        recent = query(p, start=first, end=newest, metrics=(), aggregation="count", store=store)
+        readings = pd.Series(recent.readings if len(recent) else [], index=recent.time, dtype="int64")
+        values = readings.reindex(hours, fill_value=0).astype(int).tolist()
+        stats[p]["readings_per_hour"] = dict(zip(hours, values))
+        stats[p]["latest_readings"] = values[-2] if len(values) > 1 else values[-1]
+    return stats
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def refresh_provider_stats(store=None):
+    """
+    Recompute the stats if the store changed and publish them as a new snapshot.
+    """
+    global _snapshot
+    store = store or get_store()
+    with _snapshot_lock:
+        version = store.data_version
+        if _snapshot is not None and _snapshot.version == version:
+            return _snapshot
+        start = time.perf_counter()
+        stats = compute_provider_stats(store)
+        # readers pick up the new snapshot with a single reference swap
+        _snapshot = ProviderStatsSnapshot(stats, version, time.perf_counter() - start)
+    return _snapshot
+
+
+def provider_stats_snapshot():
+    """
+    Return the latest published snapshot, computing the first one if needed.
+    """
+    return _snapshot or refresh_provider_stats()
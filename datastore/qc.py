@@ -0,0 +1,244 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+# OBSERVATION_QC=off stores observations without QC flags (every value counts)
+QC = os.getenv("OBSERVATION_QC", "on")
+
+QC_MEASUREMENTS = ["temperature", "humidity", "wind_speed"]
+
+# measurement -> (plausible range, largest change between consecutive readings,
+# readings in a row with the same value before the sensor counts as stuck)
+LIMITS = {
+    "temperature": ((-60.0, 60.0), 10.0, 24),
+    "humidity": ((0.0, 100.0), 40.0, 24),
+    "wind_speed": ((0.0, 75.0), 25.0, 48),
+}
+
+# values that may legitimately repeat for hours (calm air)
+PERSISTENCE_EXEMPT = {"wind_speed": 0.0}
+
+# the step check only compares readings at most this far apart
+STEP_MAX_GAP = pd.Timedelta(minutes=30)
+
+# highest dew point (deg C) air can plausibly hold; the record is about 35
+DEW_POINT_MAX = 35.0
+# below freezing, humidity (relative to water) can exceed ice saturation by at most this factor
+ICE_SUPERSATURATION = 1.1
+
+# flag bits: range, step and persistence per measurement, then record-wide checks
+RANGE, STEP, PERSISTENCE = 1, 2, 4
+ZEROED = 1 << (3 * len(QC_MEASUREMENTS))  # every measurement exactly 0, a logger reporting defaults
+DEW_POINT = ZEROED << 1  # temperature and humidity imply air that cannot exist
+FLAG_DTYPE = np.uint16
+
+# record-wide flag -> the measurements it invalidates
+RECORD_FLAGS = {ZEROED: QC_MEASUREMENTS, DEW_POINT: ["temperature", "humidity"]}
+
+NAT = np.iinfo(np.int64).min  # datetime64 NaT as int64, a station without readings yet
+
+
+def flag(measurement, check):
+    """
+    Return the bit of a per-measurement check (RANGE, STEP or PERSISTENCE).
+    """
+    return check << (3 * QC_MEASUREMENTS.index(measurement))
+
+
+def flag_mask(measurement=None):
+    """
+    Return the bits that invalidate a measurement, or any measurement for None.
+    """
+    if measurement is None:
+        return (max(RECORD_FLAGS) << 1) - 1
+    if measurement not in QC_MEASUREMENTS:
+        return 0
+    mask = flag(measurement, RANGE | STEP | PERSISTENCE)
+    for bit, measurements in RECORD_FLAGS.items():
+        if measurement in measurements:
+            mask |= bit
+    return mask
+
+
+def good(flags, measurement=None):
+    """
+    Return a boolean array that is True where a measurement passed QC.
+    """
+    return (np.asarray(flags) & flag_mask(measurement)) == 0
+
+
+def masked(frame, measurement):
+    """
+    Return a measurement column as a float64 array with flagged values set to NaN.
+    """
+    values = frame[measurement].to_numpy(np.float64)
+    if "qc" in frame.columns and measurement in QC_MEASUREMENTS:
+        values = np.where(good(frame["qc"].to_numpy(), measurement), values, np.nan)
+    return values
+
+
+def implausible_humidity(temperature, humidity):
+    """
+    Return True where a temperature (deg C) and relative humidity (%) cannot
+    occur together: their dew point is above DEW_POINT_MAX, or, below
+    freezing, the humidity is well above saturation over ice.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Magnus formula over water, and the ratio of ice to water saturation vapour pressure
+        gamma = np.log(humidity / 100) + 17.62 * temperature / (243.12 + temperature)
+        dew_point = 243.12 * gamma / (17.62 - gamma)
+        ice = np.exp(22.46 * temperature / (272.62 + temperature) - 17.62 * temperature / (243.12 + temperature))
+    too_humid = (temperature < 0) & (humidity > 100 * ice * ICE_SUPERSATURATION)
+    return (dew_point > DEW_POINT_MAX) | too_humid
+
+
+def _run_lengths(repeat, weights):
+    # length of the run of repeated values ending at each row; a run's first
+    # row starts with its weight (the run carried over from earlier batches)
+    total = np.cumsum(weights)
+    starts = np.flatnonzero(~repeat)
+    run = np.cumsum(~repeat) - 1
+    return total - (total[starts] - weights[starts])[run]
+
+
+class QualityControl:
+    """
+    Range, step, persistence and cross-variable checks over observations.
+
+    check() flags a batch with whole-array operations: rows are ordered by
+    station (and time), and each one is compared with the station's previous
+    readings. The last two readings of every station and its run of repeated
+    values are kept, so each batch is checked against the stored history
+    without rereading it. Rows without a station id get only the range and
+    cross-variable checks.
+    """
+
+    def __init__(self):
+        # per-station state, one slot per station in `stations`: the last reading, the one before it,
+        # whether the last one jumped, and its run of repeated values
+        self.stations = pd.Index([], dtype=object)
+        self._state = {"timestamp": np.zeros(0, dtype=np.int64)}
+        for m in QC_MEASUREMENTS:
+            self._state[m] = np.zeros(0, dtype=np.float64)
+            self._state[f"{m}_before"] = np.zeros(0, dtype=np.float64)
+            self._state[f"{m}_jump"] = np.zeros(0, dtype=np.int64)
+            self._state[f"{m}_run"] = np.zeros(0, dtype=np.int64)
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """
+        Return the last reading and run lengths of every station seen so far.
+        """
+        state = dict(self._state, timestamp=self._state["timestamp"].view("datetime64[ns]"))
+        return pd.DataFrame(state, index=self.stations)
+
+    def _slots(self, names):
+        # state slots of the given stations, adding slots for new ones
+        slots = self.stations.get_indexer(names)
+        new = slots < 0
+        if new.any():
+            slots[new] = np.arange(len(self.stations), len(self.stations) + new.sum())
+            self.stations = self.stations.append(pd.Index(names[new], dtype=object))
+            for key, values in self._state.items():
+                fill = np.full(new.sum(), NAT if key == "timestamp" else 0, dtype=values.dtype)
+                self._state[key] = np.concatenate([values, fill])
+        return slots
+
+    def check(self, batch):
+        """
+        Return the QC flags of a batch (one FLAG_DTYPE per row, in row order).
+
+        Batches are expected in time order per station, as they are ingested.
+        """
+        flags = np.zeros(len(batch), dtype=FLAG_DTYPE)
+        if batch.empty:
+            return flags
+        stations = batch["station_id"]
+        if isinstance(stations.dtype, pd.CategoricalDtype):
+            codes, names = stations.cat.codes.to_numpy(np.int64), stations.cat.categories.astype(str)
+        else:
+            codes, names = pd.factorize(stations)
+            codes, names = codes.astype(np.int64), pd.Index(names).astype(str)
+        measurements = [m for m in QC_MEASUREMENTS if m in batch.columns]
+        columns = {m: batch[m].to_numpy(np.float64) for m in measurements}
+        for m in measurements:
+            (low, high), _, _ = LIMITS[m]
+            flags |= np.where((columns[m] < low) | (columns[m] > high), flag(m, RANGE), 0).astype(FLAG_DTYPE)
+        if measurements:
+            zeroed = np.logical_and.reduce([columns[m] == 0 for m in measurements])
+            flags[zeroed] |= FLAG_DTYPE(ZEROED)
+        if "temperature" in columns and "humidity" in columns:
+            flags[implausible_humidity(columns["temperature"], columns["humidity"])] |= FLAG_DTYPE(DEW_POINT)
+
+        # the station checks need a station: rows without one (code -1) are left out
+        rows = np.flatnonzero(codes >= 0)
+        if len(rows) < len(codes):
+            codes = codes[rows]
+            columns = {m: values[rows] for m, values in columns.items()}
+        times = batch["timestamp"].to_numpy("datetime64[ns]").view(np.int64)[rows]
+
+        with self._lock:
+            # each station's last stored reading goes in front of the batch
+            present = np.zeros(len(names), dtype=bool)
+            present[codes] = True
+            slots = self._slots(names)
+            state = self._state
+            prior = np.flatnonzero(present & (state["timestamp"][slots] != NAT))
+            prior_slots = slots[prior]
+            n_prior = len(prior)
+            all_codes = np.concatenate([prior, codes])
+            all_times = np.concatenate([state["timestamp"][prior_slots], times])
+            if (np.diff(times) >= 0).all():
+                # already in time order: a stable sort by station is enough
+                order = np.argsort(all_codes, kind="stable")
+            else:
+                order = np.lexsort((np.arange(len(all_codes)), all_times, all_codes))
+            sorted_codes = all_codes[order]
+            sorted_times = all_times[order]
+            same = np.zeros(len(order), dtype=bool)
+            same[1:] = sorted_codes[1:] == sorted_codes[:-1]
+            close = same.copy()
+            close[1:] &= np.diff(sorted_times) <= STEP_MAX_GAP.value
+            last = np.flatnonzero(np.append(sorted_codes[1:] != sorted_codes[:-1], True))
+
+            sorted_flags = np.zeros(len(order), dtype=FLAG_DTYPE)
+            updated = slots[sorted_codes[last]]
+            state["timestamp"][updated] = sorted_times[last]
+            carried = order < n_prior
+            # the row after each carried one, the station's first in the batch
+            after_carried = np.flatnonzero(carried) + 1
+            after_carried = after_carried[after_carried < len(order)]
+            after_carried = after_carried[same[after_carried]]
+            for m in measurements:
+                _, max_step, max_repeats = LIMITS[m]
+                values = np.concatenate([state[m][prior_slots], columns[m]])[order]
+                jump = np.zeros(len(order), dtype=bool)
+                jump[1:] = close[1:] & (np.abs(values[1:] - values[:-1]) > max_step)
+                jump[carried] = state[f"{m}_jump"][prior_slots][order[carried]] > 0
+                # a jump back to the reading before a jump: that jump was a spike and this reading is good
+                before = np.full(len(order), np.nan)
+                before[2:] = np.where(same[2:] & same[1:-1], values[:-2], np.nan)
+                before[after_carried] = state[f"{m}_before"][prior_slots][order[after_carried - 1]]
+                returned = np.zeros(len(order), dtype=bool)
+                returned[1:] = jump[:-1] & (np.abs(values[1:] - before[1:]) <= max_step)
+                repeat = np.zeros(len(order), dtype=bool)
+                repeat[1:] = same[1:] & (values[1:] == values[:-1])
+                if m in PERSISTENCE_EXEMPT:
+                    repeat &= values != PERSISTENCE_EXEMPT[m]
+                weights = np.ones(len(order), dtype=np.int64)
+                weights[carried] = np.maximum(state[f"{m}_run"][prior_slots][order[carried]], 1)
+                runs = _run_lengths(repeat, weights)
+                stuck = runs >= max_repeats
+                sorted_flags |= np.where(jump & ~returned, flag(m, STEP), 0).astype(FLAG_DTYPE)
+                sorted_flags |= np.where(stuck, flag(m, PERSISTENCE), 0).astype(FLAG_DTYPE)
+                state[f"{m}_before"][updated] = np.where(same[last], values[last - 1], np.nan)
+                state[m][updated] = values[last]
+                state[f"{m}_jump"][updated] = jump[last]
+                state[f"{m}_run"][updated] = runs[last]
+
+            from_batch = order >= n_prior
+            flags[rows[order[from_batch] - n_prior]] |= sorted_flags[from_batch]
+        return flags
@@ -0,0 +1,211 @@
+import numpy as np
+import pandas as pd
+
+from datastore.observations import get_store
+from datastore.qc import masked
+from datastore.rollups import FREQUENCIES, ROLLUP_COLUMNS, _reaggregate
+
+AGGREGATIONS = ("mean", "sum", "count", "min", "max")
+
+# stored rollup statistics each aggregation is derived from
+_ROLLUP_STATS = {"mean": ("sum", "count"), "sum": ("sum",), "count": ("count",), "min": ("min",), "max": ("max",)}
+
+
+def _timedelta(freq):
+    return pd.Timedelta(pd.tseries.frequencies.to_offset(freq))
+
+
+class QueryPlan:
+    """
+    Where a query reads from: a rollup table ("5min", "hourly", "daily") or
+    the raw observations ("raw"), and the bucket frequency of the result
+    (None for unaggregated rows).
+    """
+
+    def __init__(self, source, freq, providers):
+        self.source = source
+        self.freq = freq
+        self.providers = providers
+
+    def __repr__(self):
+        providers = "all" if self.providers is None else ",".join(self.providers)
+        return f"QueryPlan(source={self.source}, freq={self.freq}, providers={providers})"
+
+
+class QueryResult:
+    """
+    Query result columns as NumPy arrays.
+
+    `time` holds the bucket starts (datetime64[ns]), `values` maps each
+    metric to its aggregated values and `readings` counts the observations in
+    each bucket. Unbucketed queries return one entry per observation, in
+    storage order, with `station` set and no `readings`.
+    """
+
+    def __init__(self, plan, time, values, readings=None, station=None):
+        self.plan = plan
+        self.time = time
+        self.values = values
+        self.readings = readings
+        self.station = station
+
+    def __len__(self):
+        return len(self.time)
+
+    def frame(self):
+        columns = {"timestamp": self.time}
+        if self.station is not None:
+            columns["station_id"] = self.station
+        columns.update(self.values)
+        if self.readings is not None:
+            columns["readings"] = self.readings
+        return pd.DataFrame(columns)
+
+
+def _providers(store, providers):
+    # None means every provider; unknown providers fall back to all of them, like store.view()
+    if providers is None or providers == "all":
+        return None
+    if isinstance(providers, str):
+        providers = [providers]
+    known = [p for p in providers if p in store.providers]
+    return known or None
+
+
+def plan(
+    store, providers="all", stations=None, metrics=("temperature",), aggregation="mean", bucket="hourly", flagged=False
+):
+    """
+    Choose the cheapest source for a query.
+
+    Bucketed queries without a station filter read the coarsest rollup whose
+    buckets evenly divide the requested ones; everything else scans the
+    matching raw observations. The rollups leave out values flagged by QC,
+    so queries that include them scan too.
+    """
+    if aggregation not in AGGREGATIONS:
+        raise ValueError(f"unknown aggregation {aggregation!r}, expected one of {AGGREGATIONS}")
+    providers = _providers(store, providers)
+    if bucket is None:
+        return QueryPlan("raw", None, providers)
+    freq = FREQUENCIES.get(bucket, bucket)
+    step = _timedelta(freq)
+    if stations is None and not flagged and all(m in ROLLUP_COLUMNS for m in metrics):
+        for name in reversed(list(FREQUENCIES)):
+            if not store.rollups.tables[name].empty and step % _timedelta(FREQUENCIES[name]) == pd.Timedelta(0):
+                return QueryPlan(name, freq, providers)
+    return QueryPlan("raw", freq, providers)
+
+
+def _empty(query_plan, metrics):
+    time = np.array([], dtype="datetime64[ns]")
+    values = {m: np.array([], dtype=np.float64) for m in metrics}
+    if query_plan.freq is None:
+        return QueryResult(query_plan, time, values, station=np.array([], dtype=object))
+    return QueryResult(query_plan, time, values, readings=np.array([], dtype=np.int64))
+
+
+def _fill(rows, freq):
+    # keep empty buckets inside the range so the result lines up with a regular time axis
+    full = pd.date_range(rows.index.min(), rows.index.max(), freq=freq)
+    if len(full) == len(rows):
+        return rows
+    return rows.reindex(full)
+
+
+def _query_rollup(store, query_plan, start, end, metrics, aggregation):
+    table = store.rollups.tables[query_plan.source]
+    columns = ["readings"] + [f"{m}_{stat}" for m in metrics for stat in _ROLLUP_STATS[aggregation]]
+    table = table[[c for c in columns if c in table.columns]]
+    providers = table.index.get_level_values("provider")
+    buckets = table.index.get_level_values("bucket")
+    mask = np.ones(len(table), dtype=bool)
+    if query_plan.providers is not None:
+        mask &= providers.isin(query_plan.providers)
+    if start is not None:
+        mask &= buckets >= pd.Timestamp(start)
+    if end is not None:
+        mask &= buckets <= pd.Timestamp(end)
+    if not mask.any():
+        return _empty(query_plan, metrics)
+    table, buckets = table[mask], buckets[mask]
+    if query_plan.freq != FREQUENCIES[query_plan.source]:
+        buckets = buckets.floor(query_plan.freq)
+    rows = _fill(_reaggregate(table, buckets), query_plan.freq)
+
+    readings = rows["readings"].fillna(0).to_numpy(np.int64)
+    values = {}
+    for m in metrics:
+        if aggregation == "mean":
+            count = rows[f"{m}_count"].to_numpy(np.float64)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                values[m] = np.where(count > 0, rows[f"{m}_sum"].to_numpy(np.float64) / count, np.nan)
+        elif aggregation == "count":
+            values[m] = rows[f"{m}_count"].fillna(0).to_numpy(np.int64)
+        else:
+            values[m] = rows[f"{m}_{aggregation}"].to_numpy(np.float64)
+    return QueryResult(query_plan, rows.index.to_numpy(), values, readings=readings)
+
+
+def _query_raw(store, query_plan, start, end, stations, metrics, aggregation, flagged=False):
+    columns = ["timestamp", "station_id"] + list(metrics)
+    rows = store.select(query_plan.providers, start, end, stations, columns + ["qc"])
+    if rows.empty:
+        return _empty(query_plan, metrics)
+    if flagged:
+        values = {m: rows[m].to_numpy(np.float64) for m in metrics}
+    else:
+        values = {m: masked(rows, m) for m in metrics}
+    if query_plan.freq is None:
+        return QueryResult(query_plan, rows["timestamp"].to_numpy(), values, station=rows["station_id"].to_numpy())
+
+    keys = rows["timestamp"].dt.floor(query_plan.freq).to_numpy()
+    grouped = pd.DataFrame(values).groupby(keys)
+    agg = grouped.agg(aggregation)
+    agg["readings"] = grouped.size()
+    agg = _fill(agg, query_plan.freq)
+    values = {}
+    for m in metrics:
+        if aggregation == "count":
+            values[m] = agg[m].fillna(0).to_numpy(np.int64)
+        elif aggregation == "sum":
+            # empty buckets have no sum rather than a zero one, as with the rollups
+            values[m] = agg[m].where(agg["readings"] > 0).to_numpy(np.float64)
+        else:
+            values[m] = agg[m].to_numpy(np.float64)
+    readings = agg["readings"].fillna(0).to_numpy(np.int64)
+    return QueryResult(query_plan, agg.index.to_numpy(), values, readings=readings)
+
+
+def query(
+    providers="all",
+    start=None,
+    end=None,
+    stations=None,
+    metrics=("temperature",),
+    aggregation="mean",
+    bucket="hourly",
+    flagged=False,
+    store=None,
+):
+    """
+    Aggregate observations into time buckets and return them as NumPy arrays.
+
+    providers: a provider, a list of them, or "all"
+    start, end: inclusive time range (None for unbounded)
+    stations: station ids to restrict to (None for every station)
+    metrics: measurement columns to aggregate
+    aggregation: one of AGGREGATIONS, applied to every metric
+    bucket: a rollup name ("5min", "hourly", "daily"), a pandas frequency
+        ("15min", "6h"), or None for the matching observations themselves
+    flagged: keep values that failed QC (they are NaN otherwise)
+
+    The result's `plan` tells which source answered it (see plan()).
+    """
+    store = store or get_store()
+    if isinstance(metrics, str):
+        metrics = (metrics,)
+    query_plan = plan(store, providers, stations, metrics, aggregation, bucket, flagged)
+    if query_plan.source == "raw":
+        return _query_raw(store, query_plan, start, end, stations, metrics, aggregation, flagged)
+    return _query_rollup(store, query_plan, start, end, metrics, aggregation)
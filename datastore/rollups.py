@@ -0,0 +1,186 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from datastore.qc import masked
+
+ROLLUP_COLUMNS = ["temperature", "humidity", "wind_speed"]
+
+# bucket name -> pandas frequency, finest first; the finest is aggregated from
+# raw rows and every coarser one from it
+FREQUENCIES = {"5min": "5min", "hourly": "h", "daily": "D"}
+
+# days of hourly and daily buckets kept, counted back from the newest reading; 0 keeps them all.
+# 5-minute buckets follow the raw observations' retention window (OBSERVATION_RETENTION_HOURS)
+ROLLUP_RETENTION_DAYS = float(os.getenv("ROLLUP_RETENTION_DAYS", "365"))
+
+# how each stored statistic combines with itself across batches / providers
+_COMBINE = {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+
+
+def _aggregate(batch, freq):
+    """
+    Aggregate raw observations into (provider, bucket) rows.
+    """
+    keys = [batch["provider"], batch["timestamp"].dt.floor(freq).rename("bucket")]
+    columns = {"timestamp": batch["timestamp"]}
+    named = {"readings": ("timestamp", "size")}
+    for col in ROLLUP_COLUMNS:
+        if col in batch.columns:
+            # values flagged by QC count as readings but not in the statistics
+            columns[col] = masked(batch, col)
+            for stat in _COMBINE:
+                named[f"{col}_{stat}"] = (col, stat)
+    agg = pd.DataFrame(columns, index=batch.index).groupby(keys, observed=True).agg(**named)
+    # keep sums in float64 so totals merged across batches don't lose precision
+    sums = [col for col in agg.columns if col.endswith("_sum")]
+    agg[sums] = agg[sums].astype(np.float64)
+    agg.index = agg.index.set_names(["provider", "bucket"])
+    return agg
+
+
+def _reaggregate(agg, keys):
+    """
+    Combine already aggregated rows that share the same keys.
+    """
+    how = {col: _COMBINE.get(col.rsplit("_", 1)[-1], "sum") for col in agg.columns}
+    return agg.groupby(keys, observed=True).agg(how)
+
+
+class Rollups:
+    """
+    5-minute, hourly and daily aggregates per provider.
+
+    Stores sum, count, min and max of each measurement so that means can be
+    derived for any window and new batches merge without revisiting raw rows.
+    Each table is indexed by (provider, bucket) and ordered by bucket.
+    """
+
+    def __init__(self, retention_days=ROLLUP_RETENTION_DAYS):
+        self.tables = {name: pd.DataFrame() for name in FREQUENCIES}
+        self.retention = pd.Timedelta(days=retention_days) if retention_days else None
+        self.newest = None
+        self._lock = threading.Lock()
+
+    def update(self, batch):
+        """
+        Fold a batch of new observations into every rollup table.
+        """
+        if batch.empty:
+            return
+        finest, *coarser = FREQUENCIES
+        base = _aggregate(batch, FREQUENCIES[finest])
+        increments = {finest: base}
+        provider = base.index.get_level_values("provider")
+        bucket = base.index.get_level_values("bucket")
+        for name in coarser:
+            # coarser buckets are built from the finest rows, not the raw batch
+            keys = [provider, bucket.floor(FREQUENCIES[name])]
+            increments[name] = _reaggregate(base, keys).rename_axis(["provider", "bucket"])
+
+        newest = batch["timestamp"].max()
+        with self._lock:
+            for name, increment in increments.items():
+                self.tables[name] = self._merge(self.tables[name], increment)
+            self.newest = newest if self.newest is None else max(self.newest, newest)
+
+    @staticmethod
+    def _merge(table, increment):
+        # tables are kept ordered by bucket, so new readings only touch the rows from the
+        # increment's first bucket on; the rest of the table is never re-sorted
+        if table.empty:
+            return increment.sort_index(level="bucket")
+        first = increment.index.get_level_values("bucket").min()
+        split = table.index.get_level_values("bucket").searchsorted(first)
+        head, tail = table.iloc[:split], table.iloc[split:]
+        overlap = increment.index.intersection(tail.index)
+        if len(overlap):
+            increment = _reaggregate(pd.concat([tail.loc[overlap], increment]), ["provider", "bucket"])
+            tail = tail.drop(overlap)
+        if not tail.empty:
+            # other providers' rows in the same buckets, or a late batch: sort just the tail
+            increment = pd.concat([tail, increment])
+        return pd.concat([head, increment.sort_index(level="bucket")])
+
+    def trim(self, before=None):
+        """
+        Drop buckets that end before their retention cutoff.
+
+        The finest buckets are cut at `before`, the raw observations' cutoff
+        (None keeps them); the coarser ones are kept for the rollup retention
+        from the newest reading. A bucket holding a cutoff is kept, so the
+        rollups always cover the whole retention window.
+        """
+        finest = next(iter(FREQUENCIES))
+        with self._lock:
+            for name, freq in FREQUENCIES.items():
+                table = self.tables[name]
+                if name == finest:
+                    cutoff = before
+                else:
+                    cutoff = self.newest - self.retention if self.retention is not None and self.newest else None
+                if table.empty or cutoff is None:
+                    continue
+                keep = table.index.get_level_values("bucket") >= cutoff.floor(freq)
+                if not keep.all():
+                    self.tables[name] = table[keep]
+
+    def resolution(self, span, max_rows, finest=None):
+        """
+        Return the finest bucket with at most max_rows buckets in a time span.
+
+        Falls back to the coarsest bucket; `finest` excludes finer ones.
+        """
+        names = list(FREQUENCIES)
+        if finest is not None:
+            names = names[names.index(finest) :]
+        for name in names:
+            if span / pd.Timedelta(pd.tseries.frequencies.to_offset(FREQUENCIES[name])) <= max_rows:
+                return name
+        return names[-1]
+
+    def span(self, provider="all", bucket="hourly"):
+        """
+        Return the (first, last) bucket stored for a provider, or for all providers.
+        """
+        table = self.tables[bucket]
+        if table.empty:
+            return None, None
+        buckets = table.index.get_level_values("bucket")
+        if provider != "all":
+            mask = table.index.get_level_values("provider") == provider
+            if mask.any():
+                buckets = buckets[mask]
+        return buckets.min(), buckets.max()
+
+    def series(self, provider="all", bucket="hourly", start=None, end=None):
+        """
+        Return one row per bucket for a provider (or all providers combined).
+
+        Empty buckets inside the range are kept, with zero readings, so the
+        result lines up with a regular time axis. Mean columns are derived
+        from the stored sums and counts.
+        """
+        table = self.tables[bucket]
+        if table.empty:
+            return table
+        mask = table.index.get_level_values("provider") == provider
+        if provider != "all" and mask.any():
+            rows = table[mask].droplevel("provider")
+        else:
+            rows = _reaggregate(table, "bucket")
+
+        if start is not None or end is not None:
+            rows = rows.loc[start:end]
+        if not rows.empty:
+            full = pd.date_range(rows.index.min(), rows.index.max(), freq=FREQUENCIES[bucket], name="bucket")
+            rows = rows.reindex(full)
+            for col in rows.columns:
+                if col == "readings" or col.endswith("_count"):
+                    rows[col] = rows[col].fillna(0).astype(np.int64)
+        for col in ROLLUP_COLUMNS:
+            if f"{col}_sum" in rows.columns:
+                rows[f"{col}_mean"] = rows[f"{col}_sum"] / rows[f"{col}_count"].replace(0, np.nan)
+        return rows
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+# side of a grid cell in degrees; a mesonet map view spans a few to a few dozen cells
+GRID_CELL = 0.5
+
+
+class StationGrid:
+    """
+    Uniform latitude/longitude grid over station positions.
+
+    Stations are sorted by cell (row-major), so a bounding box query is one
+    binary search per grid row plus an exact filter of the candidate cells.
+    Positions refer to rows of the table the grid was built from.
+    """
+
+    def __init__(self, latitude, longitude, cell=GRID_CELL):
+        self.cell = cell
+        lat = np.asarray(latitude, dtype=np.float64)
+        lon = np.asarray(longitude, dtype=np.float64)
+        valid = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+        self.latitude, self.longitude = lat, lon
+        if not len(valid):
+            self.lat0 = self.lon0 = 0.0
+            self.columns = 1
+            self.order = self.keys = np.empty(0, dtype=np.int64)
+            return
+        self.lat0 = float(np.floor(lat[valid].min() / cell) * cell)
+        self.lon0 = float(np.floor(lon[valid].min() / cell) * cell)
+        self.columns = int((lon[valid].max() - self.lon0) // cell) + 1
+        keys = self._key(self._row(lat[valid]), self._column(lon[valid]))
+        order = np.argsort(keys, kind="stable")
+        self.order = valid[order]
+        self.keys = keys[order]
+
+    def __len__(self):
+        return len(self.order)
+
+    def _row(self, lat):
+        return np.floor((lat - self.lat0) / self.cell).astype(np.int64)
+
+    def _column(self, lon):
+        return np.floor((lon - self.lon0) / self.cell).astype(np.int64)
+
+    def _key(self, row, column):
+        return row * self.columns + column
+
+    def query(self, west, south, east, north):
+        """
+        Return the sorted positions of the stations inside a bounding box.
+        """
+        if not len(self.order):
+            return self.order
+        first_row, last_row = self._row(np.array([south, north]))
+        first_col, last_col = np.clip(self._column(np.array([west, east])), 0, self.columns - 1)
+        last_row = min(last_row, self.keys[-1] // self.columns)
+        rows = np.arange(max(first_row, 0), last_row + 1)
+        if not len(rows) or first_col > last_col:
+            return self.order[:0]
+
+        # one contiguous run of keys per grid row
+        starts = np.searchsorted(self.keys, self._key(rows, first_col), side="left")
+        stops = np.searchsorted(self.keys, self._key(rows, last_col), side="right")
+        lengths = stops - starts
+        offsets = np.repeat(starts - np.r_[0, np.cumsum(lengths)[:-1]], lengths)
+        candidates = self.order[np.arange(lengths.sum()) + offsets]
+
+        lat, lon = self.latitude[candidates], self.longitude[candidates]
+        inside = (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+        return np.sort(candidates[inside])
+
+
+def cell_degrees(zoom, pixels):
+    """
+    Degrees of longitude covered by `pixels` screen pixels at a map zoom level.
+    """
+    # a mapbox world is 512 px wide at zoom 0
+    return pixels * 360.0 / (512 * 2.0 ** zoom)
+
+
+def cluster(table, cell):
+    """
+    Aggregate stations into clusters, one per `cell`-degree square holding any.
+
+    Returns one row per cluster: mean latitude and longitude, the number of
+    stations, the number active, and a station_id for single-station cells.
+    Stations without a position are left out.
+    """
+    lat = table["latitude"].to_numpy(dtype=np.float64)
+    lon = table["longitude"].to_numpy(dtype=np.float64)
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    if not valid.all():
+        table, lat, lon = table[valid], lat[valid], lon[valid]
+    keys = np.floor(lat / cell).astype(np.int64) * (1 << 32) + np.floor(lon / cell).astype(np.int64)
+    _, group, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    active = (table["status"].astype(str) == "active").to_numpy() if "status" in table.columns else np.ones(len(lat))
+    clusters = pd.DataFrame(
+        {
+            "latitude": np.bincount(group, weights=lat) / counts,
+            "longitude": np.bincount(group, weights=lon) / counts,
+            "stations": counts,
+            "active": np.bincount(group, weights=active).astype(np.int64),
+        }
+    )
+    # single-station clusters keep their station's name for the hover label
+    first = np.full(len(counts), -1)
+    first[group[::-1]] = np.arange(len(group))[::-1]
+    names = table["station_id"].astype(str).to_numpy()[first]
+    clusters["station_id"] = np.where(counts == 1, names, "")
+    return clusters
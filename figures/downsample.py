@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+# points per trace for an unknown chart width, and the bounds for any width
+DEFAULT_WIDTH = 1000
+MIN_POINTS = 100
+MAX_POINTS = 4000
+
+
+def points_for_width(width):
+    """
+    Return the number of points to send for a chart `width` pixels wide.
+
+    About one point per pixel; widths are rounded up to 100 px so nearby
+    sizes share cached figures.
+    """
+    if not width:
+        width = DEFAULT_WIDTH
+    width = int(np.ceil(float(width) / 100) * 100)
+    return int(np.clip(width, MIN_POINTS, MAX_POINTS))
+
+
+def view_range(view):
+    """
+    Return (start, end, width) from a chart view: {"start", "end", "width"} as
+    stored by the zoom callback. start and end are Timestamps or None for the
+    full range.
+    """
+    view = view or {}
+    start, end = view.get("start"), view.get("end")
+    if start is None or end is None:
+        return None, None, view.get("width")
+    start, end = sorted([pd.Timestamp(start), pd.Timestamp(end)])
+    return start, end, view.get("width")
+
+
+def _as_float(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Indices of the points kept by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept; every bucket in between keeps
+    the point forming the largest triangle with the previously kept point and
+    the next bucket's average. Bucket bounds and averages are computed for
+    all buckets at once; only the choice that depends on the previous bucket
+    is made per bucket. NaN values are dropped first.
+    """
+    x = _as_float(x)
+    y = np.asarray(y, dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(y))
+    n = len(valid)
+    if n_out >= n or n_out < 3:
+        return valid
+    x, y = x[valid], y[valid]
+
+    # n_out - 2 buckets between the fixed first and last points
+    edges = np.floor(np.linspace(1, n - 1, n_out - 1)).astype(np.int64)
+    starts, stops = edges[:-1], edges[1:]
+    sizes = stops - starts
+    # reduceat runs the last bucket to the end of its input, so leave out the last point
+    avg_x = np.add.reduceat(x[:-1], starts) / sizes
+    avg_y = np.add.reduceat(y[:-1], starts) / sizes
+    # the next bucket's average for the last bucket is the last point
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        bx, by = x[starts[i] : stops[i]], y[starts[i] : stops[i]]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - next_x[i]) * (by - ay) - (ax - bx) * (next_y[i] - ay))
+        a = starts[i] + int(area.argmax())
+        kept[i + 1] = a
+    return valid[kept]
+
+
+def minmax_indices(x, y, n_out):
+    """
+    Indices of the minimum and maximum of y in n_out // 2 equal-width x buckets.
+
+    Keeps spikes that averaging would hide. Fully vectorized; x must be
+    sorted. Buckets without points are skipped and NaN values ignored.
+    """
+    xf = _as_float(x)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= n_out or n_out < 2:
+        return np.flatnonzero(~np.isnan(y))
+
+    edges = np.linspace(xf[0], xf[-1], n_out // 2 + 1)
+    bucket = np.clip(np.searchsorted(edges, xf, side="right") - 1, 0, len(edges) - 2)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    lows = np.fmin.reduceat(y, starts)
+    highs = np.fmax.reduceat(y, starts)
+
+    # first position in each bucket holding its min / max
+    group = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, n]))
+    keep = np.zeros(n, dtype=bool)
+    for extreme in (lows, highs):
+        hits = np.flatnonzero(y == extreme[group])
+        _, first = np.unique(group[hits], return_index=True)
+        keep[hits[first]] = True
+    return np.flatnonzero(keep)
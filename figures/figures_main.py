@@ -60,3 +60,37 @@ def map():
         map_bounds={"west": -130, "east": -63.5, "south": 24.0, "north": 53.0},
     )
     return fig
+
+
+def status_traces(lat, lon, status, status_colors, labels=None, text=None, hovertext=None, marker=None, **kwargs):
+    """
+    Build one Scattermapbox trace per status class from NumPy arrays.
+
+    Points are split with boolean masks instead of one trace per point, so the
+    figure size and the number of traces the browser renders stay constant as
+    the number of points grows. Each class keeps its own legend entry.
+    """
+    lat = np.asarray(lat)
+    lon = np.asarray(lon)
+    status = np.asarray(status)
+    labels = labels or {}
+    marker = marker or {}
+
+    traces = []
+    for key, color in status_colors.items():
+        mask = status == key
+        if not mask.any():
+            continue
+        traces.append(
+            go.Scattermapbox(
+                lat=lat[mask],
+                lon=lon[mask],
+                marker=dict(marker, color=color),
+                text=np.asarray(text)[mask] if text is not None else None,
+                hovertext=np.asarray(hovertext)[mask] if hovertext is not None else None,
+                hoverinfo="text",
+                name=labels.get(key, key),
+                **kwargs,
+            )
+        )
+    return traces
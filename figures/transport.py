@@ -0,0 +1,138 @@
+import base64
+import os
+
+import numpy as np
+from plotly.basedatatypes import BaseFigure
+
+# FIGURE_TRANSPORT=typed sends numeric trace data as compact typed arrays;
+# plotly leaves figures as plotly.py serializes them
+FIGURE_TRANSPORT = os.getenv("FIGURE_TRANSPORT", "typed")
+
+# fields plotted on a cartesian axis: hover labels are formatted by the axis,
+# so float32 rounding never shows
+AXIS_FIELDS = {"x": "xaxis", "y": "yaxis"}
+FLOAT32_FIELDS = {"x", "y", "z", "size"}
+
+# plotly.py's own skip list for typed arrays, plus fields holding labels
+SKIPPED_FIELDS = {"geojson", "layer", "layers", "range", "customdata", "text", "hovertext", "ids", "labels"}
+
+# plotly.js typed array names
+_DTYPES = {
+    "f8": np.float64,
+    "f4": np.float32,
+    "i4": np.int32,
+    "i2": np.int16,
+    "i1": np.int8,
+    "u4": np.uint32,
+    "u2": np.uint16,
+    "u1": np.uint8,
+}
+_NAMES = {np.dtype(dtype): name for name, dtype in _DTYPES.items()}
+
+
+def _decode(value):
+    # a typed array plotly.py already encoded ({"dtype": "f8", "bdata": ...})
+    if value.get("dtype") in _DTYPES and "bdata" in value and "shape" not in value:
+        return np.frombuffer(base64.b64decode(value["bdata"]), dtype=_DTYPES[value["dtype"]])
+    return None
+
+
+def _numeric(value):
+    """
+    Return value as a numeric or datetime64 NumPy array, or None if it is not one.
+    """
+    if isinstance(value, dict):
+        return _decode(value)
+    if isinstance(value, (list, tuple)):
+        if not value or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in value):
+            return None
+        value = np.asarray(value)
+    if not isinstance(value, np.ndarray) or value.ndim != 1:
+        return None
+    if value.dtype.kind in "iuf" or np.issubdtype(value.dtype, np.datetime64):
+        return value
+    return None
+
+
+def _encode(values):
+    """
+    Return the plotly.js typed array spec of a 1-D numeric array, or None.
+    """
+    if values.dtype.kind in "iu":
+        # the smallest integer type holding the values; JS has no 64-bit typed arrays
+        for dtype in (np.int8, np.uint8, np.int16, np.uint16, np.int32, np.uint32):
+            info = np.iinfo(dtype)
+            if not len(values) or (values.min() >= info.min and values.max() <= info.max):
+                values = values.astype(dtype, copy=False)
+                break
+    name = _NAMES.get(values.dtype)
+    if name is None:
+        return None
+    return {"dtype": name, "bdata": base64.b64encode(np.ascontiguousarray(values)).decode("ascii")}
+
+
+def _float32(values):
+    # keep float64 where the spread is tiny next to the magnitude (epoch
+    # times, say), which float32 would collapse into repeated values
+    finite = values[np.isfinite(values)]
+    if len(finite):
+        scale = np.abs(finite).max()
+        if scale and (finite.max() - finite.min()) < scale * 1e-3:
+            return values
+    return values.astype(np.float32)
+
+
+def _compact_trace(trace, layout, key=None):
+    for field, value in trace.items():
+        if field in SKIPPED_FIELDS:
+            continue
+        if isinstance(value, dict):
+            if "bdata" not in value:
+                _compact_trace(value, layout, field)
+                continue
+            if value.get("dtype") != "f8" or field not in FLOAT32_FIELDS:
+                # already as compact as it gets
+                continue
+        values = _numeric(value)
+        if values is None:
+            continue
+        if np.issubdtype(values.dtype, np.datetime64):
+            if key is not None or field not in AXIS_FIELDS:
+                continue
+            # date axes accept milliseconds since the epoch, read as wall-clock time
+            axis = AXIS_FIELDS[field] + trace.get(field + "axis", field)[1:]
+            axis_layout = layout.setdefault(axis, {})
+            if axis_layout.get("type", "date") != "date":
+                continue
+            axis_layout["type"] = "date"
+            ms = values.astype("datetime64[ms]").astype(np.int64).astype(np.float64)
+            ms[np.isnat(values)] = np.nan
+            values = ms
+        elif values.dtype.kind == "f" and field in FLOAT32_FIELDS and (key is None or key == "marker"):
+            values = _float32(values.astype(np.float64, copy=False))
+        encoded = _encode(values)
+        if encoded is not None:
+            trace[field] = encoded
+
+
+def compact_figure(figure):
+    """
+    Return a figure's JSON dict with numeric trace data as typed arrays.
+
+    Numeric lists and arrays are written as base64 typed arrays instead of
+    number text, datetime x/y values as float64 milliseconds on a date axis,
+    and float x/y/z/marker sizes as float32. With FIGURE_TRANSPORT=plotly the
+    figure is returned as plotly.py serializes it. Anything other than a
+    go.Figure or a figure dict (one with "data") is returned unchanged.
+    """
+    if isinstance(figure, BaseFigure):
+        figure = figure.to_plotly_json()
+    elif not isinstance(figure, dict) or "data" not in figure:
+        # e.g. Dash components, which have to_plotly_json too but are not figures
+        return figure
+    if FIGURE_TRANSPORT != "typed":
+        return figure
+    layout = figure.setdefault("layout", {})
+    for trace in figure.get("data", []):
+        _compact_trace(trace, layout)
+    return figure
@@ -0,0 +1,36 @@
+"""
+gunicorn settings for the production server, overridable by environment.
+
+The app is preloaded in the master process with every page built eagerly.
+Observations are kept in the memory-mapped dataset, so all workers read the
+same pages of the OS page cache, even after each has ingested new batches.
+"""
+import multiprocessing
+import os
+
+# build page data in the master before forking; a background warm-up
+# thread would not survive the fork
+os.environ.setdefault("PAGE_LOADING", "eager")
+os.environ.setdefault("OBSERVATION_STORAGE", "dataset")
+# likewise the ingest watcher, host metrics and scheduler threads are started in each worker, see post_fork
+os.environ.setdefault("INGEST_WATCH", "post_fork")
+os.environ.setdefault("HOST_METRICS", "post_fork")
+os.environ.setdefault("SCHEDULER", "post_fork")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '10000')}"
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count()))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_class = "gthread"
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+accesslog = os.getenv("GUNICORN_ACCESSLOG")  # e.g. "-" for stdout
+
+
+def post_fork(server, worker):
+    from services.host_metrics import start_host_metrics
+    from services.ingest import start_ingest
+    from services.scheduler import start_scheduler
+
+    start_ingest()
+    start_host_metrics()
+    start_scheduler()
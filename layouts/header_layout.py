@@ -55,6 +55,16 @@ header_layout = dbc.Navbar(
                             className="nav-link"
                         )
                     ),
+                    dbc.NavItem(
+                        dbc.NavLink(
+                            html.Div([
+                                html.I(className="fas fa-server me-1"),
+                                html.Span("System", style={"fontWeight": "bold"}),
+                            ], style={"display": "flex", "alignItems": "center"}),
+                            href="/system",
+                            className="nav-link"
+                        )
+                    ),
                 ],
                 className="ms-auto me-4",
                 navbar=True,
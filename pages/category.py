@@ -5,6 +5,12 @@ import pandas as pd
 import dash_bootstrap_components as dbc
 import os
 
+from datastore.latency import LatencySketch
+from datastore.observations import get_store
+from figures import figures_main
+from figures.transport import compact_figure
+from services.warmup import page_resource
+
 # Register the page
 dash.register_page(__name__, path="/category", name="Category Status")
 
@@ -12,71 +18,134 @@ dash.register_page(__name__, path="/category", name="Category Status")
 status_colors = {
     "high": "#6cc26c",  # green
     "medium": "#ffe135", # yellow
-    "low": "#ff9dbf"     # pink (instead of red)
+    "low": "#ff9dbf",    # pink (instead of red)
+    "nodata": "#adb5bd", # grey: no reports expected yet
 }
 
-# Dummy data for categories
+# Station categories and where they are marked on the map; "providers" lists
+# the providers reporting into a category (None: every provider not listed elsewhere;
+# an empty list: no provider feeds it yet, shown as "No data")
 categories = [
     {
         "name": "Ground Stations",
-        "expected": 9830,
-        "actual": 9720,
+        "providers": None,
         "lat": 39.5,
         "lon": -98.35,
     },
     {
         "name": "Fixed Buoys",
-        "expected": 75,
-        "actual": 70,
+        "providers": [],
         "lat": 29.5,
         "lon": -89.5,
     },
     {
         "name": "Drift Buoys",
-        "expected": 95,
-        "actual": 80,
+        "providers": [],
         "lat": 36.5,
         "lon": -75.5,
     },
     {
         "name": "Balloons",
-        "expected": 200,
-        "actual": 200,
+        "providers": [],
         "lat": 32.5,
         "lon": -100.0,
     },
     {
         "name": "ABO",
-        "expected": 25,
-        "actual": 25,
+        "providers": [],
         "lat": 34.0,
         "lon": -118.0,
     },
     {
         "name": "Dropsondes",
-        "expected": 36,
-        "actual": 36,
+        "providers": [],
         "lat": 40.0,
         "lon": -74.0,
     },
 ]
 
-# Calculate percentages and color
-for cat in categories:
-    cat["percent"] = 100 * cat["actual"] / cat["expected"] if cat["expected"] else 0
-    if cat["percent"] >= 98:
-        cat["status"] = "high"
-    elif cat["percent"] >= 90:
-        cat["status"] = "medium"
-    else:
-        cat["status"] = "low"
-    cat["color"] = status_colors[cat["status"]]
 
-# Dummy system stats
-total_expected = sum(c["expected"] for c in categories)
-total_actual = sum(c["actual"] for c in categories)
-total_percent = 100 * total_actual / total_expected if total_expected else 0
-latency = 4.3
+# ingest latency is shown over arrivals in the last LATENCY_WINDOW
+LATENCY_WINDOW = pd.Timedelta(hours=1)
+
+
+def availability_status(percent, expected):
+    if not expected:
+        return "nodata"
+    if percent >= 98:
+        return "high"
+    elif percent >= 90:
+        return "medium"
+    return "low"
+
+
+def progress_color(percent, expected):
+    if not expected:
+        return "secondary"
+    return "success" if percent >= 98 else ("warning" if percent >= 90 else "danger")
+
+
+def format_percent(percent, expected):
+    return f"{percent:.2f}%" if expected else "No data"
+
+
+@page_resource("category")
+def category_data():
+    """
+    Load the observation store on first use.
+    """
+    return get_store()
+
+
+def category_status():
+    """
+    Expected and received reports per category over the last complete hour,
+    from the store's availability bitmaps, and ingest latency per category
+    and in total, merged from the store's hourly latency sketches.
+    """
+    store = category_data()
+    availability = store.availability
+    end = (availability.newest or pd.Timestamp.now()).floor("h")
+    by_provider = availability.by_provider(end - pd.Timedelta(hours=1), end)
+    listed = {p for cat in categories for p in (cat["providers"] or [])}
+    now = pd.Timestamp.now()
+    latency = store.latency.by_provider(now - LATENCY_WINDOW, now)
+
+    status = []
+    total = LatencySketch()
+    for cat in categories:
+        providers = cat["providers"] if cat["providers"] is not None else [
+            p for p in set(by_provider.index) | set(latency) if p not in listed
+        ]
+        rows = by_provider.loc[by_provider.index.intersection(providers)]
+        cat = dict(cat, expected=int(rows["expected"].sum()), actual=int(rows["actual"].sum()))
+        cat["percent"] = 100 * cat["actual"] / cat["expected"] if cat["expected"] else 0
+        cat["status"] = availability_status(cat["percent"], cat["expected"])
+        cat["color"] = status_colors[cat["status"]]
+        sketch = LatencySketch()
+        for provider in providers:
+            if provider in latency:
+                sketch.merge(latency[provider])
+        total.merge(sketch)
+        cat["latency"] = sketch.summary()
+        status.append(cat)
+    return status, total.summary()
+
+
+def format_latency(seconds):
+    if seconds is None or seconds != seconds:
+        return "No data"
+    if seconds < 120:
+        return f"{seconds:.1f} Seconds"
+    if seconds < 7200:
+        return f"{seconds / 60:.1f} Minutes"
+    return f"{seconds / 3600:.1f} Hours"
+
+
+def format_latency_quantiles(summary):
+    if not summary["count"]:
+        return "No arrivals in the last hour"
+    return " / ".join(f"{q} {format_latency(summary[q])}" for q in ("p50", "p95", "p99"))
 
 # Traffic light component (vertical, all three lights)
 def traffic_light_component(status):
@@ -94,7 +163,7 @@ def traffic_light_component(status):
         active['high'] = 1
     elif status == 'medium':
         active['medium'] = 1
-    else:
+    elif status == 'low':
         active['low'] = 1
     return html.Div([
         html.Div(style={
@@ -111,86 +180,38 @@ def traffic_light_component(status):
         })
     ], style={"display": "flex", "flexDirection": "column", "alignItems": "center", "marginBottom": "18px"})
 
-# Determine traffic light status
-if total_percent >= 98:
-    traffic_status = 'high'
-elif total_percent >= 90:
-    traffic_status = 'medium'
-else:
-    traffic_status = 'low'
-
 # Sidebar table with progress bars under each row
-sidebar = html.Div([
-    # Traffic light image above the title
-    html.Div([
-        html.Img(
-            src="assets/traffic-lights.png",  # Fixed filename with 's'
-            style={
-                "height": "80px",
-                "margin": "0 auto 15px auto",
-                "display": "block"
-            }
-        )
-    ], style={"textAlign": "center"}),
+def build_sidebar(categories, total_expected, total_actual, total_percent):
+    return html.Div([
+        # Traffic light for the whole system above the title
+        traffic_light_component(availability_status(total_percent, total_expected)),
     
-    # Add Category heading
-    html.H4("Category", style={"marginBottom": "20px", "textAlign": "center"}),
+        # Add Category heading
+        html.H4("Category", style={"marginBottom": "20px", "textAlign": "center"}),
     
-    dbc.Table([
-        html.Thead(html.Tr([
-            html.Th(""),
-            html.Th("Expected Recs/Hrs"),
-            html.Th("Records Last Hour"),
-            html.Th("%", style={"width": "80px"})
-        ])),
-        html.Tbody([
-            html.Tr([
-                html.Td("Total System", style={"fontWeight": "bold"}),
-                html.Td(f"{total_expected:,}", style={"fontWeight": "bold"}),
-                html.Td(f"{total_actual:,}", style={"fontWeight": "bold"}),
-                html.Td(
-                    html.Div(
-                        style={"position": "relative"},
-                        children=[
-                            dbc.Progress(
-                                value=total_percent,
-                                color="success" if total_percent >= 98 else ("warning" if total_percent >= 90 else "danger"),
-                                style={"height": "15px", "width": "100%"},
-                            ),
-                            html.Span(
-                                f"{total_percent:.2f}%",
-                                style={
-                                    "position": "absolute",
-                                    "top": "0",
-                                    "left": "0",
-                                    "right": "0",
-                                    "fontSize": "0.75rem",
-                                    "textAlign": "center",
-                                    "color": "black",  # Changed text color to black
-                                    "fontWeight": "bold",
-                                    "lineHeight": "15px"
-                                }
-                            )
-                        ]
-                    )
-                )
-            ]),
-            *[
+        dbc.Table([
+            html.Thead(html.Tr([
+                html.Th(""),
+                html.Th("Expected Recs/Hrs"),
+                html.Th("Records Last Hour"),
+                html.Th("%", style={"width": "80px"})
+            ])),
+            html.Tbody([
                 html.Tr([
-                    html.Td(cat["name"]),
-                    html.Td(f"{cat['expected']:,}"),
-                    html.Td(f"{cat['actual']:,}"),
+                    html.Td("Total System", style={"fontWeight": "bold"}),
+                    html.Td(f"{total_expected:,}", style={"fontWeight": "bold"}),
+                    html.Td(f"{total_actual:,}", style={"fontWeight": "bold"}),
                     html.Td(
                         html.Div(
                             style={"position": "relative"},
                             children=[
                                 dbc.Progress(
-                                    value=cat["percent"],
-                                    color="success" if cat["percent"] >= 98 else ("warning" if cat["percent"] >= 90 else "danger"),
-                                    style={"height": "15px", "width": "100%", "backgroundColor": cat["color"]},
+                                    value=total_percent,
+                                    color=progress_color(total_percent, total_expected),
+                                    style={"height": "15px", "width": "100%"},
                                 ),
                                 html.Span(
-                                    f"{cat['percent']:.2f}%",
+                                    format_percent(total_percent, total_expected),
                                     style={
                                         "position": "absolute",
                                         "top": "0",
@@ -206,98 +227,146 @@ sidebar = html.Div([
                             ]
                         )
                     )
-                ]) for cat in categories
-            ]
-        ])
-    ], bordered=False, hover=True, responsive=True, size="sm"),
-], style={
-    "flex": "1 1 350px",
-    "backgroundColor": "#f8f9fa",
-    "borderRadius": "5px",
-    "padding": "30px 10px 10px 10px",
-    "minWidth": "320px",
-    "maxWidth": "420px",
-    "height": "100%",
-    "overflowY": "auto",
-    "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"
-})
+                ]),
+                *[
+                    html.Tr([
+                        html.Td(cat["name"]),
+                        html.Td(f"{cat['expected']:,}"),
+                        html.Td(f"{cat['actual']:,}"),
+                        html.Td(
+                            html.Div(
+                                style={"position": "relative"},
+                                children=[
+                                    dbc.Progress(
+                                        value=cat["percent"],
+                                        color=progress_color(cat["percent"], cat["expected"]),
+                                        style={"height": "15px", "width": "100%", "backgroundColor": cat["color"]},
+                                    ),
+                                    html.Span(
+                                        format_percent(cat["percent"], cat["expected"]),
+                                        style={
+                                            "position": "absolute",
+                                            "top": "0",
+                                            "left": "0",
+                                            "right": "0",
+                                            "fontSize": "0.75rem",
+                                            "textAlign": "center",
+                                            "color": "black",  # Changed text color to black
+                                            "fontWeight": "bold",
+                                            "lineHeight": "15px"
+                                        }
+                                    )
+                                ]
+                            )
+                        )
+                    ]) for cat in categories
+                ]
+            ])
+        ], bordered=False, hover=True, responsive=True, size="sm"),
+    ], style={
+        "flex": "1 1 350px",
+        "backgroundColor": "#f8f9fa",
+        "borderRadius": "5px",
+        "padding": "30px 10px 10px 10px",
+        "minWidth": "320px",
+        "maxWidth": "420px",
+        "height": "100%",
+        "overflowY": "auto",
+        "boxShadow": "0 2px 8px rgba(0,0,0,0.04)"
+    })
 
-# Map
-map_fig = go.Figure()
-map_fig.update_layout(
-    mapbox_style="carto-positron",
-    mapbox=dict(
-        center=dict(lat=39.5, lon=-98.35),
-        zoom=3.5
-    ),
-    margin=dict(l=0, r=0, t=0, b=0),
-    showlegend=False,
-    autosize=True,
-    height=None,
-)
-for cat in categories:
-    map_fig.add_trace(go.Scattermapbox(
-        lat=[cat["lat"]],
-        lon=[cat["lon"]],
-        mode="markers",
-        marker=go.scattermapbox.Marker(
-            size=25,
-            color=cat["color"],
-            opacity=0.9
-        ),
-        text=[cat["name"]],
-        hovertext=[f"{cat['name']}<br>Expected: {cat['expected']}<br>Actual: {cat['actual']}<br>Percent: {cat['percent']:.2f}%"],
-        hoverinfo="text"
-    ))
+def category_layout():
+    """
+    Build the map figure and page layout from the current availability.
+    """
+    categories, latency = category_status()
+    total_expected = sum(c["expected"] for c in categories)
+    total_actual = sum(c["actual"] for c in categories)
+    total_percent = 100 * total_actual / total_expected if total_expected else 0
+    sidebar = build_sidebar(categories, total_expected, total_actual, total_percent)
 
-map_div = html.Div([
-    dcc.Graph(
-        id="category-map",
-        figure=map_fig,
-        config={"displayModeBar": False},
-        style={"height": "100%", "width": "100%"}
+    # Map
+    map_fig = go.Figure()
+    map_fig.update_layout(
+        mapbox_style="carto-positron",
+        mapbox=dict(
+            center=dict(lat=39.5, lon=-98.35),
+            zoom=3.5
+        ),
+        margin=dict(l=0, r=0, t=0, b=0),
+        showlegend=False,
+        autosize=True,
+        height=None,
+    )
+    map_fig.add_traces(
+        figures_main.status_traces(
+            [cat["lat"] for cat in categories],
+            [cat["lon"] for cat in categories],
+            [cat["status"] for cat in categories],
+            status_colors,
+            text=[cat["name"] for cat in categories],
+            hovertext=[
+                f"{cat['name']}<br>Expected: {cat['expected']}<br>Actual: {cat['actual']}"
+                f"<br>Percent: {format_percent(cat['percent'], cat['expected'])}"
+                f"<br>Latency: {format_latency_quantiles(cat['latency'])}"
+                for cat in categories
+            ],
+            marker=dict(size=25, opacity=0.9),
+            mode="markers",
+        )
     )
-], style={"flex": "2 1 700px", "display": "flex", "flexDirection": "column", "minWidth": "400px", "height": "100%", "marginLeft": "20px"})
 
-# Right panel (system stats)
-right_panel = html.Div([
-    # Stats in two rows with proper alignment
-    html.Div([
-        dbc.Row([
-            dbc.Col([
-                html.H6("Ingested", className="mb-0", style={"fontSize": "0.9rem", "color": "#777"}),
-                html.Div(f"{total_actual:,}", style={"fontWeight": "bold", "fontSize": "1.2rem"})
-            ], width=6),
-            dbc.Col([
-                html.H6("Exported", className="mb-0", style={"fontSize": "0.9rem", "color": "#777"}),
-                html.Div(f"{total_actual:,}", style={"fontWeight": "bold", "fontSize": "1.2rem"})
-            ], width=6),
-        ], className="mb-3"),
-        
+    map_div = html.Div([
+        dcc.Graph(
+            id="category-map",
+            figure=compact_figure(map_fig),
+            config={"displayModeBar": False},
+            style={"height": "100%", "width": "100%"}
+        )
+    ], style={"flex": "2 1 700px", "display": "flex", "flexDirection": "column", "minWidth": "400px", "height": "100%", "marginLeft": "20px"})
+
+    # Right panel (system stats)
+    right_panel = html.Div([
+        # Stats in two rows with proper alignment
+        html.Div([
+            dbc.Row([
+                dbc.Col([
+                    html.H6("Ingested", className="mb-0", style={"fontSize": "0.9rem", "color": "#777"}),
+                    html.Div(f"{total_actual:,}", style={"fontWeight": "bold", "fontSize": "1.2rem"})
+                ], width=6),
+                dbc.Col([
+                    html.H6("Expected", className="mb-0", style={"fontSize": "0.9rem", "color": "#777"}),
+                    html.Div(f"{total_expected:,}", style={"fontWeight": "bold", "fontSize": "1.2rem"})
+                ], width=6),
+            ], className="mb-3"),
+
+            html.Div([
+                html.H6("Ingestion Progress", className="mb-1", style={"fontSize": "0.9rem", "color": "#777"}),
+                dbc.Progress(
+                    value=total_percent,
+                    color=progress_color(total_percent, total_expected),
+                    style={"height": "15px", "marginBottom": "10px"},
+                    className="mb-2"
+                ),
+            ]),
+
+            dbc.Row([
+                dbc.Col([
+                    html.H6("Latency (p50 / p95 / p99)", className="mb-0", style={"fontSize": "0.9rem", "color": "#777"}),
+                    html.Div(format_latency_quantiles(latency), style={"fontWeight": "bold", "fontSize": "1.2rem"})
+                ], width=12),
+            ])
+        ], style={"backgroundColor": "#fff", "padding": "15px", "borderRadius": "5px", "boxShadow": "0 2px 4px rgba(0,0,0,0.05)"})
+    ], style={"width": "28%", "display": "inline-block", "verticalAlign": "top", "padding": "10px", "height": "100%"})
+
+    # Layout
+    return html.Div([
         html.Div([
-            html.H6("Ingestion Progress", className="mb-1", style={"fontSize": "0.9rem", "color": "#777"}),
-            dbc.Progress(
-                value=90,  # Changed to 90% filled
-                color="success",  # Changed to green
-                style={"height": "15px", "marginBottom": "10px"},
-                className="mb-2"
-            ),
-        ]),
-        
-        dbc.Row([
-            dbc.Col([
-                html.H6("Latency", className="mb-0", style={"fontSize": "0.9rem", "color": "#777"}),
-                html.Div(f"{latency} Seconds", style={"fontWeight": "bold", "fontSize": "1.2rem"})
-            ], width=12),
-        ])
-    ], style={"backgroundColor": "#fff", "padding": "15px", "borderRadius": "5px", "boxShadow": "0 2px 4px rgba(0,0,0,0.05)"})
-], style={"width": "28%", "display": "inline-block", "verticalAlign": "top", "padding": "10px", "height": "100%"})
+            sidebar,
+            map_div,
+            right_panel
+        ], style={"display": "flex", "justifyContent": "flex-start", "alignItems": "flex-start", "gap": "10px", "height": "calc(100vh - 20px)", "width": "100%"})
+    ], style={"background": "#fff", "padding": "20px 0 0 0", "height": "100vh", "width": "100vw", "overflow": "hidden"}) 
 
-# Layout
-layout = html.Div([
-    html.Div([
-        sidebar,
-        map_div,
-        right_panel
-    ], style={"display": "flex", "justifyContent": "flex-start", "alignItems": "flex-start", "gap": "10px", "height": "calc(100vh - 20px)", "width": "100%"})
-], style={"background": "#fff", "padding": "20px 0 0 0", "height": "100vh", "width": "100vw", "overflow": "hidden"}) 
\ No newline at end of file
+def layout(**kwargs):
+    return category_layout()
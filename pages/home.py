@@ -2,6 +2,7 @@ import dash
 from dash import dcc, html, Output, Input, callback
 import plotly.graph_objects as go
 import pandas as pd
+import numpy as np
 import geopandas as gpd
 import datetime
 import os
@@ -19,45 +20,39 @@ from dash import (
     html,
     no_update,
     callback,
+    clientside_callback,
+    ClientsideFunction,
 )
 
 import dash_bootstrap_components as dbc  # new import for column layout
 
-from figures import figures_main
+from figures import downsample, figures_main
+from figures.transport import compact_figure
+from datastore.observations import get_store
+from datastore.query import query
+from datastore.spatial import cell_degrees, cluster
+from datastore.provider_stats import provider_stats_snapshot, refresh_provider_stats
+from services.cache import cached_figure, cached_value
+from services.warmup import page_resource
 
 dash.register_page(__name__, path="/home", name="Home")
 
-# Load dummy data (when available)
-try:
-    # Check if dummy data directory exists
-    dummy_data_path = os.path.join(os.path.dirname(__file__), '../data/dummy_data')
-    
-    # Try to load provider stats
-    stats_path = os.path.join(dummy_data_path, 'provider_stats.json')
-    if os.path.exists(stats_path):
-        with open(stats_path, 'r') as f:
-            provider_stats = json.load(f)
-    else:
-        provider_stats = None
-        
-    # Try to load provider data
-    deldot_path = os.path.join(dummy_data_path, 'deldot_dummy.parquet')
-    deldeos_path = os.path.join(dummy_data_path, 'deldeos_dummy.parquet')
-    colorado_path = os.path.join(dummy_data_path, 'colorado_dummy.parquet')
-    
-    if os.path.exists(deldot_path) and os.path.exists(deldeos_path) and os.path.exists(colorado_path):
-        deldot_data = pd.read_parquet(deldot_path)
-        deldeos_data = pd.read_parquet(deldeos_path)
-        colorado_data = pd.read_parquet(colorado_path)
-        
-        all_providers_data = pd.concat([deldot_data, deldeos_data, colorado_data])
-        has_real_data = True
-    else:
-        has_real_data = False
-except Exception as e:
-    print(f"Error loading dummy data: {e}")
-    has_real_data = False
-    provider_stats = None
+# The map draws stations one by one up to MAP_MAX_POINTS in the fetched area,
+# and clusters of about MAP_CLUSTER_PIXELS screen pixels beyond that
+MAP_MAX_POINTS = int(os.getenv("MAP_MAX_POINTS", "2000"))
+MAP_CLUSTER_PIXELS = int(os.getenv("MAP_CLUSTER_PIXELS", "40"))
+MAP_ZOOM = 6
+
+@page_resource("home")
+def home_data():
+    """
+    Load the observation store and the first provider stats snapshot on first use.
+    """
+    # Provider observations are shared by every page through the process-wide store
+    store = get_store()
+    # Provider stats are recomputed by the scheduler; publish the first snapshot now
+    refresh_provider_stats(store)
+    return store
 
 # Updated layout with two columns: a left sidebar and a right main content area
 layout = html.Div(
@@ -196,7 +191,9 @@ layout = html.Div(
                                                             id="map",
                                                             config={"displayModeBar": False},
                                                             style={"height": "40vh"},
-                                                        )
+                                                        ),
+                                                        # area the map's stations were fetched for, see assets/map_view.js
+                                                        dcc.Store(id="map-view"),
                                                     ]
                                                 ),
                                             ]
@@ -218,7 +215,9 @@ layout = html.Div(
                                                             id="temperature-chart",
                                                             config={"displayModeBar": False},
                                                             style={"height": "30vh"},
-                                                        )
+                                                        ),
+                                                        # visible range and width, see assets/chart_view.js
+                                                        dcc.Store(id="temperature-chart-view"),
                                                     ]
                                                 ),
                                             ]
@@ -263,72 +262,36 @@ layout = html.Div(
     Output("provider-status-container", "children"),
     Input("provider-dropdown", "value"),
 )
+@cached_value("home.provider_status", version=lambda: provider_stats_snapshot().version)
 def update_provider_status(provider):
-    if provider_stats and provider in provider_stats:
-        stats = provider_stats[provider]
-        
-        # Access provider specific data
-        total_stations = stats['total_stations']
-        active_stations = stats['active_stations']
-        avg_temp = stats['avg_temperature']
-        avg_humidity = stats['avg_humidity']
-        avg_wind = stats['avg_wind_speed']
-        readings_per_hour = stats['readings_per_hour']
-        
-        # Calculate percentage for progress bar
-        active_pct = int((active_stations / total_stations) * 100) if total_stations else 0
-        latest_readings = readings_per_hour[max(readings_per_hour.keys())] if readings_per_hour else 0
-        expected_readings = total_stations  # Simplified assumption
-        
-        # Determine status color based on percentage
-        if active_pct >= 80:
-            status_color = "success"
-        elif active_pct >= 50:
-            status_color = "warning"
-        else:
-            status_color = "danger"
-            
-        # Create sparkline data
-        hours = list(readings_per_hour.keys())
-        values = list(readings_per_hour.values())
+    # Stats are precomputed by the scheduler, so this is a lookup, not a scan
+    provider_stats = provider_stats_snapshot().stats
+    stats = provider_stats.get(provider, provider_stats["all"])
+    
+    # Access provider specific data
+    total_stations = stats['total_stations']
+    active_stations = stats['active_stations']
+    avg_temp = stats['avg_temperature']
+    avg_humidity = stats['avg_humidity']
+    avg_wind = stats['avg_wind_speed']
+    readings_per_hour = stats['readings_per_hour']
+    
+    # Calculate percentage for progress bar
+    active_pct = int((active_stations / total_stations) * 100) if total_stations else 0
+    latest_readings = stats['latest_readings']
+    expected_readings = total_stations  # Simplified assumption
+    
+    # Determine status color based on percentage
+    if active_pct >= 80:
+        status_color = "success"
+    elif active_pct >= 50:
+        status_color = "warning"
     else:
-        # Fallback data if provider stats not available
-        if provider == "all":
-            provider_title = "All Providers"
-            active_pct = 85
-            status_color = "success"
-            latest_readings = 450
-            expected_readings = 500
-            total_stations = 150
-            active_stations = 127
-            
-            # For the all providers case, create combined average values
-            if has_real_data:
-                avg_temp = all_providers_data['temperature'].mean()
-                avg_humidity = all_providers_data['humidity'].mean()
-                avg_wind = all_providers_data['wind_speed'].mean()
-            else:
-                avg_temp = 22.3
-                avg_humidity = 58.7
-                avg_wind = 9.2
-        else:
-            provider_title = provider.capitalize()
-            active_pct = 40 if provider == "deldot" else (75 if provider == "deldeos" else 90)
-            status_color = "warning" if active_pct < 80 else "success"
-            latest_readings = 120 if provider == "deldot" else (180 if provider == "deldeos" else 150)
-            expected_readings = 300
-            total_stations = 50 if provider == "deldot" else (60 if provider == "deldeos" else 40)
-            active_stations = int(total_stations * active_pct / 100)
-            
-            # Use placeholder values
-            avg_temp = 21.5
-            avg_humidity = 65.2
-            avg_wind = 8.4
+        status_color = "danger"
         
-        # Random sparkline data
-        import random
-        hours = list(range(24))
-        values = [random.randint(50, 200) for _ in range(24)]
+    # Create sparkline data (the last 24 hours, oldest first)
+    hours = list(range(len(readings_per_hour)))
+    values = list(readings_per_hour.values())
     
     # Format provider title
     if provider == "deldot":
@@ -380,7 +343,7 @@ def update_provider_status(provider):
                     ),
                     dbc.Col(  # sparkline
                         dcc.Graph(
-                            figure=sparkline_fig,
+                            figure=compact_figure(sparkline_fig),
                             config={"displayModeBar": False},
                             style={"height": "30px"},
                         ),
@@ -465,75 +428,126 @@ def update_provider_status(provider):
         ]
     )
 
+# Panning or zooming the map past the fetched area fetches the stations of the new area
+clientside_callback(
+    ClientsideFunction(namespace="map_view", function_name="view"),
+    Output("map-view", "data"),
+    Input("map", "relayoutData"),
+    State("map-view", "data"),
+)
+
 @callback(
     Output("map", "figure"),
     Input("provider-dropdown", "value"),
+    Input("map-view", "data"),
 )
-def update_map(provider):
+@cached_figure("home.map")
+def update_map(provider, view=None):
+    store = home_data()
+    
     # Use real data if available
-    if has_real_data:
-        # Filter data for the selected provider
-        if provider == "deldot":
-            df = deldot_data
-        elif provider == "deldeos":
-            df = deldeos_data
-        elif provider == "colorado":
-            df = colorado_data
-        elif provider == "all":
-            df = all_providers_data
+    if store.has_data:
+        # Latest reading for each station, maintained by the store; only the
+        # fetched area once the map has been moved
+        all_stations = store.latest_view(provider)
+        if view:
+            bounds = (view["west"], view["south"], view["east"], view["north"])
+            latest_data = store.latest_view(provider, bounds)
+            zoom = view["zoom"]
         else:
-            df = all_providers_data
-        
-        # Get the latest reading for each station
-        latest_data = df.sort_values('timestamp').groupby('station_id').last().reset_index()
-        
-        # Create the map with the stations
-        fig = px.scatter_mapbox(
-            latest_data,
-            lat=latest_data['latitude'] if 'latitude' in latest_data.columns else [39.0 + i*0.05 for i in range(len(latest_data))],
-            lon=latest_data['longitude'] if 'longitude' in latest_data.columns else [-75.5 + i*0.05 for i in range(len(latest_data))],
-            color='provider' if 'provider' in latest_data.columns and provider == 'all' else 'status',
-            color_discrete_map={'active': 'green', 'maintenance': 'orange', 'offline': 'red',
-                               'deldot': 'blue', 'deldeos': 'green', 'colorado': 'red'},
-            hover_name='station_id',
-            hover_data=['temperature', 'humidity', 'wind_speed', 'provider'],
-            size_max=15,
-            zoom=6,
-        )
+            latest_data = all_stations
+            zoom = MAP_ZOOM
+        
+        # The map is centred on all of the provider's stations, not the fetched
+        # ones, so the user's view is kept (uirevision) when new stations arrive
+        center = None
+        if 'latitude' in all_stations.columns and len(all_stations):
+            center = {"lat": all_stations['latitude'].mean(), "lon": all_stations['longitude'].mean()}
+        
+        if len(latest_data) > MAP_MAX_POINTS and 'latitude' in latest_data.columns:
+            # Too many stations to draw: one marker per cluster, sized by station count
+            clusters = cluster(latest_data, cell_degrees(zoom, MAP_CLUSTER_PIXELS))
+            fig = go.Figure(go.Scattermapbox(
+                lat=clusters['latitude'],
+                lon=clusters['longitude'],
+                mode='markers',
+                name='Stations',
+                marker=dict(
+                    size=8 + 4 * np.log2(clusters['stations']),
+                    color=clusters['active'] / clusters['stations'],
+                    colorscale='RdYlGn',
+                    cmin=0,
+                    cmax=1,
+                    colorbar=dict(title='Active'),
+                ),
+                customdata=clusters[['stations', 'active', 'station_id']],
+                hovertemplate='%{customdata[2]}<br>%{customdata[0]} stations<br>%{customdata[1]} active<extra></extra>',
+            ))
+            fig.update_layout(mapbox=dict(center=center, zoom=MAP_ZOOM))
+        else:
+            # Create the map with the stations
+            fig = px.scatter_mapbox(
+                latest_data,
+                lat=latest_data['latitude'] if 'latitude' in latest_data.columns else [39.0 + i*0.05 for i in range(len(latest_data))],
+                lon=latest_data['longitude'] if 'longitude' in latest_data.columns else [-75.5 + i*0.05 for i in range(len(latest_data))],
+                color='provider' if 'provider' in latest_data.columns and provider == 'all' else 'status',
+                color_discrete_map={'active': 'green', 'maintenance': 'orange', 'offline': 'red',
+                                   'deldot': 'blue', 'deldeos': 'green', 'colorado': 'red'},
+                hover_name='station_id',
+                hover_data=['temperature', 'humidity', 'wind_speed', 'provider'],
+                size_max=15,
+                zoom=MAP_ZOOM,
+                center=center,
+            )
         
         # Update map layout
         fig.update_layout(
             mapbox_style="open-street-map",
             margin={"r": 0, "t": 0, "l": 0, "b": 0},
             legend_title_text='Station Status' if provider != 'all' else 'Provider',
+            uirevision=provider,
         )
         
         return fig
    
+# Zooming re-queries the chart for the visible range
+clientside_callback(
+    ClientsideFunction(namespace="chart_view", function_name="view"),
+    Output("temperature-chart-view", "data"),
+    Input("temperature-chart", "relayoutData"),
+    State("temperature-chart", "id"),
+    State("temperature-chart-view", "data"),
+)
+
 @callback(
     Output("temperature-chart", "figure"),
     Input("provider-dropdown", "value"),
+    Input("temperature-chart-view", "data"),
 )
-def update_temperature_chart(provider):
+@cached_figure("home.temperature_chart")
+def update_temperature_chart(provider, view=None):
+    store = home_data()
+    
     # Use real data if available
-    if has_real_data:
-        # Filter data for the selected provider
-        if provider == "deldot":
-            df = deldot_data
-        elif provider == "deldeos":
-            df = deldeos_data
-        elif provider == "colorado":
-            df = colorado_data
-        elif provider == "all":
-            df = all_providers_data
+    if store.has_data:
+        # Points to send for the chart width, and the visible range (None when not zoomed)
+        start, end, width = downsample.view_range(view)
+        points = downsample.points_for_width(width)
+        
+        # The finest rollup with at most a few rows per point: hourly for the
+        # full range, 5-minute buckets only for a zoomed-in range
+        if start is None:
+            first, last = store.rollups.span(provider)
+            bucket = store.rollups.resolution(last - first, points * 4, finest="hourly")
         else:
-            df = all_providers_data
+            bucket = store.rollups.resolution(end - start, points * 4)
         
-        # Group data by timestamp and calculate average temperature
-        temp_trend = df.groupby(pd.Grouper(key='timestamp', freq='1H')).agg({
-            'temperature': 'mean',
-            'station_id': 'count'
-        }).reset_index()
+        # Mean temperature and reading counts per bucket, reduced to `points` with LTTB
+        trend = query(provider, start, end, metrics="temperature", bucket=bucket, store=store)
+        x, temperature, readings = trend.time, trend.values["temperature"], trend.readings
+        if len(trend) > points:
+            keep = downsample.lttb_indices(x, temperature, points)
+            x, temperature, readings = x[keep], temperature[keep], readings[keep]
         
         # Create temperature trend figure
         fig = go.Figure()
@@ -541,8 +555,8 @@ def update_temperature_chart(provider):
         # Add temperature line
         fig.add_trace(
             go.Scatter(
-                x=temp_trend['timestamp'],
-                y=temp_trend['temperature'],
+                x=x,
+                y=temperature,
                 mode='lines',
                 name='Avg Temperature',
                 line=dict(color='#FF9500', width=2),
@@ -552,8 +566,8 @@ def update_temperature_chart(provider):
         # Add reading count bars
         fig.add_trace(
             go.Bar(
-                x=temp_trend['timestamp'],
-                y=temp_trend['station_id'],
+                x=x,
+                y=readings,
                 name='Number of Readings',
                 marker_color='#007BFF',
                 opacity=0.3,
@@ -565,13 +579,11 @@ def update_temperature_chart(provider):
         fig.update_layout(
             xaxis=dict(title=''),
             yaxis=dict(
-                title='Temperature (°C)',
-                titlefont=dict(color='#FF9500'),
+                title=dict(text='Temperature (°C)', font=dict(color='#FF9500')),
                 tickfont=dict(color='#FF9500'),
             ),
             yaxis2=dict(
-                title='# of Readings',
-                titlefont=dict(color='#007BFF'),
+                title=dict(text='# of Readings', font=dict(color='#007BFF')),
                 tickfont=dict(color='#007BFF'),
                 overlaying='y',
                 side='right',
@@ -589,7 +601,7 @@ def update_temperature_chart(provider):
         return fig
     else:
         # Create dummy temperature chart
-        dates = pd.date_range(start=datetime.datetime.now() - datetime.timedelta(days=7), periods=168, freq='1H')
+        dates = pd.date_range(start=datetime.datetime.now() - datetime.timedelta(days=7), periods=168, freq='1h')
         
         # Generate temperature data with day/night pattern
         import numpy as np
@@ -631,13 +643,11 @@ def update_temperature_chart(provider):
         fig.update_layout(
             xaxis=dict(title=''),
             yaxis=dict(
-                title='Temperature (°C)',
-                titlefont=dict(color='#FF9500'),
+                title=dict(text='Temperature (°C)', font=dict(color='#FF9500')),
                 tickfont=dict(color='#FF9500'),
             ),
             yaxis2=dict(
-                title='# of Readings',
-                titlefont=dict(color='#007BFF'),
+                title=dict(text='# of Readings', font=dict(color='#007BFF')),
                 tickfont=dict(color='#007BFF'),
                 overlaying='y',
                 side='right',
@@ -658,144 +668,61 @@ def update_temperature_chart(provider):
     Output("ingest-rate-chart", "figure"),
     Input("provider-dropdown", "value"),
 )
+@cached_figure("home.ingest_rate_chart", version=lambda: provider_stats_snapshot().version)
 def update_ingest_rate_chart(provider):
-    # Use real data if available
-    if provider_stats and provider in provider_stats:
-        readings_per_hour = provider_stats[provider]['readings_per_hour']
-        hours = list(readings_per_hour.keys())
-        values = list(readings_per_hour.values())
-        
-        # Create figure
-        fig = go.Figure()
-        
-        # Add line trace for ingest rate
-        fig.add_trace(
-            go.Scatter(
-                x=hours,
-                y=values,
-                mode='lines+markers',
-                name='Readings per Hour',
-                line=dict(color='#17a2b8', width=2),
-                fill='tozeroy',
-                fillcolor='rgba(23, 162, 184, 0.1)',
-            )
+    # Readings per hour over the last 24 hours, precomputed by the scheduler, in time order
+    provider_stats = provider_stats_snapshot().stats
+    readings_per_hour = provider_stats.get(provider, provider_stats["all"])['readings_per_hour']
+    hours = list(readings_per_hour)
+    values = list(readings_per_hour.values())
+    
+    # Create figure
+    fig = go.Figure()
+    
+    # Add line trace for ingest rate
+    fig.add_trace(
+        go.Scatter(
+            x=hours,
+            y=values,
+            mode='lines+markers',
+            name='Readings per Hour',
+            line=dict(color='#17a2b8', width=2),
+            fill='tozeroy',
+            fillcolor='rgba(23, 162, 184, 0.1)',
         )
-        
-        # Add a target/expected line
+    )
+    
+    # Add a target/expected line
+    if values:
         expected_rate = sum(values) / len(values) * 1.2  # 20% above average as target
         fig.add_trace(
             go.Scatter(
-                x=[min(hours), max(hours)],
+                x=[hours[0], hours[-1]],
                 y=[expected_rate, expected_rate],
                 mode='lines',
                 name='Expected Rate',
                 line=dict(color='#dc3545', width=2, dash='dash'),
             )
         )
-        
-        # Configure layout
-        fig.update_layout(
-            xaxis=dict(
-                title='Hour of Day',
-                tickmode='array',
-                tickvals=list(range(0, 24, 4)),
-                ticktext=[f"{h:02d}:00" for h in range(0, 24, 4)],
-            ),
-            yaxis=dict(
-                title='Readings / Hour',
-            ),
-            margin=dict(l=10, r=10, t=20, b=10),
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="right",
-                x=1
-            ),
-        )
-        
-        return fig
-    else:
-        # Create appropriate ingest rate chart based on provider
-        hours = list(range(24))
-        
-        # Create a pattern of ingest rates with higher during day, lower at night
-        base_rate = 100
-        if provider == "deldot":
-            base_rate = 120
-        elif provider == "deldeos":
-            base_rate = 150
-        elif provider == "colorado":
-            base_rate = 100
-        elif provider == "all":
-            base_rate = 370  # Combined rate for all providers
-            
-        # Generate data with day/night pattern
-        import numpy as np
-        hour_effect = np.sin(np.pi * (np.array(hours) - 6) / 12)  # Peak at noon
-        values = base_rate + 50 * hour_effect + np.random.normal(0, 10, 24)
-        values = np.maximum(values, 0)  # Ensure no negative values
-        
-        # If we have actual data for all providers, use it
-        if has_real_data and provider == "all":
-            # Try to calculate real readings per hour
-            try:
-                last_day = all_providers_data[all_providers_data['timestamp'] >= (datetime.datetime.now() - datetime.timedelta(days=1))]
-                real_readings = last_day.groupby(last_day['timestamp'].dt.hour).size()
-                if not real_readings.empty:
-                    hours = list(real_readings.index)
-                    values = list(real_readings.values)
-            except Exception as e:
-                print(f"Error calculating real readings: {e}")
-        
-        # Create figure
-        fig = go.Figure()
-        
-        # Add line trace for ingest rate
-        fig.add_trace(
-            go.Scatter(
-                x=hours,
-                y=values,
-                mode='lines+markers',
-                name='Readings per Hour',
-                line=dict(color='#17a2b8', width=2),
-                fill='tozeroy',
-                fillcolor='rgba(23, 162, 184, 0.1)',
-            )
-        )
-        
-        # Add a target/expected line
-        target_rate = base_rate * 1.2  # 20% above base rate
-        fig.add_trace(
-            go.Scatter(
-                x=[0, 23],
-                y=[target_rate, target_rate],
-                mode='lines',
-                name='Expected Rate',
-                line=dict(color='#dc3545', width=2, dash='dash'),
-            )
-        )
-        
-        # Configure layout
-        fig.update_layout(
-            xaxis=dict(
-                title='Hour of Day',
-                tickmode='array',
-                tickvals=list(range(0, 24, 4)),
-                ticktext=[f"{h:02d}:00" for h in range(0, 24, 4)],
-            ),
-            yaxis=dict(
-                title='Readings / Hour',
-            ),
-            margin=dict(l=10, r=10, t=20, b=10),
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="right",
-                x=1
-            ),
-        )
-        
-        return fig
-   
\ No newline at end of file
+    
+    # Configure layout
+    fig.update_layout(
+        xaxis=dict(
+            title='Hour of Day',
+            tickformat='%H:%M',
+            dtick=4 * 3600 * 1000,
+        ),
+        yaxis=dict(
+            title='Readings / Hour',
+        ),
+        margin=dict(l=10, r=10, t=20, b=10),
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+    )
+    
+    return fig
@@ -6,26 +6,38 @@ import plotly.graph_objects as go
 import plotly.express as px
 import numpy as np
 
-# Generate sample data for providers
+from pages.category import category_data
+
+# availability is measured over the last day, records over the last complete hour
+AVAILABILITY_WINDOW = pd.Timedelta(days=1)
+
+
+# Per-provider availability and records from the store's availability bitmaps. The store is
+# read through the Category page's resource: this module is not a registered page, so a
+# resource of its own would never be warmed and would hold /ready at 503.
 def generate_provider_data():
-    providers = [
-        {"name": "NOAA", "status": "high", "availability": 99.8, "records": 45280},
-        {"name": "ASOS", "status": "high", "availability": 99.5, "records": 32150},
-        {"name": "NWS", "status": "medium", "availability": 95.2, "records": 28970},
-        {"name": "MADIS", "status": "high", "availability": 98.7, "records": 36420},
-        {"name": "NSSL", "status": "high", "availability": 99.1, "records": 18640},
-        {"name": "OK Mesonet", "status": "low", "availability": 86.3, "records": 15280},
-        {"name": "USGS", "status": "medium", "availability": 94.8, "records": 8750},
-        {"name": "FAA", "status": "high", "availability": 97.9, "records": 12340},
-    ]
+    availability = category_data().availability
+    end = (availability.newest or pd.Timestamp.now()).floor("h")
+    day = availability.by_provider(end - AVAILABILITY_WINDOW, end)
+    hour = availability.by_provider(end - pd.Timedelta(hours=1), end)
+    providers = []
+    for name, row in day.iterrows():
+        percent = float(row["availability"]) if row["expected"] else 0.0
+        providers.append(
+            {
+                "name": name,
+                "status": "high" if percent >= 98 else "medium" if percent >= 90 else "low",
+                "availability": percent,
+                "records": int(hour.loc[name, "actual"]),
+                "expected": int(hour.loc[name, "expected"]),
+            }
+        )
     
     # Sort by availability (highest first)
     providers.sort(key=lambda x: x["availability"], reverse=True)
     
     return providers
 
-providers = generate_provider_data()
-
 # Status colors
 status_colors = {
     "high": "#6cc26c",  # green
@@ -35,7 +47,8 @@ status_colors = {
 
 # Create a bar chart for provider availability
 def create_availability_chart(provider_data):
-    df = pd.DataFrame(provider_data)
+    # explicit columns: with no providers yet the chart is drawn empty instead of failing
+    df = pd.DataFrame(provider_data, columns=["name", "status", "availability", "records", "expected"])
     
     fig = px.bar(
         df,
@@ -74,9 +87,9 @@ def create_availability_chart(provider_data):
     return fig
 
 # Create a gauge chart showing overall system status
-def create_gauge_chart():
+def create_gauge_chart(provider_data):
     # Calculate average availability
-    avg_availability = np.mean([p["availability"] for p in providers])
+    avg_availability = np.mean([p["availability"] for p in provider_data]) if provider_data else 0
     
     fig = go.Figure(go.Indicator(
         mode="gauge+number",
@@ -162,220 +175,234 @@ def create_provider_table(provider_data):
         className="mt-3",
     )
 
-# Statistics calculation
-total_records = sum(p["records"] for p in providers)
-total_providers = len(providers)
-healthy_providers = sum(1 for p in providers if p["status"] == "high")
-warning_providers = sum(1 for p in providers if p["status"] == "medium")
-critical_providers = sum(1 for p in providers if p["status"] == "low")
+def format_age(seconds):
+    if seconds != seconds:
+        return "No data"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} mins ago"
+    return f"{seconds / 3600:.1f} hours ago"
 
 # Create layout
-layout = html.Div(
-    [
-        # Title row
-        dbc.Row(
-            [
-                dbc.Col(html.H4("Provider Dashboard", className="mb-4"), width={"size": 6, "order": 1}),
-                dbc.Col(
-                    dbc.Button(
-                        [html.I(className="fas fa-sync-alt me-2"), "Refresh Data"],
-                        color="primary",
-                        className="float-end",
-                    ),
-                    width={"size": 6, "order": 2},
-                    className="d-flex justify-content-end align-items-center",
-                ),
-            ],
-            className="mb-4",
-        ),
-        
-        # Stats cards row
-        dbc.Row(
-            [
-                # Total Providers card
-                dbc.Col(
-                    dbc.Card(
-                        dbc.CardBody(
-                            [
-                                html.H6("Total Providers", className="card-subtitle text-muted"),
-                                html.H3(total_providers, className="mt-2 mb-3"),
-                                html.Div(
-                                    [
-                                        html.Span("Active", className="text-success me-2 fw-bold"),
-                                        html.Span(f"{healthy_providers} of {total_providers}")
-                                    ],
-                                    className="small"
-                                )
-                            ]
+def layout(**kwargs):
+    providers = generate_provider_data()
+    
+    # Statistics calculation
+    total_records = sum(p["records"] for p in providers)
+    total_expected = sum(p["expected"] for p in providers)
+    ingest_percent = 100 * total_records / total_expected if total_expected else 0
+    total_providers = len(providers)
+    healthy_providers = sum(1 for p in providers if p["status"] == "high")
+    warning_providers = sum(1 for p in providers if p["status"] == "medium")
+    critical_providers = sum(1 for p in providers if p["status"] == "low")
+    latest = category_data().latest.table
+    age = (pd.Timestamp.now() - latest["timestamp"].max()).total_seconds() if not latest.empty else float("nan")
+    
+    return html.Div(
+        [
+            # Title row
+            dbc.Row(
+                [
+                    dbc.Col(html.H4("Provider Dashboard", className="mb-4"), width={"size": 6, "order": 1}),
+                    dbc.Col(
+                        dbc.Button(
+                            [html.I(className="fas fa-sync-alt me-2"), "Refresh Data"],
+                            color="primary",
+                            className="float-end",
                         ),
-                        className="shadow-sm h-100",
+                        width={"size": 6, "order": 2},
+                        className="d-flex justify-content-end align-items-center",
                     ),
-                    md=3,
-                    sm=6,
-                ),
-                
-                # Provider Status card
-                dbc.Col(
-                    dbc.Card(
-                        dbc.CardBody(
-                            [
-                                html.H6("Provider Status", className="card-subtitle text-muted"),
-                                html.Div(
-                                    [
-                                        html.Div(
-                                            [
-                                                html.Span(
-                                                    f"{healthy_providers}",
-                                                    style={"fontSize": "1.5rem", "fontWeight": "bold", "color": status_colors["high"]},
-                                                ),
-                                                html.Span(" Healthy", className="text-muted ms-2"),
-                                            ],
-                                            className="mt-2 mb-1",
-                                        ),
-                                        html.Div(
-                                            [
-                                                html.Span(
-                                                    f"{warning_providers}",
-                                                    style={"fontSize": "1.5rem", "fontWeight": "bold", "color": status_colors["medium"]},
-                                                ),
-                                                html.Span(" Warning", className="text-muted ms-2"),
-                                            ],
-                                            className="mb-1",
-                                        ),
-                                        html.Div(
-                                            [
-                                                html.Span(
-                                                    f"{critical_providers}",
-                                                    style={"fontSize": "1.5rem", "fontWeight": "bold", "color": status_colors["low"]},
-                                                ),
-                                                html.Span(" Critical", className="text-muted ms-2"),
-                                            ],
-                                        ),
-                                    ]
-                                ),
-                            ]
+                ],
+                className="mb-4",
+            ),
+        
+            # Stats cards row
+            dbc.Row(
+                [
+                    # Total Providers card
+                    dbc.Col(
+                        dbc.Card(
+                            dbc.CardBody(
+                                [
+                                    html.H6("Total Providers", className="card-subtitle text-muted"),
+                                    html.H3(total_providers, className="mt-2 mb-3"),
+                                    html.Div(
+                                        [
+                                            html.Span("Active", className="text-success me-2 fw-bold"),
+                                            html.Span(f"{healthy_providers} of {total_providers}")
+                                        ],
+                                        className="small"
+                                    )
+                                ]
+                            ),
+                            className="shadow-sm h-100",
                         ),
-                        className="shadow-sm h-100",
+                        md=3,
+                        sm=6,
                     ),
-                    md=3,
-                    sm=6,
-                ),
                 
-                # Data Ingestion card
-                dbc.Col(
-                    dbc.Card(
-                        dbc.CardBody(
-                            [
-                                html.H6("Data Ingestion", className="card-subtitle text-muted"),
-                                html.H3(
-                                    [
-                                        f"{total_records:,}",
-                                        html.Span(
-                                            " records/hr",
-                                            style={"fontSize": "1rem", "fontWeight": "normal", "color": "#6c757d"},
-                                        ),
-                                    ],
-                                    className="mt-2 mb-2",
-                                ),
-                                dbc.Progress(
-                                    value=95,
-                                    color="success",
-                                    style={"height": "8px"},
-                                    className="mb-2"
-                                ),
-                                html.Div("95% of expected volume", className="small text-muted text-end"),
-                            ]
+                    # Provider Status card
+                    dbc.Col(
+                        dbc.Card(
+                            dbc.CardBody(
+                                [
+                                    html.H6("Provider Status", className="card-subtitle text-muted"),
+                                    html.Div(
+                                        [
+                                            html.Div(
+                                                [
+                                                    html.Span(
+                                                        f"{healthy_providers}",
+                                                        style={"fontSize": "1.5rem", "fontWeight": "bold", "color": status_colors["high"]},
+                                                    ),
+                                                    html.Span(" Healthy", className="text-muted ms-2"),
+                                                ],
+                                                className="mt-2 mb-1",
+                                            ),
+                                            html.Div(
+                                                [
+                                                    html.Span(
+                                                        f"{warning_providers}",
+                                                        style={"fontSize": "1.5rem", "fontWeight": "bold", "color": status_colors["medium"]},
+                                                    ),
+                                                    html.Span(" Warning", className="text-muted ms-2"),
+                                                ],
+                                                className="mb-1",
+                                            ),
+                                            html.Div(
+                                                [
+                                                    html.Span(
+                                                        f"{critical_providers}",
+                                                        style={"fontSize": "1.5rem", "fontWeight": "bold", "color": status_colors["low"]},
+                                                    ),
+                                                    html.Span(" Critical", className="text-muted ms-2"),
+                                                ],
+                                            ),
+                                        ]
+                                    ),
+                                ]
+                            ),
+                            className="shadow-sm h-100",
                         ),
-                        className="shadow-sm h-100",
+                        md=3,
+                        sm=6,
                     ),
-                    md=3,
-                    sm=6,
-                ),
                 
-                # Last Update card
-                dbc.Col(
-                    dbc.Card(
-                        dbc.CardBody(
-                            [
-                                html.H6("Latest Update", className="card-subtitle text-muted"),
-                                html.H3("2 mins ago", className="mt-2 mb-3"),
-                                html.Div(
-                                    [
-                                        html.I(className="fas fa-check-circle text-success me-2"),
-                                        html.Span("All systems operational", className="small"),
-                                    ]
-                                ),
-                            ]
-                        ),
-                        className="shadow-sm h-100",
-                    ),
-                    md=3,
-                    sm=6,
-                ),
-            ],
-            className="mb-4 g-3",
-        ),
-        
-        # Main content row
-        dbc.Row(
-            [
-                # Left column - Provider Table
-                dbc.Col(
-                    dbc.Card(
-                        [
-                            dbc.CardHeader("Provider Details", className="fw-bold"),
+                    # Data Ingestion card
+                    dbc.Col(
+                        dbc.Card(
                             dbc.CardBody(
                                 [
-                                    create_provider_table(providers),
+                                    html.H6("Data Ingestion", className="card-subtitle text-muted"),
+                                    html.H3(
+                                        [
+                                            f"{total_records:,}",
+                                            html.Span(
+                                                " records/hr",
+                                                style={"fontSize": "1rem", "fontWeight": "normal", "color": "#6c757d"},
+                                            ),
+                                        ],
+                                        className="mt-2 mb-2",
+                                    ),
+                                    dbc.Progress(
+                                        value=ingest_percent,
+                                        color="success" if ingest_percent >= 98 else "warning" if ingest_percent >= 90 else "danger",
+                                        style={"height": "8px"},
+                                        className="mb-2"
+                                    ),
+                                    html.Div(f"{ingest_percent:.0f}% of expected volume", className="small text-muted text-end"),
                                 ]
                             ),
-                        ],
-                        className="shadow-sm",
+                            className="shadow-sm h-100",
+                        ),
+                        md=3,
+                        sm=6,
                     ),
-                    md=5,
-                    className="mb-4",
-                ),
                 
-                # Right column - Charts
-                dbc.Col(
-                    [
-                        # Gauge chart
+                    # Last Update card
+                    dbc.Col(
                         dbc.Card(
-                            [
-                                dbc.CardBody(
-                                    [
-                                        dcc.Graph(
-                                            figure=create_gauge_chart(),
-                                            config={"displayModeBar": False},
-                                        )
-                                    ],
-                                    className="p-2",
-                                )
-                            ],
-                            className="shadow-sm mb-4",
+                            dbc.CardBody(
+                                [
+                                    html.H6("Latest Update", className="card-subtitle text-muted"),
+                                    html.H3(format_age(age), className="mt-2 mb-3"),
+                                    html.Div(
+                                        [
+                                            html.I(className="fas fa-check-circle text-success me-2"),
+                                            html.Span("All systems operational", className="small"),
+                                        ]
+                                    ),
+                                ]
+                            ),
+                            className="shadow-sm h-100",
                         ),
-                        
-                        # Bar chart
+                        md=3,
+                        sm=6,
+                    ),
+                ],
+                className="mb-4 g-3",
+            ),
+        
+            # Main content row
+            dbc.Row(
+                [
+                    # Left column - Provider Table
+                    dbc.Col(
                         dbc.Card(
                             [
+                                dbc.CardHeader("Provider Details", className="fw-bold"),
                                 dbc.CardBody(
                                     [
-                                        dcc.Graph(
-                                            figure=create_availability_chart(providers),
-                                            config={"displayModeBar": False},
-                                        )
-                                    ],
-                                    className="p-2",
-                                )
+                                        create_provider_table(providers),
+                                    ]
+                                ),
                             ],
                             className="shadow-sm",
                         ),
-                    ],
-                    md=7,
-                ),
-            ],
-            className="g-3",
-        ),
-    ],
-    style={"padding": "20px"},
-) 
\ No newline at end of file
+                        md=5,
+                        className="mb-4",
+                    ),
+                
+                    # Right column - Charts
+                    dbc.Col(
+                        [
+                            # Gauge chart
+                            dbc.Card(
+                                [
+                                    dbc.CardBody(
+                                        [
+                                            dcc.Graph(
+                                                figure=create_gauge_chart(providers),
+                                                config={"displayModeBar": False},
+                                            )
+                                        ],
+                                        className="p-2",
+                                    )
+                                ],
+                                className="shadow-sm mb-4",
+                            ),
+                        
+                            # Bar chart
+                            dbc.Card(
+                                [
+                                    dbc.CardBody(
+                                        [
+                                            dcc.Graph(
+                                                figure=create_availability_chart(providers),
+                                                config={"displayModeBar": False},
+                                            )
+                                        ],
+                                        className="p-2",
+                                    )
+                                ],
+                                className="shadow-sm",
+                            ),
+                        ],
+                        md=7,
+                    ),
+                ],
+                className="g-3",
+            ),
+        ],
+        style={"padding": "20px"},
+    ) 
\ No newline at end of file
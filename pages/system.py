@@ -1,95 +1,110 @@
 import dash
 import dash_bootstrap_components as dbc
-from dash import html, dcc
+from dash import html, dcc, callback, clientside_callback, ClientsideFunction, Input, Output, State
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime, timedelta
 
-# Generate example data
+from figures import downsample
+from figures.transport import compact_figure
+from services.host_metrics import get_sampler
+
+dash.register_page(__name__, path="/system", name="System")
+
+def format_duration(seconds):
+    days, rest = divmod(int(seconds), 86400)
+    hours, rest = divmod(rest, 3600)
+    return f"{days} days, {hours} hours, {rest // 60} minutes"
+
+# Current metrics, from the newest host sample
 def generate_metrics():
+    sampler = get_sampler()
+    if not len(sampler.buffer):
+        # first page load before the sampler's first tick
+        sampler.sample()
+    latest = sampler.buffer.latest()
+    started = datetime.fromtimestamp(sampler.started)
+
+    def value(field, digits=0):
+        v = latest[field]
+        return "n/a" if np.isnan(v) else round(v, digits) if digits else int(round(v))
+
     return {
-        "cpu_usage": np.random.randint(60, 85),
-        "memory_usage": np.random.randint(65, 90),
-        "storage_usage": np.random.randint(50, 75),
-        "network_in": np.random.randint(40, 120),  # Mbps
-        "network_out": np.random.randint(20, 80),  # Mbps
-        "active_users": np.random.randint(15, 45),
-        "active_processes": np.random.randint(50, 150),
-        "system_temp": np.random.randint(65, 80),  # °F
-        "uptime": "12 days, 5 hours, 32 minutes",
-        "last_restart": (datetime.now() - timedelta(days=12, hours=5, minutes=32)).strftime("%Y-%m-%d %H:%M")
+        "cpu_usage": value("cpu_usage"),
+        "memory_usage": value("memory_usage"),
+        "storage_usage": value("storage_usage"),
+        "network_in": value("network_in", 1),  # Mbps
+        "network_out": value("network_out", 1),  # Mbps
+        "load_average": value("load_average", 2),
+        "active_processes": value("active_processes"),
+        "system_temp": value("system_temp"),  # °F
+        "uptime": format_duration((datetime.now() - started).total_seconds()),
+        "last_restart": started.strftime("%Y-%m-%d %H:%M")
     }
 
-# Generate time series data for system performance
+# Time series of the sampled host metrics (up to HOST_METRICS_HISTORY samples)
 def generate_time_series():
-    base = datetime.now()
-    dates = [base - timedelta(minutes=i*10) for i in range(24)]
-    dates.reverse()
-    
-    cpu_trend = [np.random.randint(60, 85) for _ in range(24)]
-    memory_trend = [np.random.randint(65, 90) for _ in range(24)]
-    network_trend = [np.random.randint(40, 120) for _ in range(24)]
-    
+    sampler = get_sampler()
+    times, values = sampler.buffer.snapshot()
+    column = {field: values[:, i] for i, field in enumerate(sampler.buffer.fields)}
     return pd.DataFrame({
-        'timestamp': dates,
-        'cpu_usage': cpu_trend,
-        'memory_usage': memory_trend,
-        'network_usage': network_trend
+        'timestamp': pd.to_datetime(times, unit='s', utc=True).tz_convert(datetime.now().astimezone().tzinfo).tz_localize(None),
+        'cpu_usage': column['cpu_usage'],
+        'memory_usage': column['memory_usage'],
+        'network_usage': column['network_in'] + column['network_out']
     })
 
-# Generate example server status data
+# Status of this dashboard's worker processes
 def generate_server_status():
-    servers = ["App Server 1", "App Server 2", "Database Server", "Cache Server", "File Server"]
-    statuses = ["Operational", "Operational", "Operational", "Operational", "Operational"]
-    
-    # Make one server have an issue randomly
-    if np.random.random() < 0.2:  # 20% chance of an issue
-        random_idx = np.random.randint(0, len(servers))
-        statuses[random_idx] = np.random.choice(["Warning", "Critical"])
-    
+    workers = get_sampler().workers()
+    load = np.array([cpu for _, cpu, _ in workers])
+    statuses = np.select([load >= 90, load >= 70], ["Critical", "Warning"], default="Operational")
     return pd.DataFrame({
-        'server': servers,
+        'server': [f"Worker {pid} ({rss:.0f} MB)" for pid, _, rss in workers],
         'status': statuses,
-        'load': [np.random.randint(20, 90) for _ in range(len(servers))]
+        'load': np.clip(load, 0, 100).round().astype(int)
     })
 
-# Get metrics
-metrics = generate_metrics()
-time_series_data = generate_time_series()
-server_status = generate_server_status()
-
-# Create performance chart
-def create_performance_chart(df):
+# Create performance chart, keeping the min and max of each trace in `points` time buckets
+def create_performance_chart(df, points=None):
     fig = go.Figure()
+    points = points or downsample.points_for_width(None)
+    
+    def reduced(column):
+        keep = downsample.minmax_indices(df['timestamp'], df[column], points)
+        return df['timestamp'].iloc[keep], df[column].iloc[keep]
     
+    x, y = reduced('cpu_usage')
     fig.add_trace(go.Scatter(
-        x=df['timestamp'],
-        y=df['cpu_usage'],
+        x=x,
+        y=y,
         name='CPU Usage (%)',
         line=dict(color='#0D6EFD', width=2),
         hovertemplate='%{y}%<extra>CPU</extra>'
     ))
     
+    x, y = reduced('memory_usage')
     fig.add_trace(go.Scatter(
-        x=df['timestamp'],
-        y=df['memory_usage'],
+        x=x,
+        y=y,
         name='Memory Usage (%)',
         line=dict(color='#DC3545', width=2),
         hovertemplate='%{y}%<extra>Memory</extra>'
     ))
     
+    x, y = reduced('network_usage')
     fig.add_trace(go.Scatter(
-        x=df['timestamp'],
-        y=df['network_usage'],
+        x=x,
+        y=y,
         name='Network (Mbps)',
         line=dict(color='#198754', width=2),
         hovertemplate='%{y} Mbps<extra>Network</extra>'
     ))
     
     fig.update_layout(
-        title='System Performance (Last 4 Hours)',
+        title='System Performance (Last 24 Hours)',
         height=350,
         margin=dict(l=20, r=20, t=40, b=20),
         paper_bgcolor='white',
@@ -117,202 +132,233 @@ def create_performance_chart(df):
     return fig
 
 # Create server status table
-server_table = dbc.Table([
-    html.Thead(
-        html.Tr([html.Th("Server"), html.Th("Status"), html.Th("Load")])
-    ),
-    html.Tbody([
-        html.Tr([
-            html.Td(row['server']),
-            html.Td([
-                html.Span(
-                    row['status'],
-                    style={
-                        "color": "white",
-                        "backgroundColor": "#198754" if row['status'] == "Operational" else
-                                          "#FFC107" if row['status'] == "Warning" else "#DC3545",
-                        "padding": "2px 8px",
-                        "borderRadius": "12px",
-                        "fontSize": "0.8rem",
-                        "fontWeight": "bold"
-                    }
-                )
-            ]),
-            html.Td([
-                dbc.Progress(
-                    value=row['load'],
-                    color="success" if row['load'] < 70 else "warning" if row['load'] < 90 else "danger",
-                    style={"height": "10px", "width": "120px"}
-                )
-            ])
-        ]) for _, row in server_status.iterrows()
-    ])
-], bordered=False, hover=True, responsive=True, size="sm", className="mt-3")
+def create_server_table(server_status):
+        return dbc.Table([
+        html.Thead(
+            html.Tr([html.Th("Server"), html.Th("Status"), html.Th("Load")])
+        ),
+        html.Tbody([
+            html.Tr([
+                html.Td(row['server']),
+                html.Td([
+                    html.Span(
+                        row['status'],
+                        style={
+                            "color": "white",
+                            "backgroundColor": "#198754" if row['status'] == "Operational" else
+                                              "#FFC107" if row['status'] == "Warning" else "#DC3545",
+                            "padding": "2px 8px",
+                            "borderRadius": "12px",
+                            "fontSize": "0.8rem",
+                            "fontWeight": "bold"
+                        }
+                    )
+                ]),
+                html.Td([
+                    dbc.Progress(
+                        value=row['load'],
+                        color="success" if row['load'] < 70 else "warning" if row['load'] < 90 else "danger",
+                        style={"height": "10px", "width": "120px"}
+                    )
+                ])
+            ]) for _, row in server_status.iterrows()
+        ])
+    ], bordered=False, hover=True, responsive=True, size="sm", className="mt-3")
+
+# Layout, rendered from the sampler on every page load
+def layout(**kwargs):
+    metrics = generate_metrics()
+    time_series_data = generate_time_series()
+    server_table = create_server_table(generate_server_status())
 
-# Layout
-layout = html.Div([
-    # Title
-    html.H4("System Health & Performance", className="mb-4"),
+    return html.Div([
+        # Title
+        html.H4("System Health & Performance", className="mb-4"),
     
-    # Main content container
-    dbc.Row([
-        # Left panel with metrics cards
-        dbc.Col([
-            # Resource metrics cards
-            dbc.Row([
-                # CPU Usage card
-                dbc.Col(
-                    dbc.Card([
-                        dbc.CardBody([
-                            html.H6("CPU Usage", className="card-subtitle text-muted"),
-                            html.H3(f"{metrics['cpu_usage']}%", className="my-2"),
-                            dbc.Progress(
-                                value=metrics['cpu_usage'],
-                                color="success" if metrics['cpu_usage'] < 70 else "warning" if metrics['cpu_usage'] < 90 else "danger",
-                                className="mb-2"
-                            )
-                        ])
-                    ], className="shadow-sm"),
-                    width=4
-                ),
+        # Main content container
+        dbc.Row([
+            # Left panel with metrics cards
+            dbc.Col([
+                # Resource metrics cards
+                dbc.Row([
+                    # CPU Usage card
+                    dbc.Col(
+                        dbc.Card([
+                            dbc.CardBody([
+                                html.H6("CPU Usage", className="card-subtitle text-muted"),
+                                html.H3(f"{metrics['cpu_usage']}%", className="my-2"),
+                                dbc.Progress(
+                                    value=metrics['cpu_usage'],
+                                    color="success" if metrics['cpu_usage'] < 70 else "warning" if metrics['cpu_usage'] < 90 else "danger",
+                                    className="mb-2"
+                                )
+                            ])
+                        ], className="shadow-sm"),
+                        width=4
+                    ),
                 
-                # Memory Usage card
-                dbc.Col(
-                    dbc.Card([
-                        dbc.CardBody([
-                            html.H6("Memory Usage", className="card-subtitle text-muted"),
-                            html.H3(f"{metrics['memory_usage']}%", className="my-2"),
-                            dbc.Progress(
-                                value=metrics['memory_usage'],
-                                color="success" if metrics['memory_usage'] < 70 else "warning" if metrics['memory_usage'] < 90 else "danger",
-                                className="mb-2"
-                            )
-                        ])
-                    ], className="shadow-sm"),
-                    width=4
-                ),
+                    # Memory Usage card
+                    dbc.Col(
+                        dbc.Card([
+                            dbc.CardBody([
+                                html.H6("Memory Usage", className="card-subtitle text-muted"),
+                                html.H3(f"{metrics['memory_usage']}%", className="my-2"),
+                                dbc.Progress(
+                                    value=metrics['memory_usage'],
+                                    color="success" if metrics['memory_usage'] < 70 else "warning" if metrics['memory_usage'] < 90 else "danger",
+                                    className="mb-2"
+                                )
+                            ])
+                        ], className="shadow-sm"),
+                        width=4
+                    ),
                 
-                # Storage Usage card
-                dbc.Col(
-                    dbc.Card([
-                        dbc.CardBody([
-                            html.H6("Storage", className="card-subtitle text-muted"),
-                            html.H3(f"{metrics['storage_usage']}%", className="my-2"),
-                            dbc.Progress(
-                                value=metrics['storage_usage'],
-                                color="success" if metrics['storage_usage'] < 70 else "warning" if metrics['storage_usage'] < 90 else "danger",
-                                className="mb-2"
-                            )
-                        ])
-                    ], className="shadow-sm"),
-                    width=4
-                ),
-            ], className="mb-3"),
+                    # Storage Usage card
+                    dbc.Col(
+                        dbc.Card([
+                            dbc.CardBody([
+                                html.H6("Storage", className="card-subtitle text-muted"),
+                                html.H3(f"{metrics['storage_usage']}%", className="my-2"),
+                                dbc.Progress(
+                                    value=metrics['storage_usage'],
+                                    color="success" if metrics['storage_usage'] < 70 else "warning" if metrics['storage_usage'] < 90 else "danger",
+                                    className="mb-2"
+                                )
+                            ])
+                        ], className="shadow-sm"),
+                        width=4
+                    ),
+                ], className="mb-3"),
             
-            # Network metrics cards
-            dbc.Row([
-                # Network In card
-                dbc.Col(
-                    dbc.Card([
-                        dbc.CardBody([
-                            html.H6("Network In", className="card-subtitle text-muted"),
-                            html.H3([
-                                f"{metrics['network_in']}",
-                                html.Span(" Mbps", style={"fontSize": "1rem", "color": "#6c757d"})
-                            ], className="my-2"),
-                            html.Div(className="mb-1"),
-                            html.Div(html.I(className="fas fa-arrow-down text-success"), style={"textAlign": "right"})
-                        ])
-                    ], className="shadow-sm"),
-                    width=4
-                ),
+                # Network metrics cards
+                dbc.Row([
+                    # Network In card
+                    dbc.Col(
+                        dbc.Card([
+                            dbc.CardBody([
+                                html.H6("Network In", className="card-subtitle text-muted"),
+                                html.H3([
+                                    f"{metrics['network_in']}",
+                                    html.Span(" Mbps", style={"fontSize": "1rem", "color": "#6c757d"})
+                                ], className="my-2"),
+                                html.Div(className="mb-1"),
+                                html.Div(html.I(className="fas fa-arrow-down text-success"), style={"textAlign": "right"})
+                            ])
+                        ], className="shadow-sm"),
+                        width=4
+                    ),
                 
-                # Network Out card
-                dbc.Col(
-                    dbc.Card([
-                        dbc.CardBody([
-                            html.H6("Network Out", className="card-subtitle text-muted"),
-                            html.H3([
-                                f"{metrics['network_out']}",
-                                html.Span(" Mbps", style={"fontSize": "1rem", "color": "#6c757d"})
-                            ], className="my-2"),
-                            html.Div(className="mb-1"),
-                            html.Div(html.I(className="fas fa-arrow-up text-primary"), style={"textAlign": "right"})
-                        ])
-                    ], className="shadow-sm"),
-                    width=4
-                ),
+                    # Network Out card
+                    dbc.Col(
+                        dbc.Card([
+                            dbc.CardBody([
+                                html.H6("Network Out", className="card-subtitle text-muted"),
+                                html.H3([
+                                    f"{metrics['network_out']}",
+                                    html.Span(" Mbps", style={"fontSize": "1rem", "color": "#6c757d"})
+                                ], className="my-2"),
+                                html.Div(className="mb-1"),
+                                html.Div(html.I(className="fas fa-arrow-up text-primary"), style={"textAlign": "right"})
+                            ])
+                        ], className="shadow-sm"),
+                        width=4
+                    ),
                 
-                # Temperature card
-                dbc.Col(
-                    dbc.Card([
-                        dbc.CardBody([
-                            html.H6("System Temp", className="card-subtitle text-muted"),
-                            html.H3([
-                                f"{metrics['system_temp']}",
-                                html.Span(" °F", style={"fontSize": "1rem", "color": "#6c757d"})
-                            ], className="my-2"),
-                            html.Div(
-                                html.I(className="fas fa-thermometer-half text-warning"),
-                                style={"textAlign": "right"}
-                            )
-                        ])
-                    ], className="shadow-sm"),
-                    width=4
-                ),
-            ], className="mb-3"),
+                    # Temperature card
+                    dbc.Col(
+                        dbc.Card([
+                            dbc.CardBody([
+                                html.H6("System Temp", className="card-subtitle text-muted"),
+                                html.H3([
+                                    f"{metrics['system_temp']}",
+                                    html.Span(" °F", style={"fontSize": "1rem", "color": "#6c757d"})
+                                ], className="my-2"),
+                                html.Div(
+                                    html.I(className="fas fa-thermometer-half text-warning"),
+                                    style={"textAlign": "right"}
+                                )
+                            ])
+                        ], className="shadow-sm"),
+                        width=4
+                    ),
+                ], className="mb-3"),
             
-            # Performance chart
-            dbc.Card([
-                dbc.CardBody([
-                    dcc.Graph(
-                        figure=create_performance_chart(time_series_data),
-                        config={'displayModeBar': False},
-                    )
-                ])
-            ], className="shadow-sm mb-3"),
-        ], width=8),
+                # Performance chart
+                dbc.Card([
+                    dbc.CardBody([
+                        dcc.Graph(
+                            id="system-performance-chart",
+                            figure=compact_figure(create_performance_chart(time_series_data)),
+                            config={'displayModeBar': False},
+                        ),
+                        # visible range and width, see assets/chart_view.js
+                        dcc.Store(id="system-performance-chart-view"),
+                    ])
+                ], className="shadow-sm mb-3"),
+            ], width=8),
         
-        # Right panel with system info
-        dbc.Col([
-            dbc.Card([
-                dbc.CardHeader("System Information", className="fw-bold"),
-                dbc.CardBody([
-                    html.Div([
-                        html.Div("Uptime:", className="text-muted"),
-                        html.Div(metrics['uptime'], className="fw-bold mb-2")
-                    ]),
-                    html.Div([
-                        html.Div("Last Restart:", className="text-muted"),
-                        html.Div(metrics['last_restart'], className="fw-bold mb-2")
-                    ]),
-                    html.Div([
-                        html.Div("Active Users:", className="text-muted"),
-                        html.Div(metrics['active_users'], className="fw-bold mb-2")
-                    ]),
-                    html.Div([
-                        html.Div("Active Processes:", className="text-muted"),
-                        html.Div(metrics['active_processes'], className="fw-bold mb-2")
-                    ]),
-                ])
-            ], className="shadow-sm mb-3"),
+            # Right panel with system info
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader("System Information", className="fw-bold"),
+                    dbc.CardBody([
+                        html.Div([
+                            html.Div("Uptime:", className="text-muted"),
+                            html.Div(metrics['uptime'], className="fw-bold mb-2")
+                        ]),
+                        html.Div([
+                            html.Div("Last Restart:", className="text-muted"),
+                            html.Div(metrics['last_restart'], className="fw-bold mb-2")
+                        ]),
+                        html.Div([
+                            html.Div("Load Average (1m):", className="text-muted"),
+                            html.Div(metrics['load_average'], className="fw-bold mb-2")
+                        ]),
+                        html.Div([
+                            html.Div("Active Processes:", className="text-muted"),
+                            html.Div(metrics['active_processes'], className="fw-bold mb-2")
+                        ]),
+                    ])
+                ], className="shadow-sm mb-3"),
             
-            dbc.Card([
-                dbc.CardHeader("Server Status", className="fw-bold"),
-                dbc.CardBody([
-                    server_table
-                ])
-            ], className="shadow-sm mb-3"),
+                dbc.Card([
+                    dbc.CardHeader("Server Status", className="fw-bold"),
+                    dbc.CardBody([
+                        server_table
+                    ])
+                ], className="shadow-sm mb-3"),
             
-            dbc.Card([
-                dbc.CardHeader("Quick Actions", className="fw-bold"),
-                dbc.CardBody([
-                    dbc.Button("Refresh System Data", color="primary", className="me-2 mb-2"),
-                    dbc.Button("System Diagnostics", outline=True, color="secondary", className="me-2 mb-2"),
-                    dbc.Button("View Logs", outline=True, color="secondary", className="me-2 mb-2"),
-                    dbc.Button("Maintenance Mode", outline=True, color="warning", className="me-2")
-                ])
-            ], className="shadow-sm")
-        ], width=4)
-    ])
-], style={"padding": "20px"}) 
\ No newline at end of file
+                dbc.Card([
+                    dbc.CardHeader("Quick Actions", className="fw-bold"),
+                    dbc.CardBody([
+                        dbc.Button("Refresh System Data", color="primary", className="me-2 mb-2"),
+                        dbc.Button("System Diagnostics", outline=True, color="secondary", className="me-2 mb-2"),
+                        dbc.Button("View Logs", outline=True, color="secondary", className="me-2 mb-2"),
+                        dbc.Button("Maintenance Mode", outline=True, color="warning", className="me-2")
+                    ])
+                ], className="shadow-sm")
+            ], width=4)
+        ])
+    ], style={"padding": "20px"}) 
+# Zooming re-queries the sampled history for the visible range; the initial
+# figure comes from the layout
+clientside_callback(
+    ClientsideFunction(namespace="chart_view", function_name="view"),
+    Output("system-performance-chart-view", "data"),
+    Input("system-performance-chart", "relayoutData"),
+    State("system-performance-chart", "id"),
+    State("system-performance-chart-view", "data"),
+    prevent_initial_call=True,
+)
+
+@callback(
+    Output("system-performance-chart", "figure"),
+    Input("system-performance-chart-view", "data"),
+    prevent_initial_call=True,
+)
+def update_performance_chart(view):
+    start, end, width = downsample.view_range(view)
+    df = generate_time_series()
+    if start is not None:
+        df = df[(df['timestamp'] >= start) & (df['timestamp'] <= end)]
+    return compact_figure(create_performance_chart(df, downsample.points_for_width(width)))
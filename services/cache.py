@@ -0,0 +1,153 @@
+import functools
+import logging
+import os
+import tempfile
+from time import time
+
+from flask import has_app_context
+from flask_caching import Cache
+from flask_caching.backends.filesystemcache import FileSystemCache
+
+from datastore.observations import loaded_store
+from figures.transport import compact_figure
+
+log = logging.getLogger(__name__)
+
+# FIGURE_CACHE_TYPE accepts any Flask-Caching backend; the default is the LRU
+# filesystem cache below, shared by every worker on the host. For a cache
+# shared across hosts use "RedisCache" with FIGURE_CACHE_REDIS_URL and set
+# maxmemory / maxmemory-policy=allkeys-lru on the Redis server.
+FIGURE_CACHE_TYPE = os.getenv("FIGURE_CACHE_TYPE", "services.cache.LRUFileSystemCache")
+FIGURE_CACHE_DIR = os.getenv("FIGURE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "mesonet-figure-cache"))
+FIGURE_CACHE_REDIS_URL = os.getenv("FIGURE_CACHE_REDIS_URL", "redis://localhost:6379/0")
+FIGURE_CACHE_TTL = int(os.getenv("FIGURE_CACHE_TTL", "600"))  # seconds
+FIGURE_CACHE_MAX_ITEMS = int(os.getenv("FIGURE_CACHE_MAX_ITEMS", "500"))
+FIGURE_CACHE_MAX_MB = int(os.getenv("FIGURE_CACHE_MAX_MB", "256"))
+
+cache = Cache()
+
+
+class LRUFileSystemCache(FileSystemCache):
+    """
+    Filesystem cache with least-recently-used eviction and a byte budget.
+
+    Reads bump the file's mtime, and pruning drops expired entries first and
+    then the least recently used ones until both the item count and the total
+    size are within limits.
+    """
+
+    def __init__(self, cache_dir, max_bytes=0, **kwargs):
+        super().__init__(cache_dir, **kwargs)
+        self._max_bytes = max_bytes
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs["max_bytes"] = config.get("FIGURE_CACHE_MAX_BYTES", 0)
+        return super().factory(app, config, args, kwargs)
+
+    def get(self, key):
+        value = super().get(key)
+        if value is not None:
+            try:
+                os.utime(self._get_filename(key))
+            except OSError:
+                pass
+        return value
+
+    def _entries(self):
+        entries = []
+        for fname in self._list_dir():
+            try:
+                stat = os.stat(fname)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, fname))
+        return entries
+
+    def _prune(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        over_bytes = self._max_bytes and total > self._max_bytes
+        if not (self._over_threshold() or over_bytes):
+            return
+
+        self._remove_expired(time())
+        entries = sorted(self._entries())
+        count = len(entries)
+        total = sum(size for _, size, _ in entries)
+        for _, size, fname in entries:
+            within_count = not self._threshold or count <= self._threshold
+            within_bytes = not self._max_bytes or total <= self._max_bytes
+            if within_count and within_bytes:
+                break
+            try:
+                os.remove(fname)
+            except FileNotFoundError:
+                pass
+            count -= 1
+            total -= size
+        self._update_count(value=count)
+
+
+def init_cache(server):
+    """
+    Attach the shared figure cache to the Flask server.
+    """
+    config = {
+        "CACHE_TYPE": FIGURE_CACHE_TYPE,
+        "CACHE_DEFAULT_TIMEOUT": FIGURE_CACHE_TTL,
+        "CACHE_THRESHOLD": FIGURE_CACHE_MAX_ITEMS,
+        "CACHE_DIR": FIGURE_CACHE_DIR,
+        "CACHE_REDIS_URL": FIGURE_CACHE_REDIS_URL,
+        "CACHE_KEY_PREFIX": "mesonet-figure:",
+        "FIGURE_CACHE_MAX_BYTES": FIGURE_CACHE_MAX_MB * 1024 * 1024,
+    }
+    cache.init_app(server, config=config)
+    log.info("Figure cache: %s", FIGURE_CACHE_TYPE)
+    return cache
+
+
+def _store_version():
+    # None until the pages' warm-up has loaded the store: looking up a key must not load it
+    store = loaded_store()
+    return store.data_version if store is not None else None
+
+
+def cached_value(name, version=_store_version, compact=False):
+    """
+    Cache a callback's return value by (name, arguments, data version).
+
+    The data version is part of the key, so new data never serves a stale
+    value; old entries simply age out of the cache. With compact=True the
+    value is cached as compact_figure returns it. Calls made outside the
+    Flask server (scripts, benchmarks), and calls while the version is None
+    (the store is not loaded yet), are not cached.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            data_version = version() if has_app_context() else None
+            if data_version is None:
+                return func(*args)
+            key = ":".join([name, *map(str, args), str(data_version)])
+            value = cache.get(key)
+            if value is None:
+                value = func(*args)
+                if compact:
+                    # cached as sent: a JSON dict with typed arrays, see figures/transport.py
+                    value = compact_figure(value)
+                cache.set(key, value)
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+def cached_figure(name, version=_store_version):
+    """
+    Cache a figure-building function by (name, arguments, data version),
+    storing the figure in its compact JSON form (see cached_value).
+    """
+    return cached_value(name, version, compact=True)
@@ -0,0 +1,208 @@
+import bisect
+import os
+import threading
+import time
+
+from flask import Response, g, jsonify, request
+
+# CALLBACK_METRICS=off disables the request hooks and endpoints
+CALLBACK_METRICS = os.getenv("CALLBACK_METRICS", "on")
+
+# histogram name -> (help text, upper bucket bounds)
+HISTOGRAMS = {
+    "duration_seconds": (
+        "Wall time of the callback request, including serialization",
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    "cpu_seconds": (
+        "CPU time of the request thread",
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    "response_bytes": (
+        "Size of the serialized callback response",
+        (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216),
+    ),
+    "input_cardinality": (
+        "Number of input and state values, counting list elements",
+        (1, 2, 5, 10, 25, 100, 1000, 10000),
+    ),
+}
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram, like a Prometheus histogram.
+    """
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # the last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """
+        Estimate a quantile by linear interpolation inside its bucket,
+        clamped to the observed range.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = max(self.bounds[i - 1] if i else 0.0, self.min)
+                upper = min(self.bounds[i] if i < len(self.bounds) else self.max, self.max)
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.max
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class CallbackMetrics:
+    """
+    Per-callback histograms of wall time, CPU time, response size and input cardinality.
+    """
+
+    def __init__(self):
+        self.callbacks = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, duration, cpu, size, cardinality, error=False):
+        with self._lock:
+            histograms = self.callbacks.get(name)
+            if histograms is None:
+                histograms = self.callbacks[name] = {key: Histogram(bounds) for key, (_, bounds) in HISTOGRAMS.items()}
+                self.errors[name] = 0
+            histograms["duration_seconds"].observe(duration)
+            histograms["cpu_seconds"].observe(cpu)
+            histograms["response_bytes"].observe(size)
+            histograms["input_cardinality"].observe(cardinality)
+            if error:
+                self.errors[name] += 1
+
+    def prometheus(self):
+        """
+        Render every histogram in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            for key, (help_text, bounds) in HISTOGRAMS.items():
+                metric = f"dash_callback_{key}"
+                lines += [f"# HELP {metric} {help_text}.", f"# TYPE {metric} histogram"]
+                for name, histograms in sorted(self.callbacks.items()):
+                    h = histograms[key]
+                    name = _label(name)
+                    cumulative = 0
+                    for bound, n in zip(list(bounds) + ["+Inf"], h.counts):
+                        cumulative += n
+                        lines.append(f'{metric}_bucket{{callback="{name}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_sum{{callback="{name}"}} {h.sum:.6g}')
+                    lines.append(f'{metric}_count{{callback="{name}"}} {h.count}')
+            lines += [
+                "# HELP dash_callback_errors_total Callback requests answered with a 5xx status.",
+                "# TYPE dash_callback_errors_total counter",
+            ]
+            for name, errors in sorted(self.errors.items()):
+                lines.append(f'dash_callback_errors_total{{callback="{_label(name)}"}} {errors}')
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """
+        Return count, mean, p50/p95/p99 and max of every histogram, per callback.
+        """
+        with self._lock:
+            return {
+                name: dict(
+                    {
+                        key: {
+                            "count": h.count,
+                            "mean": h.sum / h.count if h.count else None,
+                            "p50": h.quantile(0.5),
+                            "p95": h.quantile(0.95),
+                            "p99": h.quantile(0.99),
+                            "max": h.max,
+                        }
+                        for key, h in histograms.items()
+                    },
+                    errors=self.errors[name],
+                )
+                for name, histograms in sorted(self.callbacks.items())
+            }
+
+
+metrics = CallbackMetrics()
+
+
+def _cardinality(values):
+    total = 0
+    for item in values or []:
+        if isinstance(item, list):
+            # pattern-matching inputs arrive as a list of inputs
+            total += _cardinality(item)
+        else:
+            value = item.get("value")
+            total += len(value) if isinstance(value, (list, dict)) else 1
+    return total
+
+
+def callback_name(application, output):
+    """
+    Name a callback by its function (pages.home.update_map), or its output id if unknown.
+    """
+    cb = application.callback_map.get(output)
+    if cb is None:
+        return output
+    func = cb["callback"]
+    return f"{func.__module__}.{func.__name__}"
+
+
+def init_callback_metrics(application):
+    """
+    Time every Dash callback request and add the /metrics and /metrics.json endpoints.
+    """
+    if CALLBACK_METRICS == "off":
+        return
+    server = application.server
+    update_path = application.config.requests_pathname_prefix + "_dash-update-component"
+
+    @server.before_request
+    def start_timer():
+        if request.path == update_path:
+            g.callback_timer = (time.perf_counter(), time.thread_time())
+
+    @server.after_request
+    def record(response):
+        timer = g.pop("callback_timer", None)
+        if timer is not None:
+            body = request.get_json(silent=True) or {}
+            metrics.observe(
+                callback_name(application, body.get("output", "")),
+                time.perf_counter() - timer[0],
+                time.thread_time() - timer[1],
+                response.calculate_content_length() or 0,
+                _cardinality(body.get("inputs")) + _cardinality(body.get("state")),
+                error=response.status_code >= 500,
+            )
+        return response
+
+    @server.route("/metrics")
+    def prometheus_metrics():
+        return Response(metrics.prometheus(), mimetype="text/plain; version=0.0.4")
+
+    @server.route("/metrics.json")
+    def metrics_summary():
+        return jsonify(metrics.summary())
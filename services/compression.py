@@ -0,0 +1,167 @@
+import gzip
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import brotli
+from dash.fingerprint import check_fingerprint
+from flask import request
+
+log = logging.getLogger(__name__)
+
+# COMPRESSION=off sends every response uncompressed
+COMPRESSION = os.getenv("COMPRESSION", "on")
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))  # smaller bodies are sent as is
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+# ASSET_CACHE=off leaves the cache headers of /assets and the Dash bundles as Dash sets them
+ASSET_CACHE = os.getenv("ASSET_CACHE", "on")
+ASSET_MAX_AGE = 31536000  # one year, for fingerprinted files
+# compressed static files kept per worker, so a bundle is only compressed once
+STATIC_CACHE_ITEMS = int(os.getenv("COMPRESSION_STATIC_CACHE_ITEMS", "64"))
+
+COMPRESSIBLE = {
+    "application/json",
+    "application/javascript",
+    "text/javascript",
+    "text/css",
+    "text/html",
+    "text/plain",
+    "image/svg+xml",
+}
+
+STATIC_PREFIXES = ("/assets/", "/_dash-component-suites/")
+
+
+def choose_encoding(accept_encoding):
+    """
+    Return "br", "gzip" or None for a request's Accept-Encoding header (brotli preferred).
+    """
+    for encoding in ("br", "gzip"):
+        if accept_encoding[encoding] > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class StaticCache:
+    """
+    Small LRU of compressed static bodies, keyed by path, encoding and version.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        body = build()
+        with self._lock:
+            self._items[key] = body
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+        return body
+
+
+static_cache = StaticCache(STATIC_CACHE_ITEMS)
+
+
+def _is_fingerprinted(path):
+    # Dash fingerprints bundle file names and adds ?m=<mtime> to asset urls
+    if path.startswith("/_dash-component-suites/"):
+        return check_fingerprint(path)[1]
+    return path.startswith("/assets/") and "m" in request.args
+
+
+def _cache_headers(response):
+    path = request.path
+    if not path.startswith(STATIC_PREFIXES) or response.status_code not in (200, 304):
+        return
+    if _is_fingerprinted(path):
+        # the url changes whenever the file does
+        response.cache_control.public = True
+        response.cache_control.max_age = ASSET_MAX_AGE
+        response.cache_control.immutable = True
+        response.cache_control.no_cache = None
+    else:
+        # revalidate every time; unchanged files are answered with 304 by their ETag
+        if not response.get_etag()[0]:
+            response.direct_passthrough = False
+            response.add_etag()
+        response.cache_control.no_cache = True
+        response.cache_control.max_age = None
+
+
+def _compress(response):
+    if (
+        response.status_code != 200
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE
+        or request.method == "HEAD"
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    static = request.path.startswith(STATIC_PREFIXES)
+    if response.direct_passthrough and not static:
+        # streamed bodies are left alone
+        return response
+    response.direct_passthrough = False
+    length = response.calculate_content_length()
+    if length is not None and length < COMPRESSION_MIN_BYTES:
+        return response
+
+    etag, weak = response.get_etag()
+    if static:
+        if etag:
+            # the representation differs per encoding, and so must its ETag
+            etag = f"{etag}-{encoding}"
+            if request.if_none_match.contains(etag):
+                response.status_code = 304
+                response.set_data(b"")
+                response.set_etag(etag, weak)
+                return response
+            response.set_etag(etag, weak)
+        key = (request.full_path, encoding, etag)
+        body = static_cache.get(key, lambda: compress(response.get_data(), encoding))
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESSION_MIN_BYTES:
+            return response
+        body = compress(data, encoding)
+
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_compression(server):
+    """
+    Compress responses with brotli or gzip and set cache headers on static files.
+    """
+    # after_request hooks run in reverse order of registration: compression is
+    # registered first so it runs last, after the cache headers are set and
+    # after every other hook has seen the uncompressed body
+    if COMPRESSION != "off":
+        server.after_request(_compress)
+        log.info("Response compression: br/gzip above %d bytes", COMPRESSION_MIN_BYTES)
+
+    if ASSET_CACHE != "off":
+
+        @server.after_request
+        def asset_cache_headers(response):
+            _cache_headers(response)
+            return response
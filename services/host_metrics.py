@@ -0,0 +1,218 @@
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import psutil
+
+log = logging.getLogger(__name__)
+
+# one sample every HOST_METRICS_INTERVAL seconds, HOST_METRICS_HISTORY samples kept (24h at 10s)
+HOST_METRICS_INTERVAL = float(os.getenv("HOST_METRICS_INTERVAL", "10"))
+HOST_METRICS_HISTORY = int(os.getenv("HOST_METRICS_HISTORY", "8640"))
+
+# columns of the ring buffer, in order
+FIELDS = [
+    "cpu_usage",  # % of all cores
+    "memory_usage",  # % of physical memory
+    "storage_usage",  # % of the root filesystem
+    "network_in",  # Mbps
+    "network_out",  # Mbps
+    "load_average",  # 1-minute load average
+    "active_processes",  # processes on the host
+    "system_temp",  # °F, NaN when the host exposes no sensors
+    "process_cpu",  # % of one core used by this worker
+    "process_rss",  # MB resident in this worker
+]
+
+
+def host_metrics():
+    """
+    Return the HOST_METRICS mode: on, off or post_fork (see ingest_watch).
+    """
+    return os.getenv("HOST_METRICS", "on")
+
+
+class RingBuffer:
+    """
+    Fixed-size buffer of timestamped samples backed by NumPy arrays.
+
+    Appending overwrites the oldest sample once full, so memory never grows.
+    """
+
+    def __init__(self, capacity, fields):
+        self.fields = list(fields)
+        self.times = np.full(capacity, np.nan)
+        self.values = np.full((capacity, len(self.fields)), np.nan, dtype=np.float32)
+        self._next = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def capacity(self):
+        return len(self.times)
+
+    def append(self, timestamp, values):
+        with self._lock:
+            self.times[self._next] = timestamp
+            self.values[self._next] = values
+            self._next = (self._next + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def snapshot(self, since=None):
+        """
+        Return (times, values) copies in chronological order.
+
+        times are epoch seconds; values has one column per field.
+        """
+        with self._lock:
+            if self._count < self.capacity:
+                times, values = self.times[: self._count].copy(), self.values[: self._count].copy()
+            else:
+                order = np.r_[self._next : self.capacity, 0 : self._next]
+                times, values = self.times[order], self.values[order]
+        if since is not None:
+            start = np.searchsorted(times, since)
+            times, values = times[start:], values[start:]
+        return times, values
+
+    def latest(self):
+        """
+        Return the newest sample as a {field: value} dict, or None when empty.
+        """
+        with self._lock:
+            if not self._count:
+                return None
+            row = self.values[(self._next - 1) % self.capacity]
+            return dict(zip(self.fields, row.tolist()), timestamp=float(self.times[(self._next - 1) % self.capacity]))
+
+
+def _temperature_f():
+    sensors = getattr(psutil, "sensors_temperatures", lambda: {})()
+    readings = [t.current for entries in sensors.values() for t in entries if t.current]
+    if not readings:
+        return np.nan
+    return max(readings) * 9 / 5 + 32
+
+
+class HostSampler:
+    """
+    Background thread sampling host and worker-process metrics with psutil.
+    """
+
+    def __init__(self, interval=HOST_METRICS_INTERVAL, history=HOST_METRICS_HISTORY):
+        self.interval = interval
+        self.buffer = RingBuffer(history, FIELDS)
+        self.process = psutil.Process()
+        self.started = self.process.create_time()
+        self._row = np.empty(len(FIELDS), dtype=np.float32)
+        self._net = None
+        # psutil.Process objects of sibling workers, kept so cpu_percent has a previous reading
+        self._workers = {}
+        self._sample_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sample(self):
+        """
+        Take one sample and append it to the buffer.
+        """
+        with self._sample_lock:
+            self._sample()
+
+    def _sample(self):
+        now = time.time()
+        net = psutil.net_io_counters()
+        if self._net is None:
+            network_in = network_out = 0.0
+        else:
+            elapsed = max(now - self._net[0], 1e-6)
+            network_in = (net.bytes_recv - self._net[1]) * 8 / 1e6 / elapsed
+            network_out = (net.bytes_sent - self._net[2]) * 8 / 1e6 / elapsed
+        self._net = (now, net.bytes_recv, net.bytes_sent)
+
+        row = self._row
+        row[0] = psutil.cpu_percent(interval=None)
+        row[1] = psutil.virtual_memory().percent
+        row[2] = psutil.disk_usage("/").percent
+        row[3] = network_in
+        row[4] = network_out
+        row[5] = os.getloadavg()[0] if hasattr(os, "getloadavg") else np.nan
+        row[6] = len(psutil.pids())
+        row[7] = _temperature_f()
+        row[8] = self.process.cpu_percent(interval=None)
+        row[9] = self.process.memory_info().rss / 2**20
+        self.buffer.append(now, row)
+
+    def _run(self):
+        # cpu_percent measures since the previous call, so prime it before the first sample
+        psutil.cpu_percent(interval=None)
+        self.process.cpu_percent(interval=None)
+        while not self._stop.wait(self.interval if len(self.buffer) else 1.0):
+            try:
+                self.sample()
+            except Exception:
+                log.exception("Host metrics sample failed")
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="host-metrics", daemon=True)
+            self._thread.start()
+            log.info("Sampling host metrics every %ss (%d samples kept)", self.interval, self.buffer.capacity)
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def workers(self):
+        """
+        Return (pid, cpu %, rss MB) for this process and its sibling workers.
+        """
+        parent = self.process.parent()
+        siblings = parent.children() if parent is not None and parent.name() == self.process.name() else []
+        processes = {p.pid: self._workers.get(p.pid, p) for p in siblings or [psutil.Process()]}
+        self._workers = processes
+        rows = []
+        for pid, p in sorted(processes.items()):
+            try:
+                with p.oneshot():
+                    rows.append((pid, p.cpu_percent(interval=None), p.memory_info().rss / 2**20))
+            except psutil.Error:
+                continue
+        return rows
+
+
+_sampler = None
+_sampler_pid = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler():
+    """
+    Return this process's sampler (a forked worker gets its own).
+    """
+    global _sampler, _sampler_pid
+    with _sampler_lock:
+        if _sampler is None or _sampler_pid != os.getpid():
+            _sampler = HostSampler()
+            _sampler_pid = os.getpid()
+    return _sampler
+
+
+def start_host_metrics():
+    if host_metrics() == "off":
+        return None
+    return get_sampler().start()
+
+
+def init_host_metrics():
+    """
+    Start the sampler according to HOST_METRICS.
+    """
+    if host_metrics() == "on":
+        start_host_metrics()
@@ -0,0 +1,237 @@
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+from flask import jsonify, request
+
+from datastore.observations import DATA_DIR, PROVIDER_FILES, RETENTION_HOURS, get_store, read_batch
+
+log = logging.getLogger(__name__)
+
+# drop directory for new observation batches, polled every INGEST_INTERVAL seconds
+INGEST_DIR = os.getenv("INGEST_DIR", os.path.join(DATA_DIR, "incoming"))
+INGEST_INTERVAL = float(os.getenv("INGEST_INTERVAL", "60"))
+
+BATCH_SUFFIXES = (".parquet", ".csv")
+
+# ingested batches older than the observation retention window are moved into this subdirectory
+PROCESSED_DIR = "processed"
+
+
+def ingest_watch():
+    """
+    Return the INGEST_WATCH mode.
+
+    on: start the watcher in create_app
+    post_fork: start it in each gunicorn worker (set by gunicorn.conf.py, as
+        threads started in the preloading master do not survive the fork)
+    off: never start it
+    """
+    return os.getenv("INGEST_WATCH", "on")
+
+
+class IngestWatcher:
+    """
+    Poll a drop directory and append new parquet/CSV batches to the store.
+
+    Each file is ingested once, in modification-time order. Batches should be
+    written under another name (e.g. *.tmp) and renamed into place; a file
+    that cannot be read yet is retried on the next poll. Rows without a
+    provider column take the provider from the file name prefix
+    (deldot_20250101T1200.parquet).
+
+    Ingested files stay in place while their data is within the retention
+    window, so a restarted process reads them again; after that they are
+    moved into PROCESSED_DIR, which keeps the listing and the set of
+    ingested names bounded. Every gunicorn worker has its own watcher, so
+    a file is only moved once it is long past every worker's next poll.
+    """
+
+    def __init__(self, directory=INGEST_DIR, interval=INGEST_INTERVAL, store=None, retention_hours=RETENTION_HOURS):
+        self.directory = directory
+        self.interval = interval
+        self._store = store
+        self.retention = retention_hours * 3600 if retention_hours else None
+        self._ingested = set()
+        self._stop = threading.Event()
+        self._thread = None
+        self.batches = 0
+        self.rows = 0
+        self.last_poll = None
+        self.last_error = None
+
+    @property
+    def store(self):
+        return self._store or get_store()
+
+    def _provider_for(self, filename):
+        prefix = filename.split("_", 1)[0].lower()
+        return prefix if prefix in PROVIDER_FILES else None
+
+    def pending(self):
+        """
+        Return the batch files not ingested yet, oldest first, and move ingested
+        files past the retention window into PROCESSED_DIR.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        # never re-read the store's own source files if pointed at the data directory; the default
+        # store's files are known without loading it, so an idle poll never triggers the first load
+        sources = set((self._store.provider_files if self._store else PROVIDER_FILES).values())
+        expired = time.time() - self.retention if self.retention is not None else None
+        entries, present = [], set()
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(BATCH_SUFFIXES) or entry.name in sources or not entry.is_file():
+                continue
+            if entry.name not in self._ingested:
+                entries.append(entry)
+            elif expired is None or entry.stat().st_mtime >= expired or not self._archive(entry):
+                present.add(entry.name)
+        # forget files moved away, here or by another worker's watcher
+        self._ingested &= present
+        return sorted(entries, key=lambda entry: entry.stat().st_mtime_ns)
+
+    def _archive(self, entry):
+        """
+        Move an ingested file into PROCESSED_DIR and return whether it left the directory.
+        """
+        processed = os.path.join(self.directory, PROCESSED_DIR)
+        try:
+            os.makedirs(processed, exist_ok=True)
+            os.replace(entry.path, os.path.join(processed, entry.name))
+        except FileNotFoundError:
+            # already moved by another worker's watcher
+            pass
+        except OSError:
+            log.warning("Could not move %s to %s", entry.path, processed, exc_info=True)
+            return False
+        return True
+
+    def poll(self):
+        """
+        Append every pending batch to the store and return the number of rows added.
+        """
+        added = 0
+        for entry in self.pending():
+            store = self.store
+            stat = entry.stat()
+            try:
+                batch = read_batch(entry.path)
+                rows = store.append(
+                    batch,
+                    provider=self._provider_for(entry.name),
+                    batch_id=f"{entry.name}:{stat.st_mtime_ns}:{stat.st_size}",
+                )
+            except Exception as e:
+                self.last_error = f"{entry.name}: {e!r}"
+                log.warning("Could not ingest %s, retrying next poll", entry.path, exc_info=True)
+                continue
+            self._ingested.add(entry.name)
+            self.batches += 1
+            self.rows += rows
+            added += rows
+        self.last_poll = time.time()
+        return added
+
+    def _run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception:
+                log.exception("Ingest poll of %s failed", self.directory)
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="ingest-watcher", daemon=True)
+            self._thread.start()
+            log.info("Watching %s for observation batches every %ss", self.directory, self.interval)
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        store = self.store
+        return {
+            "directory": self.directory,
+            "interval": self.interval,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "batches": self.batches,
+            "rows": self.rows,
+            "last_poll": self.last_poll,
+            "last_error": self.last_error,
+            "stored_rows": store.rows,
+            "data_version": store.data_version,
+        }
+
+
+_watcher = None
+_watcher_pid = None
+_watcher_lock = threading.Lock()
+
+
+def get_watcher():
+    """
+    Return this process's ingest watcher (a forked worker gets its own).
+    """
+    global _watcher, _watcher_pid
+    with _watcher_lock:
+        if _watcher is None or _watcher_pid != os.getpid():
+            _watcher = IngestWatcher()
+            _watcher_pid = os.getpid()
+    return _watcher
+
+
+def start_ingest():
+    if ingest_watch() == "off":
+        return None
+    return get_watcher().start()
+
+
+def latency_report(hours=1, providers=None, sketches=False):
+    """
+    Return ingest latency quantiles over the last `hours` of arrivals, in
+    total and per provider, optionally with the serialized sketches so that
+    reports from several processes can be merged (LatencySketch.from_dict).
+    """
+    latency = get_store().latency
+    end = pd.Timestamp.now()
+    start = end - pd.Timedelta(hours=hours)
+    per_provider = latency.by_provider(start, end)
+    if providers is not None:
+        per_provider = {p: s for p, s in per_provider.items() if p in providers}
+    report = {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "total": latency.window(start, end, providers).summary(),
+        "providers": {p: s.summary() for p, s in per_provider.items()},
+    }
+    if sketches:
+        report["sketches"] = {p: s.to_dict() for p, s in per_provider.items()}
+    return report
+
+
+def init_ingest(server):
+    """
+    Add the /ingest status and /ingest/latency endpoints and start the watcher according to INGEST_WATCH.
+    """
+
+    @server.route("/ingest")
+    def ingest_status():
+        return jsonify(get_watcher().status())
+
+    @server.route("/ingest/latency")
+    def ingest_latency():
+        # ?hours=24&providers=deldot,nysm&sketches=1
+        hours = request.args.get("hours", 1, type=float)
+        providers = request.args.get("providers")
+        providers = providers.split(",") if providers else None
+        return jsonify(latency_report(hours, providers, request.args.get("sketches") == "1"))
+
+    if ingest_watch() == "on":
+        start_ingest()
@@ -0,0 +1,266 @@
+import cProfile
+import hmac
+import logging
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from flask import abort, g, jsonify, request
+
+from services.callback_metrics import callback_name
+
+log = logging.getLogger(__name__)
+
+# PROFILE_ON_START=sample|cprofile starts one capped session in each worker on its first callback
+PROFILE_ON_START = os.getenv("PROFILE_ON_START", "")
+PROFILE_CALLBACK = os.getenv("PROFILE_CALLBACK")  # limit sessions to one callback, e.g. pages.home.update_map
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "mesonet-profiles"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))  # seconds between stack samples
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+PROFILE_MAX_SAMPLES = int(os.getenv("PROFILE_MAX_SAMPLES", "20000"))  # stacks, or requests in cprofile mode
+# the /admin/profile endpoints are only added when a token is configured
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN")
+
+MODES = ("sample", "cprofile")
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{code.co_name}"
+
+
+class ProfileSession:
+    """
+    One capped profiling session over in-flight callback requests.
+
+    sample: a thread records the stacks of request threads running a
+        callback every `interval` seconds and writes them as collapsed stacks
+        (flamegraph.pl / speedscope input).
+    cprofile: each matching callback request runs under cProfile and the
+        merged stats are written as a .pstats file.
+
+    The session ends after `seconds`, after `max_samples` stacks (requests in
+    cprofile mode), or when stopped.
+    """
+
+    def __init__(
+        self,
+        mode="sample",
+        callback=None,
+        seconds=PROFILE_MAX_SECONDS,
+        max_samples=PROFILE_MAX_SAMPLES,
+        interval=PROFILE_INTERVAL,
+        directory=PROFILE_DIR,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"unknown profile mode {mode!r}, expected one of {MODES}")
+        self.mode = mode
+        self.callback = callback
+        self.seconds = min(float(seconds), PROFILE_MAX_SECONDS)
+        self.max_samples = min(int(max_samples), PROFILE_MAX_SAMPLES)
+        self.interval = max(float(interval), 0.001)
+        self.directory = directory
+        self.started = time.time()
+        self.samples = 0
+        self.path = None
+        self._stacks = Counter()
+        self._inflight = {}  # thread id -> callback name
+        self._stats = None
+        self._lock = threading.Lock()
+        self._profiling = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-session", daemon=True)
+
+    @property
+    def active(self):
+        return not self._stop.is_set()
+
+    def start(self):
+        self._thread.start()
+        log.info(
+            "Started %s profile session (callback=%s, %ss, %d samples)",
+            self.mode,
+            self.callback,
+            self.seconds,
+            self.max_samples,
+        )
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def wants(self, name):
+        return self.active and (self.callback is None or name == self.callback)
+
+    def begin_request(self, name):
+        """
+        Called on the request thread before a callback runs; returns a token for end_request.
+        """
+        if self.mode == "cprofile":
+            # one request at a time: only one profiler can be active per process on Python 3.12+
+            if not self._profiling.acquire(blocking=False):
+                return None
+            if self.samples >= self.max_samples:
+                self._profiling.release()
+                return None
+            self.samples += 1
+            profile = cProfile.Profile()
+            profile.enable()
+            return profile
+        self._inflight[threading.get_ident()] = name
+        return True
+
+    def end_request(self, token):
+        if self.mode == "cprofile":
+            token.disable()
+            with self._lock:
+                if self._stats is None:
+                    self._stats = pstats.Stats(token)
+                else:
+                    self._stats.add(token)
+            self._profiling.release()
+            if self.samples >= self.max_samples:
+                self.stop()
+        else:
+            self._inflight.pop(threading.get_ident(), None)
+
+    def _sample(self):
+        frames = sys._current_frames()
+        for ident, name in list(self._inflight.items()):
+            frame = frames.get(ident)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                stack.append(name)
+                self._stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def _run(self):
+        wait = self.interval if self.mode == "sample" else 0.25
+        while not self._stop.wait(wait):
+            if time.time() - self.started >= self.seconds or self.samples >= self.max_samples:
+                break
+            if self.mode == "sample":
+                self._sample()
+        self._stop.set()
+        try:
+            self._write()
+        except OSError:
+            log.exception("Could not write profile to %s", self.directory)
+
+    def _write(self):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started))
+        name = f"{self.mode}-{stamp}-{os.getpid()}"
+        if self.mode == "sample":
+            self.path = os.path.join(self.directory, name + ".collapsed")
+            with open(self.path, "w") as f:
+                for stack, count in self._stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+        elif self._stats is not None:
+            self.path = os.path.join(self.directory, name + ".pstats")
+            with self._lock:
+                self._stats.dump_stats(self.path)
+        log.info("Profile session wrote %d samples to %s", self.samples, self.path)
+
+    def status(self):
+        return {
+            "mode": self.mode,
+            "callback": self.callback,
+            "active": self.active,
+            "started": self.started,
+            "seconds": self.seconds,
+            "samples": self.samples,
+            "max_samples": self.max_samples,
+            "path": self.path,
+        }
+
+
+_session = None
+_session_lock = threading.Lock()
+_started_on = None  # pid that ran the PROFILE_ON_START session
+
+
+def start_session(**kwargs):
+    """
+    Start a profile session unless one is already running; returns it, or None.
+    """
+    global _session
+    with _session_lock:
+        if _session is not None and _session.active:
+            return None
+        _session = ProfileSession(**kwargs).start()
+        return _session
+
+
+def init_profiler(application):
+    """
+    Hook the profiler into callback requests and add the /admin/profile endpoints.
+    """
+    server = application.server
+    update_path = application.config.requests_pathname_prefix + "_dash-update-component"
+
+    @server.before_request
+    def begin_profile():
+        global _started_on
+        if request.path != update_path:
+            return
+        if PROFILE_ON_START and _started_on != os.getpid():
+            _started_on = os.getpid()
+            start_session(mode=PROFILE_ON_START, callback=PROFILE_CALLBACK)
+        session = _session
+        if session is None or not session.active:
+            return
+        name = callback_name(application, (request.get_json(silent=True) or {}).get("output", ""))
+        if session.wants(name):
+            token = session.begin_request(name)
+            if token is not None:
+                g.profile = (session, token)
+
+    @server.teardown_request
+    def end_profile(exc):
+        profiled = g.pop("profile", None)
+        if profiled is not None:
+            session, token = profiled
+            session.end_request(token)
+
+    if not PROFILE_ADMIN_TOKEN:
+        return
+
+    def authorize():
+        header = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(header, f"Bearer {PROFILE_ADMIN_TOKEN}"):
+            abort(403)
+
+    @server.route("/admin/profile", methods=["GET"])
+    def profile_status():
+        authorize()
+        return jsonify(_session.status() if _session is not None else None)
+
+    @server.route("/admin/profile/start", methods=["POST"])
+    def profile_start():
+        authorize()
+        args = dict(request.args, **(request.get_json(silent=True) or {}))
+        options = {key: args[key] for key in ("mode", "callback", "seconds", "max_samples", "interval") if key in args}
+        try:
+            session = start_session(**options)
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+        if session is None:
+            return jsonify({"error": "a profile session is already running", "session": _session.status()}), 409
+        return jsonify(session.status())
+
+    @server.route("/admin/profile/stop", methods=["POST"])
+    def profile_stop():
+        authorize()
+        if _session is None:
+            return jsonify(None)
+        _session.stop()
+        _session._thread.join(timeout=5)
+        return jsonify(_session.status())
@@ -0,0 +1,124 @@
+import logging
+import os
+import threading
+import time
+
+from datastore.observations import loaded_store
+from datastore.provider_stats import refresh_provider_stats
+
+log = logging.getLogger(__name__)
+
+# seconds between provider stats recomputations (skipped while the data is unchanged)
+PROVIDER_STATS_INTERVAL = float(os.getenv("PROVIDER_STATS_INTERVAL", "60"))
+
+
+def refresh_loaded_provider_stats():
+    # the pages' warm-up (PAGE_LOADING) loads the store; refreshing before that would load it here,
+    # at startup even in lazy mode
+    store = loaded_store()
+    if store is not None:
+        refresh_provider_stats(store)
+
+
+def scheduler_mode():
+    """
+    Return the SCHEDULER mode: on, off or post_fork (see ingest_watch).
+    """
+    return os.getenv("SCHEDULER", "on")
+
+
+class Job:
+    def __init__(self, name, interval, func):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.next_run = 0.0
+        self.runs = 0
+        self.seconds = None
+        self.error = None
+
+
+class Scheduler:
+    """
+    Run registered jobs on a fixed cadence in one background thread.
+
+    Jobs run one after another; a failing job is logged and retried at its
+    next slot.
+    """
+
+    def __init__(self):
+        self.jobs = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def every(self, interval, name, func):
+        self.jobs.append(Job(name, interval, func))
+        return self
+
+    def run_pending(self):
+        now = time.monotonic()
+        for job in self.jobs:
+            if job.next_run > now:
+                continue
+            start = time.perf_counter()
+            try:
+                job.func()
+                job.error = None
+            except Exception as e:
+                job.error = repr(e)
+                log.exception("Scheduled job %s failed", job.name)
+            job.seconds = time.perf_counter() - start
+            job.runs += 1
+            job.next_run = now + job.interval
+
+    def _run(self):
+        while True:
+            self.run_pending()
+            wait = min(job.next_run for job in self.jobs) - time.monotonic()
+            if self._stop.wait(max(wait, 0.1)):
+                return
+
+    def start(self):
+        if self.jobs and (self._thread is None or not self._thread.is_alive()):
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+            self._thread.start()
+            log.info("Scheduler started: %s", ", ".join(f"{job.name} every {job.interval}s" for job in self.jobs))
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        return {job.name: {"runs": job.runs, "seconds": job.seconds, "error": job.error} for job in self.jobs}
+
+
+_scheduler = None
+_scheduler_pid = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """
+    Return this process's scheduler with the app's jobs registered (a forked worker gets its own).
+    """
+    global _scheduler, _scheduler_pid
+    with _scheduler_lock:
+        if _scheduler is None or _scheduler_pid != os.getpid():
+            _scheduler = Scheduler().every(PROVIDER_STATS_INTERVAL, "provider_stats", refresh_loaded_provider_stats)
+            _scheduler_pid = os.getpid()
+    return _scheduler
+
+
+def start_scheduler():
+    if scheduler_mode() == "off":
+        return None
+    return get_scheduler().start()
+
+
+def init_scheduler():
+    """
+    Start the scheduler according to SCHEDULER.
+    """
+    if scheduler_mode() == "on":
+        start_scheduler()
@@ -0,0 +1,117 @@
+import functools
+import logging
+import os
+import threading
+import time
+
+from flask import jsonify
+
+log = logging.getLogger(__name__)
+
+
+def page_loading():
+    """
+    Return the PAGE_LOADING mode.
+
+    eager: build every page resource inside create_app (the old behaviour)
+    background: start serving at once and build them in a warm-up thread
+    lazy: build each resource on the first request that needs it
+
+    Read on every call, so a server config (gunicorn.conf.py) can set it after
+    this module is imported.
+    """
+    return os.getenv("PAGE_LOADING", "background")
+
+
+class PageResource:
+    """
+    A page's data or layout, built once on first use.
+    """
+
+    def __init__(self, name, build):
+        self.name = name
+        self.build = build
+        self.seconds = None
+        self.error = None
+        self._value = None
+        self._built = False
+        self._lock = threading.Lock()
+
+    @property
+    def warm(self):
+        return self._built
+
+    def get(self):
+        if self._built:
+            return self._value
+        with self._lock:
+            if not self._built:
+                start = time.perf_counter()
+                try:
+                    self._value = self.build()
+                except Exception as e:
+                    self.error = repr(e)
+                    raise
+                self.seconds = time.perf_counter() - start
+                self.error = None
+                self._built = True
+                log.info("Page resource %s ready in %.2fs", self.name, self.seconds)
+        return self._value
+
+
+_resources = {}
+
+
+def page_resource(name):
+    """
+    Register a page builder; the decorated function returns its cached result.
+    """
+
+    def decorator(build):
+        resource = _resources[name] = PageResource(name, build)
+
+        @functools.wraps(build)
+        def wrapper():
+            return resource.get()
+
+        return wrapper
+
+    return decorator
+
+
+def warm_up():
+    """
+    Build every registered page resource, logging (not raising) failures.
+    """
+    for resource in list(_resources.values()):
+        try:
+            resource.get()
+        except Exception:
+            log.exception("Warm-up of %s failed", resource.name)
+
+
+def readiness():
+    pages = {
+        name: {"warm": r.warm, "seconds": r.seconds, "error": r.error}
+        for name, r in _resources.items()
+    }
+    mode = page_loading()
+    ready = mode == "lazy" or all(r.warm for r in _resources.values())
+    return {"mode": mode, "ready": ready, "pages": pages}
+
+
+def init_warmup(server):
+    """
+    Add the /ready endpoint and start warming pages according to PAGE_LOADING.
+    """
+
+    @server.route("/ready")
+    def ready():
+        status = readiness()
+        return jsonify(status), 200 if status["ready"] else 503
+
+    mode = page_loading()
+    if mode == "eager":
+        warm_up()
+    elif mode == "background":
+        threading.Thread(target=warm_up, name="page-warmup", daemon=True).start()
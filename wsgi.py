@@ -0,0 +1,10 @@
+"""
+WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:server
+"""
+from application import create_app
+
+# the Dash app and the Flask server (the WSGI callable) it runs on
+application = create_app()
+server = application.server